@@ -0,0 +1,161 @@
+# Admission control for synchronous report classification.
+#
+# Each stage (text-only reports vs reports with an image) has a bounded number
+# of requests in flight and a bounded waiting queue. A request that finds both
+# full is turned away immediately with 503 and a Retry-After estimated from the
+# stage's recent service rate, instead of piling onto CLIP and slowing
+# everybody down.
+#
+# Requests wait for an in-flight slot on the event loop, not in a threadpool
+# thread, so a long queue cannot starve /health, /metrics or /jobs of threads.
+# Waiters are served by urgency with the same levels and aging as the image
+# scheduler (app/scheduler.py): the admission queue is where requests spend
+# their waiting time, so this is where urgent reports overtake others. The
+# image scheduler still orders the (fewer) admitted requests in front of CLIP.
+import asyncio
+import math
+import os
+import threading
+import time
+from itertools import count
+
+from app.scheduler import PRIORITIES, SCHEDULER_AGING_SECONDS
+
+TEXT_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_TEXT_MAX_IN_FLIGHT", "8"))
+TEXT_MAX_QUEUE = int(os.getenv("ADMISSION_TEXT_MAX_QUEUE", "32"))
+IMAGE_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_IMAGE_MAX_IN_FLIGHT", "2"))
+IMAGE_MAX_QUEUE = int(os.getenv("ADMISSION_IMAGE_MAX_QUEUE", "16"))
+
+_EWMA_ALPHA = 0.2  # weight of the newest service time sample
+_MAX_RETRY_AFTER = 60
+
+
+class Overloaded(Exception):
+    """Raised when a stage's in-flight slots and waiting queue are both full."""
+
+    def __init__(self, stage: str, retry_after: int):
+        self.stage = stage
+        self.retry_after = retry_after
+        super().__init__(f"Server busy ({stage} stage at capacity), retry in {retry_after}s")
+
+
+class _Waiter:
+    __slots__ = ("seq", "priority", "enqueued_at", "future", "granted")
+
+    def __init__(self, seq: int, priority: int, future: asyncio.Future):
+        self.seq = seq
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.future = future
+        self.granted = False
+
+
+class StageLimiter:
+    """
+    Bounded in-flight work plus a bounded waiting queue for one stage.
+
+    acquire() reserves a place without blocking and raises Overloaded when
+    there is none, then waits (asynchronously) until an in-flight slot is
+    granted. The slot is then held until run() returns, normally on the worker
+    thread doing the work, or until release() when the work never started.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, initial_service_time: float = 1.0,
+                 aging_seconds: float = SCHEDULER_AGING_SECONDS):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.aging_seconds = aging_seconds
+        self._lock = threading.Lock()  # released from worker threads as well as the event loop
+        self._waiting = []
+        self._seq = count()
+        self._running = 0
+        self._service_time = initial_service_time  # EWMA, seconds
+        self._completed = 0
+        self._rejected = 0
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely get a slot at the current service rate."""
+        with self._lock:
+            rate = self.max_in_flight / max(self._service_time, 1e-3)  # requests per second
+            return max(1, min(_MAX_RETRY_AFTER, math.ceil((len(self._waiting) + 1) / rate)))
+
+    def _effective(self, waiter: _Waiter, now: float) -> tuple:
+        aged = int((now - waiter.enqueued_at) / self.aging_seconds) if self.aging_seconds > 0 else 0
+        return (max(0, waiter.priority - aged), waiter.seq)
+
+    async def acquire(self, urgency: str = "low"):
+        """Take an in-flight slot, waiting behind more urgent requests; raises Overloaded when full."""
+        with self._lock:
+            if self._running < self.max_in_flight and not self._waiting:
+                self._running += 1
+                return
+            full = self._running + len(self._waiting) >= self.max_in_flight + self.max_queue
+            if full:
+                self._rejected += 1
+            else:
+                level = urgency if urgency in PRIORITIES else "low"
+                waiter = _Waiter(next(self._seq), PRIORITIES.index(level), asyncio.get_running_loop().create_future())
+                self._waiting.append(waiter)
+        if full:
+            raise Overloaded(self.name, self.retry_after())
+        try:
+            await waiter.future
+        except BaseException:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiting.remove(waiter)
+            if granted:  # The slot arrived as the request went away; pass it on
+                self.release()
+            raise
+
+    def release(self, elapsed: float = None):
+        """Give the slot back and hand it to the next waiter. elapsed updates the service time estimate."""
+        with self._lock:
+            if elapsed is not None:
+                self._completed += 1
+                self._service_time += _EWMA_ALPHA * (elapsed - self._service_time)
+            if not self._waiting:
+                self._running -= 1
+                return
+            now = time.monotonic()
+            waiter = min(self._waiting, key=lambda w: self._effective(w, now))
+            self._waiting.remove(waiter)
+            waiter.granted = True  # The slot moves to the waiter; _running stays the same
+        future = waiter.future
+        future.get_loop().call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn in the slot acquire() granted, then release it (timing the call)."""
+        started = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self._running,
+                "waiting": len(self._waiting),
+                "waiting_by_urgency": {level: sum(1 for w in self._waiting if w.priority == i)
+                                       for i, level in enumerate(PRIORITIES)},
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue,
+                "service_time_ms": round(self._service_time * 1000, 2),
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+text_stage = StageLimiter("text", TEXT_MAX_IN_FLIGHT, TEXT_MAX_QUEUE, initial_service_time=0.05)
+image_stage = StageLimiter("image", IMAGE_MAX_IN_FLIGHT, IMAGE_MAX_QUEUE)
+
+
+def stage_for(report_data: dict) -> StageLimiter:
+    return image_stage if report_data.get("image_bytes") else text_stage
+
+
+def stats() -> dict:
+    return {"text": text_stage.stats(), "image": image_stage.stats()}
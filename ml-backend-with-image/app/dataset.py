@@ -1,7 +1,12 @@
 import json
+import logging
 from pathlib import Path
 import os
 
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
 # Always resolve the dataset path relative to this file so that it works
 # no matter where the application is started from (repo root, service dir, etc.)
 BASE_DIR = Path(__file__).resolve().parent.parent  # points to ml-backend-with-image/
@@ -10,11 +15,10 @@ DATA_FILE = BASE_DIR / "data" / "dataset.jsonl"
 # Ensure data directory exists and log path on module load
 try:
     DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-    print(f"[INIT] Dataset file path: {DATA_FILE.absolute()}")
-    print(f"[INIT] Dataset file exists: {DATA_FILE.exists()}")
-    print(f"[INIT] Dataset directory writable: {os.access(DATA_FILE.parent, os.W_OK)}")
+    logger.info("Dataset file: %s (exists: %s, directory writable: %s)",
+                DATA_FILE.absolute(), DATA_FILE.exists(), os.access(DATA_FILE.parent, os.W_OK))
 except Exception as e:
-    print(f"[ERROR] Failed to create data directory: {str(e)}")
+    logger.error("Failed to create data directory: %s", e)
 
 
 def save_report(report_dict: dict):
@@ -23,9 +27,6 @@ def save_report(report_dict: dict):
         # Ensure directory exists
         DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
         
-        # Get absolute path for logging
-        abs_path = DATA_FILE.absolute()
-        
         # Clean report_dict - remove non-serializable data
         clean_report = {}
         for key, value in report_dict.items():
@@ -39,34 +40,26 @@ def save_report(report_dict: dict):
             except (TypeError, ValueError):
                 # If not serializable, convert to string representation
                 clean_report[key] = str(value)
-                print(f"[WARNING] Converted non-serializable value for key '{key}' to string")
+                logger.warning("Converted non-serializable value for key '%s' to string", key)
         
         # Write to file
-        with DATA_FILE.open("a", encoding="utf8") as f:
+        with metrics.timed("dataset_write"), DATA_FILE.open("a", encoding="utf8") as f:
             json_str = json.dumps(clean_report, ensure_ascii=False)
             f.write(json_str + "\n")
             f.flush()  # Force write to disk
             os.fsync(f.fileno())  # Ensure data is written to disk
         
-        # Verify file was written
-        if DATA_FILE.exists():
-            file_size = DATA_FILE.stat().st_size
-            print(f"[DEBUG] Report saved to dataset: {clean_report.get('report_id', 'unknown')}")
-            print(f"[DEBUG] Dataset file: {abs_path} (size: {file_size} bytes)")
-            print(f"[DEBUG] Report status: {clean_report.get('status', 'unknown')}, accept: {clean_report.get('accept', 'unknown')}")
-        else:
-            print(f"[ERROR] Dataset file does not exist after write: {abs_path}")
+        # Verify file was written (extra stat() only when debugging)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Report %s saved to dataset %s (size: %s bytes, status: %s, accept: %s)",
+                         clean_report.get('report_id', 'unknown'), DATA_FILE.absolute(), DATA_FILE.stat().st_size,
+                         clean_report.get('status', 'unknown'), clean_report.get('accept', 'unknown'))
         
     except PermissionError as e:
-        print(f"[ERROR] Permission denied writing to dataset file: {str(e)}")
-        print(f"[ERROR] File path: {DATA_FILE.absolute()}")
-        print(f"[ERROR] Directory writable: {os.access(DATA_FILE.parent, os.W_OK)}")
+        logger.error("Permission denied writing to dataset file %s (directory writable: %s): %s",
+                     DATA_FILE.absolute(), os.access(DATA_FILE.parent, os.W_OK), e)
         raise
     except Exception as e:
-        print(f"[ERROR] Failed to save report to dataset: {str(e)}")
-        print(f"[ERROR] File path: {DATA_FILE.absolute()}")
-        print(f"[ERROR] Report data keys: {list(report_dict.keys())}")
-        print(f"[ERROR] Report ID: {report_dict.get('report_id', 'unknown')}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Failed to save report %s to dataset %s: %s",
+                         report_dict.get('report_id', 'unknown'), DATA_FILE.absolute(), e)
         raise
@@ -0,0 +1,163 @@
+# Idempotent resubmission: cache final results by report_id + content digest.
+#
+# Callers retry timed-out submissions with the same report_id. Without this
+# every retry re-runs the pipeline and can even reject itself as a duplicate
+# of its own first attempt. A retry that arrives while the first attempt is
+# still running waits for it (single-flight); one that arrives afterwards gets
+# the cached result straight away.
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "600"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# How long a retry waits for the in-flight attempt before running on its own
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "120"))
+
+# Only final answers are cached; "error" results are transient and re-run
+_CACHEABLE_STATUSES = ("accepted", "rejected")
+
+
+def request_key(report_data: dict) -> tuple:
+    """(report_id, digest of everything that affects the result)."""
+    digest = hashlib.blake2b(digest_size=16)
+    fields = [report_data.get(k) for k in ("description", "user_id", "latitude", "longitude")]
+    digest.update(json.dumps(fields).encode("utf8"))
+    image = report_data.get("image_bytes")
+    if image:
+        digest.update(image)
+    return (report_data.get("report_id"), digest.hexdigest())
+
+
+class Flight:
+    """One in-progress computation; retries with the same key wait on it."""
+
+    def __init__(self):
+        self.result = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._futures = []  # asyncio futures of coroutines in wait_async()
+
+    def wait(self, timeout: float = IDEMPOTENCY_WAIT_SECONDS) -> Optional[dict]:
+        """The leader's result, or None if it failed or took longer than timeout."""
+        self._done.wait(timeout)
+        return dict(self.result) if self.result is not None else None
+
+    async def wait_async(self, timeout: float = IDEMPOTENCY_WAIT_SECONDS) -> Optional[dict]:
+        """wait() for coroutines: waits on the event loop instead of holding a thread."""
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            if self._done.is_set():
+                future.set_result(None)
+            else:
+                self._futures.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if future in self._futures:
+                    self._futures.remove(future)
+        return dict(self.result) if self.result is not None else None
+
+    def _complete(self):
+        with self._lock:
+            self._done.set()
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.get_loop().call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+
+class ResultCache:
+    """Bounded LRU of final results with a TTL, plus the table of in-flight keys."""
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_MAX_ENTRIES, ttl: float = IDEMPOTENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, result)
+        self._in_flight = {}  # key -> Flight
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def begin(self, key: tuple):
+        """
+        Returns (cached_result, None, False) on a hit. Otherwise (None, flight,
+        owner): the owner computes the result and must call finish() (or
+        abandon()); everyone else should flight.wait() (or await flight.wait_async()) for it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if time.monotonic() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(result), None, False
+                del self._entries[key]
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return None, flight, False
+            self.misses += 1
+            flight = self._in_flight[key] = Flight()
+            return None, flight, True
+
+    def finish(self, key: tuple, flight: Flight, result: dict):
+        with self._lock:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+            if isinstance(result, dict) and result.get("status") in _CACHEABLE_STATUSES:
+                flight.result = dict(result)
+                self._entries[key] = (time.monotonic(), flight.result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        flight._complete()
+
+    def abandon(self, key: tuple, flight: Flight):
+        """The leader failed; release followers (they get None and run themselves)."""
+        with self._lock:
+            if self._in_flight.get(key) is flight:
+                del self._in_flight[key]
+        flight._complete()
+
+    def get_or_compute(self, report_data: dict, compute):
+        """Blocking helper: cached result, the in-flight attempt's result, or compute(report_data)."""
+        key = request_key(report_data)
+        cached, flight, owner = self.begin(key)
+        if cached is not None:
+            return cached
+        if not owner:
+            result = flight.wait()
+            return result if result is not None else compute(report_data)
+        try:
+            result = compute(report_data)
+        except BaseException:
+            self.abandon(key, flight)
+            raise
+        self.finish(key, flight, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "in_flight": len(self._in_flight),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "misses": self.misses,
+            }
+
+
+# Shared by the synchronous endpoints and the async job workers
+result_cache = ResultCache()
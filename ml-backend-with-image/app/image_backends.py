@@ -0,0 +1,190 @@
+# Image classifier backends, selected with IMAGE_BACKEND (see image_classifier).
+#
+# A backend turns decoded RGB images and text labels into comparable vectors:
+#   load()                           load weights / sessions; raises if unavailable
+#   encode_labels(labels)            label embeddings, computed once per rules version
+#   embed_images(images)             one embedding per PIL image (a batch)
+#   score_labels(image_features, label_features)
+#                                    similarity matrix, shape (n_images, n_labels)
+# image_classifier picks the argmax label per image.
+#
+#   clip   HuggingFace CLIPModel on torch (default)
+#   onnx   the same CLIP model exported to ONNX, run with onnxruntime (no torch)
+#   stub   deterministic, fast stand-in driven by image statistics; needs no
+#          network or weights, so every pipeline path runs offline and in CI
+#
+# Heavy packages are imported in load(), so importing this module is cheap.
+import hashlib
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # points to ml-backend-with-image/
+CLIP_MODEL_NAME = os.getenv("CLIP_MODEL_NAME", "openai/clip-vit-base-patch32")
+# Directory with image_encoder.onnx and text_encoder.onnx (get_image_features /
+# get_text_features exported from CLIP_MODEL_NAME) and optionally its tokenizer files
+ONNX_MODEL_DIR = Path(os.getenv("ONNX_MODEL_DIR", str(BASE_DIR / "models" / "clip-onnx")))
+
+
+def _normalize(features: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(features, axis=-1, keepdims=True)
+    return features / np.maximum(norms, 1e-12)
+
+
+class ImageBackend(ABC):
+    """
+    Interface every backend implements (see the module comment). A subclass
+    missing one of the abstract methods cannot be instantiated, so an incomplete
+    backend fails in create_backend() rather than on the first image.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def load(self):
+        ...
+
+    @abstractmethod
+    def encode_labels(self, labels):
+        ...
+
+    @abstractmethod
+    def embed_images(self, images):
+        ...
+
+    def score_labels(self, image_features, label_features) -> np.ndarray:
+        """Cosine similarity of each image to each label (both sides are normalised)."""
+        return np.asarray(image_features @ label_features.T)
+
+
+class TorchClipBackend(ImageBackend):
+    name = "clip"
+
+    def __init__(self, model_name: str = CLIP_MODEL_NAME):
+        self.model_name = model_name
+        self.model = None
+        self.processor = None
+
+    def load(self):
+        from transformers import CLIPModel, CLIPProcessor
+        self.model = CLIPModel.from_pretrained(self.model_name)
+        self.processor = CLIPProcessor.from_pretrained(self.model_name)
+
+    def encode_labels(self, labels):
+        import torch
+        with torch.no_grad():
+            inputs = self.processor(text=list(labels), return_tensors="pt", padding=True)
+            features = self.model.get_text_features(**inputs)
+            return features / features.norm(dim=-1, keepdim=True)
+
+    def embed_images(self, images):
+        import torch
+        with torch.no_grad():
+            inputs = self.processor(images=list(images), return_tensors="pt")
+            features = self.model.get_image_features(**inputs)
+            return features / features.norm(dim=-1, keepdim=True)
+
+    def score_labels(self, image_features, label_features) -> np.ndarray:
+        import torch
+        with torch.no_grad():
+            return (image_features @ label_features.T).cpu().numpy()
+
+
+class OnnxClipBackend(ImageBackend):
+    name = "onnx"
+
+    # CLIPProcessor image preprocessing
+    IMAGE_SIZE = 224
+    MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+    STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+
+    def __init__(self, model_dir: Path = ONNX_MODEL_DIR):
+        self.model_dir = Path(model_dir)
+        self.image_session = None
+        self.text_session = None
+        self.tokenizer = None
+
+    def load(self):
+        import onnxruntime
+        from transformers import CLIPTokenizer
+
+        providers = ["CPUExecutionProvider"]
+        self.image_session = onnxruntime.InferenceSession(str(self.model_dir / "image_encoder.onnx"), providers=providers)
+        self.text_session = onnxruntime.InferenceSession(str(self.model_dir / "text_encoder.onnx"), providers=providers)
+        tokenizer_source = self.model_dir if (self.model_dir / "tokenizer_config.json").exists() else CLIP_MODEL_NAME
+        self.tokenizer = CLIPTokenizer.from_pretrained(str(tokenizer_source))
+
+    def _preprocess(self, image) -> np.ndarray:
+        """Resize the short side to IMAGE_SIZE (bicubic), centre crop, scale and normalise; returns CHW."""
+        from PIL import Image
+
+        size = self.IMAGE_SIZE
+        scale = size / min(image.size)
+        image = image.resize((max(size, round(image.width * scale)), max(size, round(image.height * scale))), Image.BICUBIC)
+        left, top = (image.width - size) // 2, (image.height - size) // 2
+        pixels = np.asarray(image.crop((left, top, left + size, top + size)), dtype=np.float32) / 255.0
+        return ((pixels - self.MEAN) / self.STD).transpose(2, 0, 1)
+
+    def encode_labels(self, labels):
+        tokens = self.tokenizer(list(labels), padding=True, return_tensors="np")
+        feeds = {i.name: tokens[i.name].astype(np.int64) for i in self.text_session.get_inputs()}
+        return _normalize(self.text_session.run(None, feeds)[0])
+
+    def embed_images(self, images):
+        batch = np.stack([self._preprocess(image) for image in images])
+        return _normalize(self.image_session.run(None, {self.image_session.get_inputs()[0].name: batch})[0])
+
+
+class StubBackend(ImageBackend):
+    """
+    Embeds simple image statistics (channel means and spread, edge strength,
+    a 4x4 brightness grid) and scores them against pseudo-random unit vectors
+    seeded by each label's text. The same image always gets the same label and
+    different images spread over the labels; the labels carry no meaning.
+    """
+
+    name = "stub"
+    GRID = 4
+    DIM = 8 + GRID * GRID
+
+    def load(self):
+        pass
+
+    def encode_labels(self, labels):
+        vectors = [np.random.default_rng(int.from_bytes(hashlib.sha256(label.encode("utf8")).digest()[:8], "little"))
+                   .standard_normal(self.DIM) for label in labels]
+        return _normalize(np.array(vectors, dtype=np.float32))
+
+    def embed_images(self, images):
+        from PIL import Image
+
+        side = self.GRID * 4
+        rows = []
+        for image in images:
+            pixels = np.asarray(image.resize((side, side), Image.BILINEAR), dtype=np.float32) / 255.0
+            luminance = pixels.mean(axis=2)
+            grid = luminance.reshape(self.GRID, 4, self.GRID, 4).mean(axis=(1, 3)).ravel()
+            edges = [np.abs(np.diff(luminance, axis=1)).mean(), np.abs(np.diff(luminance, axis=0)).mean()]
+            rows.append(np.concatenate([pixels.mean(axis=(0, 1)) - 0.5, pixels.std(axis=(0, 1)), edges, grid - 0.5]))
+        return _normalize(np.array(rows, dtype=np.float32))
+
+
+BACKENDS = {
+    TorchClipBackend.name: TorchClipBackend,
+    OnnxClipBackend.name: OnnxClipBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def register_backend(name: str, factory):
+    """Make another backend selectable with IMAGE_BACKEND=name (factory() returns an ImageBackend)."""
+    BACKENDS[name] = factory
+
+
+def create_backend(name: str) -> ImageBackend:
+    factory = BACKENDS.get(name)
+    if factory is None:
+        raise ValueError(f"Unknown image backend '{name}' (available: {', '.join(sorted(BACKENDS))})")
+    return factory()
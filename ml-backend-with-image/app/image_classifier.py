@@ -1,107 +1,119 @@
-# Lightweight CLIP-based image classifier with safe fallbacks.
-from PIL import Image
-import requests
+# Zero-shot image classifier (CLIP by default, see IMAGE_BACKEND) with safe fallbacks.
+#
+# PIL, requests, torch and transformers are imported inside the functions that
+# use them, so importing this module is cheap. IMAGE_MODE decides when the
+# image stack is loaded:
+#   eager     import PIL/imagehash and load the backend at startup (default)
+#   lazy      load them on the first request that carries an image
+#   disabled  never load them; requests with images are refused (text-only pods)
 import io
+import logging
+import os
 import threading
 
-_clip_lock = threading.Lock()
-_clip_model = None
-_clip_processor = None
-_available = False
+from app import image_backends, metrics
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MODE = os.getenv("IMAGE_MODE", "eager").strip().lower()
+if IMAGE_MODE not in ("eager", "lazy", "disabled"):
+    logger.warning("Unknown IMAGE_MODE '%s', using 'eager'", IMAGE_MODE)
+    IMAGE_MODE = "eager"
 
-def initialize_clip():
-    global _clip_model, _clip_processor, _available
+# Which model classifies images (see app/image_backends.py): clip (default), onnx or stub
+IMAGE_BACKEND = os.getenv("IMAGE_BACKEND", "clip").strip().lower()
+
+_backend_lock = threading.RLock()  # initialize_backend() also runs under _ensure_backend()
+_backend = None
+_available = False
+_load_attempted = False
+
+
+def _default_labels():
+    """CLIP zero-shot candidate labels from the active rules config (config/rules.json)."""
+    from app import rules
+    return list(rules.current().candidate_labels)
+
+
+def initialize_backend():
+    """Load the IMAGE_BACKEND model. If it cannot be loaded, every image is classified as 'other'."""
+    global _backend, _available, _load_attempted
+    with _backend_lock:
+        try:
+            backend = image_backends.create_backend(IMAGE_BACKEND)
+            backend.load()
+        except Exception as e:
+            # No network, weights or packages: continue with the fallback
+            logger.warning("Image backend '%s' unavailable, images will be classified as 'other': %s", IMAGE_BACKEND, e)
+            _backend, _available = None, False
+        else:
+            _backend, _available = backend, True
+            logger.info("Image backend '%s' loaded", IMAGE_BACKEND)
+        # Only now: _ensure_backend() callers that see it set must see the outcome above
+        _load_attempted = True
+
+def images_enabled() -> bool:
+    return IMAGE_MODE != "disabled"
+
+
+def load_image_stack():
+    """Import PIL/imagehash and load the image backend now rather than on the first image (IMAGE_MODE=eager)."""
+    from PIL import Image  # noqa: F401
+    import imagehash  # noqa: F401
+    initialize_backend()
+
+
+def _ensure_backend():
+    """Load the backend on first use. A lazy load also recompiles the rules so label embeddings are cached."""
+    if _load_attempted:
+        return
+    with _backend_lock:
+        # Concurrent first images wait here for the load instead of falling back to 'other'
+        if _load_attempted:
+            return
+        initialize_backend()
+    if _available and IMAGE_MODE == "lazy":
+        from app import rules
+        rules.reload_in_background()
+
+
+def encode_labels(labels):
+    """
+    Normalised label embeddings from the image backend, or None if it is not loaded.
+    The label set is fixed per rules version, so these are computed once at
+    rules compile time instead of re-encoding every label for every image.
+    """
+    if not _available or _backend is None:
+        return None
     try:
-        from transformers import CLIPProcessor, CLIPModel
-        _clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        _clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-        _available = True
+        return _backend.encode_labels(list(labels))
     except Exception as e:
-        # Failed to load CLIP (no internet or packages). Continue with fallback.
-        _available = False
+        logger.error("Failed to encode image labels: %s", e)
+        return None
+
+
+def _best_labels(images, candidate_labels, text_features=None) -> list:
+    """Argmax label per decoded image. text_features: precomputed encode_labels(candidate_labels)."""
+    if text_features is None or len(text_features) != len(candidate_labels):
+        text_features = _backend.encode_labels(candidate_labels)
+    scores = _backend.score_labels(_backend.embed_images(images), text_features)  # shape (num_images, num_labels)
+    return [candidate_labels[int(best)] for best in scores.argmax(axis=1)]
 
 def classify_image(image_url: str, candidate_labels=None) -> str:
     """Return best matching label from candidate_labels or 'other' on failure.
-    CLIP model is loaded lazily (on first use) to save memory.
+    The image backend is loaded lazily (on first use) to save memory.
     DEPRECATED: Use classify_image_from_bytes instead.
     """
-    # Lazy load CLIP model if not already loaded
-    global _clip_model, _clip_processor, _available
-    if not _available and _clip_model is None:
-        with _clip_lock:
-            if not _available and _clip_model is None:
-                initialize_clip()
+    # Lazy load the image backend if not already loaded
+    _ensure_backend()
     
     if candidate_labels is None:
-        candidate_labels = [
-     "road", "pothole", "crack", "broken road", "damaged road",
-        "road caved", "road sinking", "uneven road",
-        "traffic", "traffic jam", "congestion",
-        "signal", "traffic signal", "junction", "crossroad",
-        "accident", "collision", "crash", "hit",
-        "speed breaker", "speed bump", "divider",
-        "footpath", "sidewalk", "zebra crossing", "pedestrian",
-
-        "garbage", "trash", "waste", "dump", "dumping",
-        "garbage pile", "waste pile",
-        "dirty", "filthy", "unclean",
-        "bad smell", "toxic smell", "foul smell",
-        "dustbin", "overflowing bin",
-        "sanitation", "sewage", "sewer", "manhole",
-
-        # DEAD ANIMAL (strict & safe)
-        "dead", "dead animal", "animal carcass",
-        "dead dog", "dead cat", "dead cow",
-        "dead body",
-
-        "mosquito", "flies", "infection", "disease",
-
-        "water", "no water", "low pressure",
-        "drinking water", "contaminated water",
-        "leak", "leakage", "pipe leak",
-        "pipe burst", "broken pipe",
-        "drain", "drainage", "blocked drain",
-        "overflow", "overflowing drain",
-        "flood", "waterlogging", "stagnant water",
-        "sewage water", "rain water",
-
-        "electricity", "electric", "power",
-        "no power", "power cut", "power outage",
-        "wire", "cable", "pole", "electric pole",
-        "transformer", "meter",
-        "short circuit", "spark",
-        "electrocution", "electric shock",
-        "live wire",
-
-        "streetlight", "street light", "lamp",
-        "lamp post", "pole light",
-        "not working", "broken light",
-        "flickering", "dim light",
-        "dark", "dark area", "no lighting",
-
-         "fire", "smoke", "burning",
-        "gas", "gas leak", "cylinder leak",
-        "collapse", "building collapse",
-        "wall collapse", "roof falling",
-        "crime", "theft", "robbery",
-        "violence", "fight", "assault",
-        "hazard", "danger", "unsafe",
-        "emergency", "life risk",
-
-        "park", "garden", "playground",
-        "children park", "public park",
-        "bench", "swing", "slide",
-        "walking track",
-        "tree", "fallen tree", "tree fallen",
-        "lawn", "grass", "maintenance",
-        "broken fence"
-]
-
+        candidate_labels = _default_labels()
 
     if not image_url:
         return "other"
 
-    # If CLIP not available, use heuristic keywords from URL
+    # If no backend is available, use heuristic keywords from URL
     if not _available:
         url = image_url.lower()
         for lbl in candidate_labels:
@@ -110,105 +122,83 @@ def classify_image(image_url: str, candidate_labels=None) -> str:
         return "other"
 
     try:
+        import requests
+        from PIL import Image
+
         resp = requests.get(image_url, timeout=5)
         resp.raise_for_status()
         image = Image.open(io.BytesIO(resp.content)).convert("RGB")
-        inputs = _clip_processor(text=candidate_labels, images=image, return_tensors="pt", padding=True)
-        outputs = _clip_model(**inputs)
-        logits_per_image = outputs.logits_per_image  # shape (1, num_labels)
-        probs = logits_per_image.softmax(dim=1)
-        best = int(probs.argmax().item())
-        return candidate_labels[best]
+        return _best_labels([image], list(candidate_labels))[0]
     except Exception:
         return "other"
 
 
-def classify_image_from_bytes(image_bytes: bytes, candidate_labels=None) -> str:
+def classify_image_from_bytes(image_bytes: bytes, candidate_labels=None, text_features=None) -> str:
     """Return best matching label from candidate_labels or 'other' on failure.
     Works with image bytes directly (no URL required).
-    CLIP model is loaded lazily (on first use) to save memory.
+    The image backend is loaded lazily (on first use) to save memory.
+    text_features: optional precomputed encode_labels(candidate_labels); when given
+    only the image is encoded.
     """
-    # Lazy load CLIP model if not already loaded
-    global _clip_model, _clip_processor, _available
-    if not _available and _clip_model is None:
-        with _clip_lock:
-            if not _available and _clip_model is None:
-                initialize_clip()
+    # Lazy load the image backend if not already loaded
+    _ensure_backend()
     
     if candidate_labels is None:
-        candidate_labels = [
-            "road", "pothole", "crack", "broken road", "damaged road",
-            "road caved", "road sinking", "uneven road",
-            "traffic", "traffic jam", "congestion",
-            "signal", "traffic signal", "junction", "crossroad",
-            "accident", "collision", "crash", "hit",
-            "speed breaker", "speed bump", "divider",
-            "footpath", "sidewalk", "zebra crossing", "pedestrian",
-            "garbage", "trash", "waste", "dump", "dumping",
-            "garbage pile", "waste pile",
-            "dirty", "filthy", "unclean",
-            "bad smell", "toxic smell", "foul smell",
-            "dustbin", "overflowing bin",
-            "sanitation", "sewage", "sewer", "manhole",
-            "dead", "dead animal", "animal carcass",
-            "dead dog", "dead cat", "dead cow",
-            "dead body",
-            "mosquito", "flies", "infection", "disease",
-            "water", "no water", "low pressure",
-            "drinking water", "contaminated water",
-            "leak", "leakage", "pipe leak",
-            "pipe burst", "broken pipe",
-            "drain", "drainage", "blocked drain",
-            "overflow", "overflowing drain",
-            "flood", "waterlogging", "stagnant water",
-            "sewage water", "rain water",
-            "electricity", "electric", "power",
-            "no power", "power cut", "power outage",
-            "wire", "cable", "pole", "electric pole",
-            "transformer", "meter",
-            "short circuit", "spark",
-            "electrocution", "electric shock",
-            "live wire",
-            "streetlight", "street light", "lamp",
-            "lamp post", "pole light",
-            "not working", "broken light",
-            "flickering", "dim light",
-            "dark", "dark area", "no lighting",
-            "fire", "smoke", "burning",
-            "gas", "gas leak", "cylinder leak",
-            "collapse", "building collapse",
-            "wall collapse", "roof falling",
-            "crime", "theft", "robbery",
-            "violence", "fight", "assault",
-            "hazard", "danger", "unsafe",
-            "emergency", "life risk",
-            "park", "garden", "playground",
-            "children park", "public park",
-            "bench", "swing", "slide",
-            "walking track",
-            "tree", "fallen tree", "tree fallen",
-            "lawn", "grass", "maintenance",
-            "broken fence"
-        ]
+        candidate_labels = _default_labels()
 
     if not image_bytes:
         return "other"
 
-    # If CLIP not available, cannot classify from bytes (no URL to parse)
+    # If no backend is available, cannot classify from bytes (no URL to parse)
     if not _available:
         return "other"
 
     try:
+        from PIL import Image
+
         # Open image directly from bytes
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        inputs = _clip_processor(text=candidate_labels, images=image, return_tensors="pt", padding=True)
-        outputs = _clip_model(**inputs)
-        logits_per_image = outputs.logits_per_image  # shape (1, num_labels)
-        probs = logits_per_image.softmax(dim=1)
-        best = int(probs.argmax().item())
-        return candidate_labels[best]
+        with metrics.timed("image_decode"):
+            image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+        with metrics.timed("clip"):
+            return _best_labels([image], list(candidate_labels), text_features)[0]
     except Exception as e:
-        print(f"[ERROR] Image classification failed: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Image classification failed: %s", e)
         return "other"
+
+
+def classify_images_from_bytes(images, candidate_labels=None, text_features=None) -> list:
+    """Batched classify_image_from_bytes: one backend forward pass for many images.
+    Returns one label per input ('other' for images that are empty or fail to decode).
+    """
+    _ensure_backend()
+
+    if candidate_labels is None:
+        candidate_labels = _default_labels()
+
+    labels = ["other"] * len(images)
+    if not _available:
+        return labels
+
+    from PIL import Image
+
+    decoded, positions = [], []
+    with metrics.timed("image_decode"):
+        for i, image_bytes in enumerate(images):
+            if not image_bytes:
+                continue
+            try:
+                decoded.append(Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+                positions.append(i)
+            except Exception as e:
+                logger.error("Failed to decode image %s in batch: %s", i, e)
+    if not decoded:
+        return labels
+
+    try:
+        with metrics.timed("clip"):
+            best = _best_labels(decoded, list(candidate_labels), text_features)
+        for i, label in zip(positions, best):
+            labels[i] = label
+    except Exception as e:
+        logger.exception("Batch image classification failed: %s", e)
+    return labels
@@ -0,0 +1,239 @@
+# In-process asynchronous job queue for report classification.
+#
+# POST /submit?async=true (or with a callback_url) enqueues the report and
+# returns 202 with a job id straight away; worker threads run the pipeline and
+# the result is available from GET /jobs/{id} and, optionally, POSTed to the
+# caller's callback URL. Jobs live in memory only and are lost on restart.
+import ipaddress
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "1000"))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "3600"))  # Finished jobs are kept this long
+JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "10"))
+JOB_CALLBACK_RETRIES = int(os.getenv("JOB_CALLBACK_RETRIES", "3"))
+# Queued + running jobs allowed per admission stage (text / image, see app/admission.py),
+# so a burst of image jobs gets 503 like synchronous requests instead of filling the queue
+JOB_MAX_PENDING = {
+    "text": int(os.getenv("JOB_MAX_PENDING_TEXT", str(JOB_QUEUE_SIZE))),
+    "image": int(os.getenv("JOB_MAX_PENDING_IMAGE", "64")),
+}
+# Callbacks are delivered on their own threads so slow receivers never hold a job worker
+JOB_CALLBACK_WORKERS = int(os.getenv("JOB_CALLBACK_WORKERS", "2"))
+# Comma-separated hostnames callbacks may target. Empty allows any http(s) host
+# that resolves to public addresses only; listed hosts skip that check (e.g. an
+# internal service or localhost in development)
+JOB_CALLBACK_ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if h.strip()}
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at JOB_QUEUE_SIZE or a stage has JOB_MAX_PENDING jobs."""
+
+
+def _non_public_address(hostname: str, port: int) -> Optional[str]:
+    """The first address hostname resolves to that is not publicly routable, else None."""
+    try:
+        infos = socket.getaddrinfo(hostname, port, proto=socket.IPPROTO_TCP)
+    except socket.gaierror:
+        raise ValueError(f"'callback_url' host '{hostname}' cannot be resolved")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%", 1)[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            return str(address)
+    return None
+
+
+def check_callback_host(url: str):
+    """
+    Refuse callbacks to loopback, private, link-local (cloud metadata) and other
+    non-public addresses unless the host is in JOB_CALLBACK_ALLOWED_HOSTS.
+    Checked when the job is submitted and again right before each delivery.
+    """
+    parsed = urlparse(url)
+    hostname = parsed.hostname.lower()
+    if hostname in JOB_CALLBACK_ALLOWED_HOSTS:
+        return
+    if JOB_CALLBACK_ALLOWED_HOSTS:
+        raise ValueError(f"'callback_url' host '{parsed.hostname}' is not allowed")
+    address = _non_public_address(hostname, parsed.port or (443 if parsed.scheme == "https" else 80))
+    if address is not None:
+        raise ValueError(f"'callback_url' host '{parsed.hostname}' resolves to non-public address {address}")
+
+
+def validate_callback_url(url: Optional[str]) -> Optional[str]:
+    """Return the callback URL if it is an allowed http(s) URL, else raise ValueError."""
+    if not url:
+        return None
+    parsed = urlparse(url.strip())
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("'callback_url' must be an absolute http(s) URL")
+    check_callback_host(url.strip())
+    return url.strip()
+
+
+class Job:
+    def __init__(self, report_data: dict, callback_url: Optional[str] = None, stage: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.report_id = report_data.get("report_id")
+        self.report_data = report_data
+        self.callback_url = callback_url
+        self.stage = stage
+        self.status = "queued"  # queued -> running -> done | failed
+        self.result = None
+        self.error = None
+        self.callback_status = "pending" if callback_url else None  # pending -> delivered | rejected | refused | failed
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "report_id": self.report_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "callback_url": self.callback_url,
+            "callback_status": self.callback_status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    """
+    FIFO job queue served by a fixed pool of daemon worker threads.
+    handler(report_data) -> result dict is the synchronous classification call.
+    Callbacks go to a separate pool of callback_workers threads.
+    """
+
+    def __init__(self, handler: Callable[[dict], dict], workers: int = JOB_WORKERS,
+                 max_queued: int = JOB_QUEUE_SIZE, ttl: float = JOB_TTL_SECONDS,
+                 callback_workers: int = JOB_CALLBACK_WORKERS, max_pending: dict = None):
+        self.handler = handler
+        self.max_pending = dict(JOB_MAX_PENDING if max_pending is None else max_pending)
+        self._pending = {}  # stage -> queued + running jobs
+        self.workers = workers
+        self.callback_workers = callback_workers
+        self._callbacks = None  # ThreadPoolExecutor, started with the workers
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = OrderedDict()  # job id -> Job, in creation order
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._callbacks = ThreadPoolExecutor(max_workers=self.callback_workers, thread_name_prefix="job-callback")
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, report_data: dict, callback_url: Optional[str] = None, stage: Optional[str] = None) -> Job:
+        """Queue a job; stage names its admission stage for the JOB_MAX_PENDING limit."""
+        self._ensure_workers()
+        self._evict_expired()
+        job = Job(report_data, callback_url, stage)
+        with self._lock:
+            limit = self.max_pending.get(stage)
+            if limit is not None and self._pending.get(stage, 0) >= limit:
+                raise QueueFull(f"Too many pending {stage} jobs ({limit})")
+            self._pending[stage] = self._pending.get(stage, 0) + 1
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+                self._pending[stage] -= 1
+            raise QueueFull(f"Job queue is full ({self._queue.maxsize} jobs)")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list:
+        """Snapshot of the jobs held: queued, running and finished within the TTL, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _evict_expired(self):
+        """Drop finished jobs older than the TTL (oldest first)."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = self.handler(job.report_data)
+                job.status = "done"
+            except Exception as e:
+                logger.exception("Job %s (report %s) failed: %s", job.id, job.report_id, e)
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.report_data = None  # Release the image bytes
+                job.finished_at = time.time()
+                with self._lock:
+                    self._pending[job.stage] -= 1
+                self._queue.task_done()
+            if job.callback_url:
+                self._callbacks.submit(self._deliver_callback, job)
+
+    def _deliver_callback(self, job: Job):
+        """POST the finished job to its callback URL, retrying with backoff."""
+        import requests
+
+        for attempt in range(JOB_CALLBACK_RETRIES):
+            try:
+                check_callback_host(job.callback_url)  # DNS may have changed since submission
+            except ValueError as e:
+                logger.warning("Callback for job %s refused: %s", job.id, e)
+                job.callback_status = "refused"
+                return
+            try:
+                # No redirects: a public endpoint must not bounce the POST to an internal one
+                response = requests.post(job.callback_url, json=job.to_dict(), timeout=JOB_CALLBACK_TIMEOUT,
+                                         allow_redirects=False)
+                if response.status_code < 500:
+                    job.callback_status = "delivered" if response.ok else f"rejected ({response.status_code})"
+                    return
+                logger.warning("Callback for job %s returned %s", job.id, response.status_code)
+            except Exception as e:
+                logger.warning("Callback for job %s failed: %s", job.id, e)
+            time.sleep(2 ** attempt)
+        job.callback_status = "failed"
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            pending = {stage: {"pending": self._pending.get(stage, 0), "max_pending": limit}
+                       for stage, limit in self.max_pending.items()}
+        return {"queued": self._queue.qsize(), "max_queued": self._queue.maxsize, "stages": pending,
+                "workers": self.workers, "callback_workers": self.callback_workers, "jobs": counts}
@@ -1,59 +1,111 @@
-from fastapi import FastAPI, HTTPException, Request, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, Request, File, UploadFile, Form, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as StarletteUploadFile
 from typing import Optional
-import traceback
+import asyncio
+import hmac
+import logging
 import os
 import sys
 import json
+import threading
+
+from app import startup
+from app.logging_config import setup_logging
+
+# Structured logging through a background writer thread (LOG_LEVEL, LOG_FORMAT)
+with startup.phase("logging"):
+    setup_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize app first - this must work
-app = FastAPI(title="Civic ML Backend API", version="1.0.0")
+with startup.phase("app"):
+    app = FastAPI(title="Civic ML Backend API", version="1.0.0")
 
 # Try to import ML modules - make them optional so app can start even if they fail
 classify_report = None
+classify_reports = None
 ml_available = False
 
+with startup.phase("service_modules"):
+    from app import admission, jobs, memory, metrics, tracing
+    from app.idempotency import request_key, result_cache
+    from app.image_classifier import IMAGE_BACKEND, IMAGE_MODE, images_enabled
+    from app.scheduler import image_stage
+    from app.text_rules import detect_urgency
+    from app.models import ReportRequest
+    from app.uploads import (
+        MAX_IMAGE_SIZE, BodySizeLimitMiddleware, decode_base64_image, image_buffers, read_upload_limited
+    )
+
 try:
-    from app.pipeline import classify_report, initialize_models
+    with startup.phase("ml_modules"):
+        from app.pipeline import classify_report, classify_reports, initialize_models
     ml_available = True
-    print("[OK] ML modules loaded successfully")
+    logger.info("ML modules loaded successfully")
     # Initialize ML models (CLIP, etc.) on startup
-    print("Initializing ML models...")
+    logger.info("Initializing ML models...")
     try:
-        initialize_models()
-        print("[OK] ML models initialized successfully")
+        with startup.phase("models"):
+            initialize_models()
+        logger.info("ML models initialized successfully")
     except Exception as init_error:
-        print(f"[WARN] ML model initialization failed (will use fallback): {init_error}")
+        logger.warning("ML model initialization failed (will use fallback): %s", init_error)
         ml_available = False
 except Exception as e:
-    print(f"[WARN] ML modules not available (non-critical): {e}")
-    print("[WARN] API will return default responses")
+    logger.warning("ML modules not available (non-critical): %s", e)
+    logger.warning("API will return default responses")
+
+# Hot-reloadable label/keyword rules (config/rules.json); SIGHUP triggers a background reload
+rules_config = None
+try:
+    from app import rules as rules_config
+    with startup.phase("rules"):
+        sighup = rules_config.install_sighup_handler()
+    if sighup:
+        logger.info("SIGHUP reloads rules config")
+except Exception as e:
+    logger.warning("Rules config not available: %s", e)
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+MAX_BATCH_REPORTS = int(os.getenv("MAX_BATCH_REPORTS", "500"))
+
+# Largest request bodies we will read: a max-size image plus room for the other fields
+MAX_SUBMIT_BODY = MAX_IMAGE_SIZE + 64 * 1024
+MAX_JSON_BODY = MAX_IMAGE_SIZE * 4 // 3 + 64 * 1024  # base64 inflates by 4/3
+MAX_BATCH_LINE = MAX_JSON_BODY  # one NDJSON batch line: a /submit-json body
+MAX_BATCH_BODY = int(os.getenv("MAX_BATCH_BODY", str(64 * 1024 * 1024)))
 
 # Log startup information
-print("=" * 50)
-print("ML Backend API Starting...")
-print(f"Python version: {sys.version}")
-print(f"Working directory: {os.getcwd()}")
-print(f"ML Available: {ml_available}")
-print("=" * 50)
+logger.info("ML Backend API starting (Python %s, working directory %s, ML available: %s)",
+            sys.version.split()[0], os.getcwd(), ml_available)
 
 # CORS configuration - SIMPLIFIED AND RELIABLE
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allow all origins
-    allow_credentials=False,  # CRITICAL: Must be False when using "*"
-    allow_methods=["*"],  # Allow all HTTP methods
-    allow_headers=["*"],  # Allow all headers
-    expose_headers=["*"],  # Expose all headers
-    max_age=3600,  # Cache preflight for 1 hour
-)
+with startup.phase("middleware"):
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Allow all origins
+        allow_credentials=False,  # CRITICAL: Must be False when using "*"
+        allow_methods=["*"],  # Allow all HTTP methods
+        allow_headers=["*"],  # Allow all headers
+        expose_headers=["*"],  # Expose all headers
+        max_age=3600,  # Cache preflight for 1 hour
+    )
+
+    # Oversized uploads are cut off while streaming in, before multipart parsing spools them
+    app.add_middleware(BodySizeLimitMiddleware, limits={
+        "/submit": MAX_SUBMIT_BODY, "/submit-json": MAX_JSON_BODY, "/submit/batch": MAX_BATCH_BODY,
+    })
+
+    # "X-Debug-Timing: 1" on a request adds a Server-Timing breakdown to its response
+    app.add_middleware(tracing.ServerTimingMiddleware)
 
-print("=" * 50)
-print("CORS Configuration:")
-print("  allow_origins: ['*'] (all origins)")
-print("  allow_credentials: False")
-print("=" * 50)
+logger.info("CORS configuration: allow_origins=['*'] (all origins), allow_credentials=False")
+logger.info("Startup phases (seconds): %s", startup.phases())
 
 @app.get("/")
 def health():
@@ -62,7 +114,249 @@ def health():
 @app.get("/health")
 def health_check():
     """Health check endpoint for Render"""
-    return {"status": "healthy", "service": "ML Backend", "ml_available": ml_available}
+    return {"status": "healthy", "service": "ML Backend", "ml_available": ml_available, "image_mode": IMAGE_MODE,
+            "image_backend": IMAGE_BACKEND}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Per-stage latency histograms and decision counters (Prometheus text format)"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+def require_admin(request: Request):
+    """Dependency for admin-only endpoints: requires X-Admin-Token == ADMIN_TOKEN."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.get("/admin/rules", dependencies=[Depends(require_admin)])
+def rules_status():
+    """Active rules config version and reload state"""
+    if rules_config is None:
+        raise HTTPException(status_code=503, detail="Rules config not available")
+    return rules_config.status()
+
+@app.post("/admin/reload", dependencies=[Depends(require_admin)])
+async def reload_rules(wait: bool = False):
+    """
+    Rebuild matchers, lookup tables and CLIP label embeddings from the rules file.
+    Runs in the background (202) unless wait=true. Requests in flight keep the
+    snapshot they started with; the new one is swapped in atomically when complete.
+    """
+    if rules_config is None:
+        raise HTTPException(status_code=503, detail="Rules config not available")
+    if wait:
+        try:
+            compiled = await run_in_threadpool(rules_config.reload)
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Rules reload failed: {str(e)}")
+        return {"status": "reloaded", "version": compiled.version}
+    rules_config.reload_in_background()
+    return JSONResponse(status_code=202, content={"status": "reloading", "current_version": rules_config.current().version})
+
+@app.get("/admin/queues", dependencies=[Depends(require_admin)])
+def queue_status():
+    """Admission limits, async job queue, image stage scheduler and result cache stats"""
+    return {
+        "admission": admission.stats(),
+        "jobs": job_queue.stats(),
+        "image_stage": image_stage.stats(),
+        "result_cache": result_cache.stats(),
+    }
+
+@app.get("/admin/startup", dependencies=[Depends(require_admin)])
+def startup_status():
+    """Time spent in each init phase when this process started"""
+    return {"phases": startup.phases()}
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+def memory_status(top: int = Query(20, ge=1, le=200), group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$")):
+    """RSS, bytes held by each cache/index/model, and tracemalloc top sites and diff (when tracing)"""
+    return {
+        "rss_bytes": memory.rss_bytes(),
+        "components": memory.component_sizes({"jobs": job_queue.jobs()}),
+        "tracemalloc": memory.allocation_report(top, group_by),
+    }
+
+@app.post("/admin/memory/tracemalloc/start", dependencies=[Depends(require_admin)])
+def start_tracemalloc(frames: int = Query(1, ge=1, le=50)):
+    """Start tracing allocations; the current state becomes the diff baseline"""
+    return memory.start_tracing(frames)
+
+@app.post("/admin/memory/tracemalloc/snapshot", dependencies=[Depends(require_admin)])
+def snapshot_tracemalloc():
+    """Take a new diff baseline"""
+    try:
+        return memory.take_baseline()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/admin/memory/tracemalloc/stop", dependencies=[Depends(require_admin)])
+def stop_tracemalloc():
+    return memory.stop_tracing()
+
+def require_image_support():
+    """Refuse images on instances started with IMAGE_MODE=disabled (text-only pods)"""
+    if not images_enabled():
+        raise HTTPException(
+            status_code=503,
+            detail="This instance does not process images (IMAGE_MODE=disabled); resubmit without the image or to an image-enabled instance"
+        )
+
+def error_result(report_id: str, reason: str) -> dict:
+    """Error response body (returned with 200 so callers can handle it like a rejection)"""
+    return {
+        "report_id": report_id,
+        "accept": False,
+        "status": "error",
+        "category": "Other",
+        "confidence": 0.0,
+        "reason": reason
+    }
+
+def ensure_result_fields(result, report_id: str) -> dict:
+    """Make sure a classify_report result has every required response key"""
+    if not isinstance(result, dict):
+        raise ValueError(f"classify_report returned non-dict: {type(result)}")
+    result.setdefault('report_id', report_id)
+    result.setdefault('accept', False)
+    result.setdefault('status', 'error')
+    result.setdefault('category', 'Other')
+    result.setdefault('confidence', 0.0)
+    return result
+
+def run_classification(report_data: dict) -> dict:
+    """Run the ML pipeline on validated report data and normalise the response"""
+    report_id = report_data["report_id"]
+    image_bytes = report_data.get('image_bytes')
+    logger.debug("Starting ML classification: report_id=%s, image_bytes=%s",
+                 report_id, len(image_bytes) if image_bytes else 0)
+
+    try:
+        result = classify_report(report_data)
+        logger.info("ML classification complete: report_id=%s, status=%s, category=%s, confidence=%s",
+                    report_id, result.get('status'), result.get('category'), result.get('confidence'))
+        
+        # Ensure result has all required fields
+        return ensure_result_fields(result, report_id)
+    except Exception as ml_error:
+        logger.exception("classify_report failed for report %s: %s", report_id, ml_error)
+        # Return error response with 200 status (not 500) so frontend can handle it
+        return error_result(report_id, f"ML classification error: {str(ml_error)}")
+
+async def run_admitted(report_data: dict, on_finished=None) -> dict:
+    """
+    Run classification in the threadpool under its stage's admission limits
+    (text-only vs image). Requests wait for a slot on the event loop, most
+    urgent first, and only then take a threadpool thread. Answers 503 with
+    Retry-After when the stage is full.
+
+    Retries of a report (same report_id and content) get the cached result, or
+    wait for the attempt still in flight, without being admitted again.
+
+    on_finished: called once nothing uses report_data any more - by the worker
+    thread after classification, even if this request was cancelled meanwhile,
+    or here when no classification was started. The stage slot is handed back
+    the same way, so a disconnected client's slot stays taken while its
+    classification is still running.
+    """
+    # Whoever gets here first owns the slot and on_finished: the worker (once it starts) or this coroutine
+    handover = threading.Lock()
+    worker_started = False
+    given_up = False
+    stage = None
+
+    def classify():
+        nonlocal worker_started
+        with handover:
+            if given_up:  # Request ended before the thread got to run
+                return None
+            worker_started = True
+        try:
+            return stage.run(run_classification, report_data)
+        finally:
+            if on_finished is not None:
+                on_finished()
+
+    try:
+        key = request_key(report_data)
+        cached, flight, owner = result_cache.begin(key)
+        tracing.note("result_cache", "hit" if cached is not None else "miss" if owner else "coalesced")
+        if cached is not None:
+            logger.debug("Returning cached result for report %s", report_data.get('report_id'))
+            return cached
+        if not owner:
+            logger.debug("Waiting for in-flight attempt of report %s", report_data.get('report_id'))
+            result = await flight.wait_async()
+            if result is not None:
+                return result
+
+        candidate = admission.stage_for(report_data)
+        tracing.note("admission", candidate.name)
+        try:
+            await candidate.acquire(detect_urgency(report_data.get('description') or ""))
+            stage = candidate
+            result = await run_in_threadpool(classify)
+        except admission.Overloaded as e:
+            if owner:
+                result_cache.abandon(key, flight)
+            logger.warning("Rejecting report %s: %s", report_data.get('report_id'), e)
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        except BaseException:
+            if owner:
+                result_cache.abandon(key, flight)
+            raise
+        if owner:
+            result_cache.finish(key, flight, result)
+        return result
+    finally:
+        with handover:
+            given_up = not worker_started
+        if given_up:
+            if stage is not None:
+                stage.release()
+            if on_finished is not None:
+                on_finished()
+
+# Async mode: reports are classified by background workers, results polled or sent to a callback
+job_queue = jobs.JobQueue(lambda report_data: result_cache.get_or_compute(report_data, run_classification))
+
+def enqueue_job(report_data: dict, callback_url: Optional[str]) -> JSONResponse:
+    """
+    Queue report_data for background classification and answer 202 with the job id.
+    Answers 503 when the queue, or the pending jobs of the report's admission stage, are full.
+    """
+    stage = admission.stage_for(report_data)
+    try:
+        job = job_queue.submit(report_data, callback_url, stage=stage.name)
+    except jobs.QueueFull as e:
+        logger.warning("Refusing job for report %s: %s", report_data.get('report_id'), e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    logger.info("Queued job %s for report %s", job.id, job.report_id)
+    status_url = f"/jobs/{job.id}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job.id, "report_id": job.report_id, "status": job.status, "status_url": status_url},
+        headers={"Location": status_url},
+    )
+
+async def check_callback_url(callback_url: Optional[str]) -> Optional[str]:
+    """Validate callback_url; the host lookup runs in the threadpool, off the event loop"""
+    if not callback_url:
+        return None
+    try:
+        return await run_in_threadpool(jobs.validate_callback_url, callback_url)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Validation error: {str(e)}")
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status of an async job; "result" holds the /submit response once status is "done"."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found (unknown or expired)")
+    return job.to_dict()
 
 @app.options("/submit")
 async def submit_options():
@@ -76,7 +370,9 @@ async def submit_report(
     user_id: Optional[str] = Form(None, description="Optional user identifier"),
     latitude: Optional[str] = Form(None, description="Optional latitude as string (e.g., '37.7749')"),
     longitude: Optional[str] = Form(None, description="Optional longitude as string (e.g., '-122.4194')"),
-    image: Optional[UploadFile] = File(None, description="Optional image file (JPEG, PNG, etc.)")
+    image: Optional[UploadFile] = File(None, description="Optional image file (JPEG, PNG, etc.)"),
+    callback_url: Optional[str] = Form(None, description="Optional URL that receives the result (implies async mode)"),
+    async_mode: bool = Query(False, alias="async", description="Return 202 with a job id instead of waiting for the result")
 ):
     """
     Submit a report for ML validation and classification.
@@ -88,11 +384,13 @@ async def submit_report(
     - latitude (optional, string): Latitude coordinate (-90 to 90), will be converted to float
     - longitude (optional, string): Longitude coordinate (-180 to 180), will be converted to float
     - image (optional, file): Image file (JPEG, PNG, etc.)
+    - callback_url (optional, string): URL the finished job is POSTed to (implies async mode)
     
-    Returns a JSON response with classification results.
+    Returns a JSON response with classification results. With ?async=true (or a
+    callback_url) it returns 202 with a job id instead; poll GET /jobs/{job_id}.
     """
     try:
-        print(f"Received ML validation request: report_id={report_id}, description_length={len(description or '')}")
+        logger.debug("Received ML validation request: report_id=%s, description_length=%s", report_id, len(description or ''))
         
         # Validate required fields with clear error messages
         if not report_id or not report_id.strip():
@@ -110,6 +408,7 @@ async def submit_report(
         report_id = report_id.strip()
         description = description.strip()
         user_id = user_id.strip() if user_id else None
+        callback_url = await check_callback_url(callback_url)
         
         # Validate and convert latitude
         latitude_float = None
@@ -149,30 +448,17 @@ async def submit_report(
         
         # Read and validate image file if provided
         image_bytes = None
-        MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
         if image:
+            require_image_support()
             try:
-                # Check content type if available (informational only, not strict)
-                if image.content_type:
-                    allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp']
-                    if image.content_type not in allowed_types:
-                        print(f"Warning: Unexpected content type '{image.content_type}', continuing anyway")
-                
-                # Read image with size limit
-                image_bytes = await image.read()
-                if len(image_bytes) > MAX_IMAGE_SIZE:
-                    raise HTTPException(
-                        status_code=422,
-                        detail=f"Validation error: Image file too large. Maximum size is {MAX_IMAGE_SIZE / (1024*1024):.1f}MB, got {len(image_bytes) / (1024*1024):.1f}MB"
-                    )
-                if len(image_bytes) == 0:
-                    raise HTTPException(
-                        status_code=422,
-                        detail="Validation error: Image file is empty"
-                    )
-                print(f"Received image: {len(image_bytes)} bytes, content_type: {image.content_type}")
+                # Read image in chunks; aborts as soon as it passes MAX_IMAGE_SIZE. The file
+                # signature decides whether it is an image, not the declared content type
+                image_bytes = await read_upload_limited(image, MAX_IMAGE_SIZE)
+                logger.debug("Received image: %s bytes, content_type: %s", len(image_bytes), image.content_type)
             except HTTPException:
                 raise
+            except ValueError as e:  # ImageTooLarge, UnsupportedImageType, empty file
+                raise HTTPException(status_code=422, detail=f"Validation error: {str(e)}")
             except Exception as e:
                 raise HTTPException(
                     status_code=422,
@@ -189,52 +475,16 @@ async def submit_report(
             "longitude": longitude_float
         }
         
+        if async_mode or callback_url:
+            return enqueue_job(report_data, callback_url)
+
         # Classify the report using ML
-        print("Starting ML classification...")
-        print(f"Report data keys: {list(report_data.keys())}")
-        print(f"Has image_bytes: {bool(report_data.get('image_bytes'))}")
-        if report_data.get('image_bytes'):
-            print(f"Image bytes size: {len(report_data.get('image_bytes'))} bytes")
-        
-        try:
-            result = classify_report(report_data)
-            print(f"ML classification complete: status={result.get('status')}, category={result.get('category')}, confidence={result.get('confidence')}")
-            
-            # Ensure result has all required fields
-            if not isinstance(result, dict):
-                raise ValueError(f"classify_report returned non-dict: {type(result)}")
-            
-            # Ensure result has required keys
-            if 'report_id' not in result:
-                result['report_id'] = report_id
-            if 'accept' not in result:
-                result['accept'] = False
-            if 'status' not in result:
-                result['status'] = 'error'
-            if 'category' not in result:
-                result['category'] = 'Other'
-            if 'confidence' not in result:
-                result['confidence'] = 0.0
-            
-            return result
-        except Exception as ml_error:
-            print(f"ERROR in classify_report: {str(ml_error)}")
-            print(traceback.format_exc())
-            # Return error response with 200 status (not 500) so frontend can handle it
-            return {
-                "report_id": report_id,
-                "accept": False,
-                "status": "error",
-                "category": "Other",
-                "confidence": 0.0,
-                "reason": f"ML classification error: {str(ml_error)}"
-            }
+        return await run_admitted(report_data)
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"ERROR in submit_report: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("submit_report failed: %s", e)
         # Return error response with 200 status (not 500) so frontend can handle it
         error_report_id = report_id if 'report_id' in locals() else "unknown"
         return {
@@ -245,3 +495,274 @@ async def submit_report(
             "confidence": 0.0,
             "reason": f"ML processing error: {str(e)}"
         }
+
+
+# ------------------------------------
+# JSON submission
+# ------------------------------------
+@app.options("/submit-json")
+async def submit_json_options():
+    """Handle CORS preflight requests"""
+    return {"status": "ok"}
+
+@app.post(
+    "/submit-json",
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": ReportRequest.model_json_schema()}}}},
+)
+async def submit_report_json(
+    request: Request,
+    async_mode: bool = Query(False, alias="async", description="Return 202 with a job id instead of waiting for the result")
+):
+    """
+    Submit a report as JSON (see models.ReportRequest), with the image as base64.
+
+    The body is read with a hard cap, the image size is checked from the encoded
+    length before any decoding, and the base64 is decoded exactly once, chunk by
+    chunk, into a pooled buffer that is reused by later requests.
+    Returns the same response as /submit, including async mode.
+    """
+    body = await request.body()  # Capped at MAX_JSON_BODY by BodySizeLimitMiddleware
+    try:
+        payload = ReportRequest.model_validate_json(body)
+    except ValueError as e:  # pydantic ValidationError subclasses ValueError
+        raise HTTPException(status_code=422, detail=f"Validation error: {str(e)}")
+    del body
+    callback_url = await check_callback_url(payload.callback_url)
+
+    image_bytes, buffer = None, None
+    if payload.image_base64:
+        require_image_support()
+        try:
+            image_bytes, buffer = decode_base64_image(payload.image_base64, MAX_IMAGE_SIZE, pool=image_buffers)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Validation error: {str(e)}")
+        payload.image_base64 = None  # Drop the encoded copy as soon as it is decoded
+        logger.debug("Received image: %s bytes (base64)", len(image_bytes))
+
+    report_data = {
+        "report_id": payload.report_id,
+        "description": payload.description,
+        "user_id": payload.user_id.strip() if payload.user_id else None,
+        "image_bytes": image_bytes,
+        "latitude": payload.latitude,
+        "longitude": payload.longitude
+    }
+    if async_mode or callback_url:
+        # The job outlives this request, so it gets its own copy rather than the pooled buffer
+        report_data["image_bytes"] = bytes(image_bytes) if image_bytes is not None else None
+        image_buffers.release(buffer)
+        return enqueue_job(report_data, callback_url)
+    image_bytes = None
+    if buffer is None:
+        return await run_admitted(report_data)
+
+    def release_buffer():
+        # Runs once classification is over, not when this request ends: a
+        # cancelled request can leave a worker thread still reading the image
+        report_data["image_bytes"] = None
+        image_buffers.release(buffer)
+    return await run_admitted(report_data, on_finished=release_buffer)
+
+
+# ------------------------------------
+# Batch submission
+# ------------------------------------
+def _batch_item_to_report(item, images=None) -> dict:
+    """
+    Validate one batch item (same fields as ReportRequest) and build report data.
+    images: multipart parts by name, referenced from an item's "image" key.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("each report must be a JSON object")
+    fields = {k: v for k, v in item.items() if k != "image"}
+    request_model = ReportRequest(**fields)
+    if (request_model.image_base64 or item.get("image")) and not images_enabled():
+        raise ValueError(f"this instance does not process images (IMAGE_MODE={IMAGE_MODE})")
+    image_bytes = None
+    if request_model.image_base64:
+        image_bytes, _ = decode_base64_image(request_model.image_base64)
+    elif item.get("image") and images is not None:
+        image_bytes = images.get(item["image"])
+        if image_bytes is None:
+            raise ValueError(f"image part '{item['image']}' not found")
+    return {
+        "report_id": request_model.report_id,
+        "description": request_model.description,
+        "user_id": request_model.user_id.strip() if request_model.user_id else None,
+        "image_bytes": image_bytes,
+        "latitude": request_model.latitude,
+        "longitude": request_model.longitude
+    }
+
+async def _read_batch_ndjson(request: Request):
+    """
+    Parse an NDJSON body (one report per line, images as image_base64) as it streams in.
+    Each chunk is scanned once for newlines. A line longer than MAX_BATCH_LINE is
+    discarded as it arrives and reported as an error item.
+    """
+    reports, errors = [], []
+    line = bytearray()
+    oversized = False
+    position = 0
+
+    def handle(data: bytes):
+        if not data.strip():
+            return
+        item = {}
+        try:
+            item = json.loads(data)
+            reports.append(_batch_item_to_report(item))
+        except Exception as e:
+            report_id = item.get("report_id") if isinstance(item, dict) else None
+            errors.append(error_result(report_id or f"line-{position}", f"Validation error: {str(e)}"))
+
+    def end_line():
+        nonlocal oversized
+        if oversized:
+            errors.append(error_result(f"line-{position}", f"Validation error: line longer than {MAX_BATCH_LINE} bytes"))
+            oversized = False
+        else:
+            handle(bytes(line))
+        line.clear()
+        if len(reports) + len(errors) > MAX_BATCH_REPORTS:
+            raise HTTPException(status_code=413, detail=f"Batch too large. Maximum is {MAX_BATCH_REPORTS} reports")
+
+    def append(segment: bytes):
+        nonlocal oversized
+        if oversized:
+            return
+        if len(line) + len(segment) > MAX_BATCH_LINE:
+            oversized = True
+            line.clear()
+        else:
+            line.extend(segment)
+
+    async for chunk in request.stream():
+        start = 0
+        newline = chunk.find(b"\n")
+        while newline != -1:
+            append(chunk[start:newline])
+            position += 1
+            end_line()
+            start = newline + 1
+            newline = chunk.find(b"\n", start)
+        append(chunk[start:])
+    if line or oversized:
+        position += 1
+        end_line()
+    return reports, errors
+
+async def _read_batch_multipart(request: Request):
+    """
+    Parse a multipart batch: a `reports` field with a JSON array of report objects,
+    plus one file part per image, referenced by name from each object's "image" key.
+    """
+    form = await request.form(max_files=MAX_BATCH_REPORTS, max_fields=MAX_BATCH_REPORTS + 10)
+    try:
+        items = json.loads(form.get("reports") or "[]")
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Validation error: 'reports' must be a JSON array: {str(e)}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="Validation error: 'reports' must be a JSON array")
+    if len(items) > MAX_BATCH_REPORTS:
+        raise HTTPException(status_code=413, detail=f"Batch too large. Maximum is {MAX_BATCH_REPORTS} reports")
+
+    images = {}
+    for name, value in form.multi_items():
+        if isinstance(value, StarletteUploadFile):
+            try:
+                images[name] = await read_upload_limited(value, MAX_IMAGE_SIZE)
+            except ValueError:
+                images[name] = None
+
+    reports, errors = [], []
+    for position, item in enumerate(items):
+        try:
+            if isinstance(item, dict) and item.get("image") in images and images[item["image"]] is None:
+                raise ValueError(f"image part '{item['image']}' is empty, not an image or larger than {MAX_IMAGE_SIZE // (1024*1024)}MB")
+            reports.append(_batch_item_to_report(item, images))
+        except Exception as e:
+            report_id = item.get("report_id") if isinstance(item, dict) else None
+            errors.append(error_result(report_id or f"item-{position}", f"Validation error: {str(e)}"))
+    return reports, errors
+
+@app.post("/submit/batch")
+async def submit_batch(request: Request):
+    """
+    Submit many reports in one request.
+
+    Accepts either:
+    - application/x-ndjson: one JSON object per line with the /submit-json fields
+      (report_id, description, user_id, latitude, longitude, image_base64)
+    - multipart/form-data: a `reports` field holding a JSON array of the same objects,
+      where an object's "image" key names the file part carrying its image
+
+    Category detection runs vectorised and images go through batched CLIP inference,
+    chunk by chunk. Results stream back as NDJSON, one line per report, as each chunk
+    completes. Items that fail validation produce a status=error line first.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        reports, errors = await _read_batch_multipart(request)
+    else:
+        reports, errors = await _read_batch_ndjson(request)
+    logger.info("Received batch: %s valid reports, %s invalid", len(reports), len(errors))
+
+    # The whole batch takes one slot of its stage at low urgency, like a single report
+    stage = admission.image_stage if any(report.get("image_bytes") for report in reports) else admission.text_stage
+    tracing.note("admission", stage.name)
+    try:
+        await stage.acquire("low")
+    except admission.Overloaded as e:
+        logger.warning("Rejecting batch of %s reports: %s", len(reports), e)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    def results():
+        for error in errors:
+            yield json.dumps(error) + "\n"
+        if classify_reports is None:
+            for report in reports:
+                yield json.dumps(error_result(report["report_id"], "ML classification error: ML modules not available")) + "\n"
+            return
+        position = 0
+        try:
+            for result in classify_reports(reports):
+                result = ensure_result_fields(result, reports[position]["report_id"])
+                position += 1
+                yield json.dumps(result, default=str) + "\n"
+        except Exception as e:
+            logger.exception("classify_reports failed: %s", e)
+            for report in reports[position:]:
+                yield json.dumps(error_result(report["report_id"], f"ML classification error: {str(e)}")) + "\n"
+
+    # Classified on a thread of its own that holds the stage slot until the batch is done
+    # (or the client has gone), whether or not the response is ever streamed
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        def classify_batch():
+            batch = results()
+            try:
+                for line in batch:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(lines.put_nowait, line)
+            finally:
+                batch.close()
+        try:
+            stage.run(classify_batch)
+        finally:
+            loop.call_soon_threadsafe(lines.put_nowait, None)
+
+    threading.Thread(target=produce, name="batch-classifier", daemon=True).start()
+
+    async def stream():
+        try:
+            while (line := await lines.get()) is not None:
+                yield line
+        finally:
+            stop.set()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,179 @@
+# Memory diagnostics for the admin endpoints: byte sizes of the caches and
+# indexes this process keeps, and on-demand tracemalloc snapshots.
+#
+# tracemalloc is off unless started through POST /admin/memory/tracemalloc/start
+# (tracing slows every allocation down). While it runs, GET /admin/memory
+# returns the top allocation sites and the diff against the last baseline
+# snapshot. Component sizes are computed on request by walking the objects,
+# which takes a while for large indexes; nothing is tracked per request.
+import sys
+import threading
+import tracemalloc
+from collections import deque
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+
+_SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType,
+               type(threading.Lock()), type(threading.RLock()))
+
+
+def deep_sizeof(obj, exclude=()) -> int:
+    """
+    Approximate bytes held by obj and everything it references (each object
+    counted once). numpy arrays and torch tensors count their buffers (a view
+    counts its base once); modules, classes, functions and objects in
+    `exclude` are not followed.
+    """
+    seen = {id(o) for o in exclude}
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SKIP_TYPES):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item, 0)
+
+        nbytes = getattr(item, "nbytes", None)
+        if isinstance(nbytes, int) and hasattr(item, "dtype"):  # numpy array
+            # getsizeof already includes an owned buffer; a view's buffer belongs to its base
+            if getattr(item, "base", None) is not None:
+                stack.append(item.base)
+            continue
+        if hasattr(item, "element_size") and hasattr(item, "nelement"):  # torch tensor
+            total += item.element_size() * item.nelement()
+            continue
+        if isinstance(item, (str, bytes, bytearray, memoryview, int, float, bool)) or item is None:
+            continue
+        if isinstance(item, dict):
+            for key, value in list(item.items()):
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(list(item))
+        else:
+            attrs = getattr(item, "__dict__", None)
+            if attrs is not None:
+                stack.append(attrs)
+            for slot in getattr(type(item), "__slots__", ()):
+                if hasattr(item, slot):
+                    stack.append(getattr(item, slot))
+    return total
+
+
+def rss_bytes():
+    """Resident set size of this process (Linux /proc), or None."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def component_sizes(extra: dict = None) -> dict:
+    """Bytes held by each in-process cache, index and model. extra: more name -> object to size."""
+    from app import idempotency, metrics, storage
+    from app import image_classifier as ic
+    from app import pipeline
+    from app import rules as rules_config
+    from app.uploads import image_buffers
+
+    sizes = {}
+    if ic._backend is not None:
+        sizes["image_backend"] = deep_sizeof(ic._backend)
+    rules = rules_config.current()
+    text_features = getattr(rules, "text_features", None)
+    sizes["image_label_embeddings"] = deep_sizeof(text_features) if text_features is not None else 0
+    sizes["rules"] = deep_sizeof(rules, exclude=(text_features,) if text_features is not None else ())
+    # Under their locks: both are mutated in place by request threads
+    with storage._near_dup_lock:
+        sizes["near_dup_index"] = deep_sizeof(storage._near_dup_index) if storage._near_dup_index is not None else 0
+    with idempotency.result_cache._lock:
+        sizes["result_cache"] = deep_sizeof(idempotency.result_cache._entries)
+    sizes["upload_buffers"] = image_buffers.nbytes()
+    sizes["text_model"] = deep_sizeof(pipeline._text_model) if pipeline._text_model is not None else 0
+    sizes["metrics"] = deep_sizeof(metrics._registry)
+    for name, obj in (extra or {}).items():
+        sizes[name] = deep_sizeof(obj)
+    return sizes
+
+
+# ------------------------------------
+# tracemalloc
+# ------------------------------------
+_lock = threading.Lock()
+_baseline = None
+
+# Allocations made by tracemalloc itself and the import system are noise here
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+def start_tracing(frames: int = 1) -> dict:
+    """Start tracemalloc (if needed) and take a baseline snapshot."""
+    global _baseline
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _baseline = _snapshot()
+    return tracing_status()
+
+
+def take_baseline() -> dict:
+    """Replace the baseline snapshot that diffs are computed against."""
+    global _baseline
+    with _lock:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        _baseline = _snapshot()
+    return tracing_status()
+
+
+def stop_tracing() -> dict:
+    global _baseline
+    with _lock:
+        tracemalloc.stop()
+        _baseline = None
+    return tracing_status()
+
+
+def tracing_status() -> dict:
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit(), "traced_bytes": current,
+            "traced_peak_bytes": peak, "has_baseline": _baseline is not None}
+
+
+def _site(traceback) -> str:
+    return " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in traceback)
+
+
+def allocation_report(limit: int = 20, group_by: str = "lineno") -> dict:
+    """Top allocation sites now, and the biggest changes since the baseline."""
+    status = tracing_status()
+    if not status["tracing"]:
+        return status
+    snapshot = _snapshot()
+    report = {
+        **status,
+        "top": [{"site": _site(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics(group_by)[:limit]],
+    }
+    with _lock:
+        baseline = _baseline
+    if baseline is not None:
+        report["diff"] = [{"site": _site(stat.traceback), "size_bytes": stat.size,
+                           "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+                          for stat in snapshot.compare_to(baseline, group_by)[:limit]]
+    return report
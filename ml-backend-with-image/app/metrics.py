@@ -0,0 +1,192 @@
+# Per-stage latency histograms and decision counters, exported in the
+# Prometheus text format from GET /metrics.
+#
+# Kept dependency-free: a histogram observation is a bucket search and three
+# additions under a lock, cheap enough to leave on for every request.
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from app import tracing
+
+# Seconds; spans fast text stages (sub-millisecond) up to cold CLIP runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, values)} {total:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ("le",)
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self.name}_bucket{_format_labels(names, values + (le,))} {cumulative}")
+                labels = _format_labels(self.label_names, values)
+                lines.append(f"{self.name}_sum{labels} {series[-1]:.6f}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def set(self, value: float, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, values)} {value:g}")
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+stage_seconds = Histogram(
+    "civic_ml_stage_seconds",
+    "Time spent in each classify_report stage.",
+    ("stage",),
+)
+classify_seconds = Histogram(
+    "civic_ml_classify_seconds",
+    "End-to-end classify_report time by outcome.",
+    ("status",),
+)
+reports_total = Counter(
+    "civic_ml_reports_total",
+    "Classified reports by status and category.",
+    ("status", "category"),
+)
+rejections_total = Counter(
+    "civic_ml_rejections_total",
+    "Rejected reports by reason.",
+    ("reason",),
+)
+
+# Urgency scheduler (app/scheduler.py): high-urgency waits approaching low-urgency
+# ones, or a deep high queue, is priority inversion
+scheduler_wait_seconds = Histogram(
+    "civic_ml_scheduler_wait_seconds",
+    "Time reports waited for a scheduler slot, by urgency.",
+    ("stage", "urgency"),
+)
+scheduler_queue_depth = Gauge(
+    "civic_ml_scheduler_queue_depth",
+    "Reports currently waiting for a scheduler slot, by urgency.",
+    ("stage", "urgency"),
+)
+scheduler_promotions_total = Counter(
+    "civic_ml_scheduler_promotions_total",
+    "Waiters served at a higher priority than their urgency after aging.",
+    ("stage",),
+)
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record one stage duration in civic_ml_stage_seconds and the request's timing trace (if any)."""
+    stage_seconds.observe(seconds, stage)
+    tracing.record(stage, seconds)
+
+
+@contextmanager
+def timed(stage: str):
+    """Context manager timing one pipeline stage (see observe_stage)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+def reason_label(reason: str) -> str:
+    """Rejection reason without per-request details (error messages follow the first ':')."""
+    return (reason or "unknown").split(":", 1)[0].strip()
+
+
+def record_result(result: dict, seconds: float):
+    status = result.get("status", "unknown")
+    classify_seconds.observe(seconds, status)
+    tracing.record("classify", seconds)
+    reports_total.inc(status, result.get("category") or "Other")
+    if status == "rejected":
+        rejections_total.inc(reason_label(result.get("reason")))
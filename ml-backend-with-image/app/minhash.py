@@ -0,0 +1,127 @@
+# MinHash signatures + LSH banding index for near-duplicate text detection.
+import re
+import random
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional - fall back to pure Python hashing
+    np = None
+
+# Mersenne prime 2^31 - 1: keeps a * h + b below 2^62 so the numpy (uint64)
+# and pure Python paths produce identical signatures.
+_PRIME = (1 << 31) - 1
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_NON_WORD.sub(" ", (text or "").lower()).split())
+
+
+def shingles(text: str, size: int = 4) -> set:
+    """Character k-shingles of the normalised text (short texts become one shingle)."""
+    text = normalize_text(text)
+    if not text:
+        return set()
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def optimal_bands(threshold: float, num_perm: int) -> tuple[int, int]:
+    """
+    Pick (bands, rows) with bands * rows <= num_perm so that the LSH S-curve
+    threshold (1/bands) ** (1/rows) is as close as possible to `threshold`.
+    Ties favour more bands (better recall).
+    """
+    best = (num_perm, 1)
+    best_err = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        err = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+
+class MinHasher:
+    """Computes fixed-length MinHash signatures with a deterministic seed."""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 4, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._a = [rng.randint(1, _PRIME - 1) for _ in range(num_perm)]
+        self._b = [rng.randint(0, _PRIME - 1) for _ in range(num_perm)]
+        if np is not None:
+            self._a_np = np.array(self._a, dtype=np.uint64)
+            self._b_np = np.array(self._b, dtype=np.uint64)
+
+    def signature(self, text: str) -> tuple:
+        hashes = [zlib.crc32(s.encode("utf8")) % _PRIME for s in shingles(text, self.shingle_size)]
+        if not hashes:
+            return tuple([_PRIME] * self.num_perm)
+        if np is not None:
+            h = np.array(hashes, dtype=np.uint64)[:, None]
+            values = (h * self._a_np + self._b_np) % _PRIME
+            return tuple(int(v) for v in values.min(axis=0))
+        return tuple(
+            min((a * h + b) % _PRIME for h in hashes)
+            for a, b in zip(self._a, self._b)
+        )
+
+
+def estimate_jaccard(sig_a: tuple, sig_b: tuple) -> float:
+    """Fraction of agreeing MinHash positions - an unbiased Jaccard estimate."""
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class LSHIndex:
+    """
+    Banded LSH index over MinHash signatures, partitioned by category.
+    Each entry carries an arbitrary payload (e.g. the user id) so callers can
+    filter candidates. Queries only touch the buckets the signature hashes to,
+    so lookup cost does not grow with the number of indexed reports.
+    """
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 64, shingle_size: int = 4, seed: int = 1):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self._buckets = {}   # (category, band, band values) -> [entry ids]
+        self._entries = []   # entry id -> (signature, payload)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _band_keys(self, category: str, signature: tuple):
+        r = self.rows
+        for band in range(self.bands):
+            yield (category, band, signature[band * r:(band + 1) * r])
+
+    def add(self, description: str, category: str, payload=None):
+        signature = self.hasher.signature(description)
+        entry_id = len(self._entries)
+        self._entries.append((signature, payload))
+        for key in self._band_keys((category or "").lower(), signature):
+            self._buckets.setdefault(key, []).append(entry_id)
+
+    def query(self, description: str, category: str, threshold: float = None):
+        """Return [(payload, estimated_jaccard)] for entries at or above threshold."""
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.hasher.signature(description)
+        seen = set()
+        matches = []
+        for key in self._band_keys((category or "").lower(), signature):
+            for entry_id in self._buckets.get(key, ()):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                other_sig, payload = self._entries[entry_id]
+                similarity = estimate_jaccard(signature, other_sig)
+                if similarity >= threshold:
+                    matches.append((payload, similarity))
+        return matches
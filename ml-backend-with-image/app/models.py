@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, field_validator
 from typing import Optional
+from app.uploads import strip_data_uri, decoded_base64_length, MAX_IMAGE_SIZE, ImageTooLarge
 
 class ReportRequest(BaseModel):
     """
@@ -12,6 +13,7 @@ class ReportRequest(BaseModel):
     latitude: Optional[float] = Field(None, ge=-90, le=90, description="Latitude coordinate (-90 to 90)")
     longitude: Optional[float] = Field(None, ge=-180, le=180, description="Longitude coordinate (-180 to 180)")
     image_base64: Optional[str] = Field(None, description="Optional image file as base64-encoded string (data URI or plain base64)")
+    callback_url: Optional[str] = Field(None, description="Optional URL that receives the result (implies async mode)")
     
     @field_validator('report_id', 'description')
     @classmethod
@@ -24,25 +26,20 @@ class ReportRequest(BaseModel):
     @field_validator('image_base64')
     @classmethod
     def validate_image_base64(cls, v: Optional[str]) -> Optional[str]:
-        """Validate base64 image format"""
+        """
+        Cheap structural check of the base64 image: length and decoded size only.
+        The payload is decoded (and its alphabet validated) exactly once, by
+        uploads.decode_base64_image, when the report is processed.
+        """
         if v is None:
             return None
         if not v.strip():
             return None
         
-        # Remove data URI prefix if present (e.g., "data:image/jpeg;base64,")
-        image_data = v.strip()
-        if ',' in image_data:
-            image_data = image_data.split(',', 1)[1]
-        
-        # Validate base64 format
-        import base64
-        try:
-            # Try to decode to verify it's valid base64
-            base64.b64decode(image_data, validate=True)
-            return v  # Return original with prefix if it had one
-        except Exception:
-            raise ValueError('Invalid base64-encoded image data')
+        size = decoded_base64_length(strip_data_uri(v))  # Raises ValueError on bad length
+        if size > MAX_IMAGE_SIZE:
+            raise ImageTooLarge(size)
+        return v  # Return original with prefix if it had one
 
 # Legacy models - kept for backward compatibility
 class ReportFormFields(BaseModel):
@@ -1,130 +1,153 @@
-from app import storage, dataset
+from app import storage, dataset, metrics
 from app import image_classifier as ic
+from app import rules as rules_config
+from app.scheduler import image_stage
 from app.text_rules import (
     is_abusive,
     detect_category,
-    detect_urgency,
-    CATEGORY_KEYWORDS
+    detect_urgency
 )
 
 # Confidence threshold for category detection
 CATEGORY_CONFIDENCE_THRESHOLD = 0.1  # Minimum confidence to accept category (lowered to reduce false rejections)
+import logging
+import os
+import threading
+import time
 import warnings
 
+# Text category engine: "keyword" (rule-based text_rules.detect_category) or
+# "linear" (hashing-vectoriser model trained with `python -m app.text_model train`)
+TEXT_ENGINE = os.getenv("TEXT_ENGINE", "keyword").strip().lower()
+TEXT_MODEL_PATH = os.getenv("TEXT_MODEL_PATH", "")
+
 warnings.filterwarnings("ignore", category=UserWarning, message=".*pkg_resources.*")
 
+logger = logging.getLogger(__name__)
 
-# ------------------------------------
-# Image → Category reference (COMPREHENSIVE)
-# ------------------------------------
-IMAGE_TO_CATEGORY_MAP = {
-    "Road & Traffic": [
-        "pothole", "damaged road", "illegal parking", "broken footpath",
-        "traffic signal not working", "road accident", "road", "street", "traffic",
-        "speed breaker", "crosswalk", "footpath", "pavement", "crack", "broken road",
-        "road caved", "road sinking", "uneven road", "traffic jam", "congestion",
-        "signal", "junction", "crossroad", "accident", "collision", "crash", "hit",
-        "speed bump", "divider", "sidewalk", "zebra crossing", "pedestrian", "highway",
-        "bridge", "intersection", "pavement", "asphalt"
-    ],
-    "Garbage & Sanitation": [
-        "garbage dump", "overflowing dustbin", "open drain", "sewage overflow",
-        "dead animal", "toilet issue", "garbage", "trash", "waste", "bin",
-        "sanitation", "dirty", "sewage", "cleanliness", "dustbin", "dump", "dumping",
-        "garbage pile", "waste pile", "filthy", "unclean", "bad smell", "toxic smell",
-        "foul smell", "overflowing bin", "sewer", "manhole", "dead", "animal carcass",
-        "dead dog", "dead cat", "dead cow", "dead body", "mosquito", "flies", "infection", "disease"
-    ],
-    "Street Lighting": [
-        "streetlight not working", "fallen electric pole", "loose wire", "power outage",
-        "streetlight", "lamp", "bulb", "pole", "light", "electric pole",
-        "street lamp", "lighting", "dark area", "electricity", "power",
-        "broken streetlight", "non-working light", "flickering light", "dim light",
-        "street lighting", "outdoor lighting", "public lighting", "night lighting",
-        "lamp post", "pole light", "not working", "broken light", "flickering",
-        "dark", "no lighting", "illumination"
-    ],
-    "Water & Drainage": [
-        "waterlogging", "pipe burst", "no water supply", "drainage issue", "flood",
-        "drain", "drainage", "sewage", "sewer", "leak", "leaking", "leakage",
-        "pipe", "water", "overflow", "water supply", "drainage system",
-        "no water", "low pressure", "drinking water", "contaminated water",
-        "pipe leak", "broken pipe", "blocked drain", "overflowing drain",
-        "stagnant water", "sewage water", "rain water", "water pipe"
-    ],
-    "Parks & Recreation": [
-        "tree fallen", "illegal construction", "park maintenance", "encroachment",
-        "park", "garden", "playground", "tree", "bench", "grass", "lawn",
-        "recreation", "green space", "park area", "garden area", "flooded park",
-        "water in park", "park with water", "playground equipment", "walking path",
-        "fountain", "pond", "lake", "outdoor space", "public space",
-        "children park", "public park", "swing", "slide", "walking track",
-        "fallen tree", "broken fence", "garden bench"
-    ],
-    "Public Safety": [
-        "fire", "gas leak", "building collapse", "accident site",
-        "crime", "robbery", "theft", "violence", "hazard", "danger",
-        "safety", "harassment", "emergency", "accident", "smoke", "burning",
-        "gas", "cylinder leak", "collapse", "wall collapse", "roof falling",
-        "theft", "fight", "assault", "unsafe", "life risk", "explosion"
-    ],
-    "Electricity": [
-        "electric", "electricity", "power", "outage", "wire", "transformer",
-        "short circuit", "shock", "cable", "meter", "electrical", "voltage", "current",
-        "no power", "power cut", "pole", "electric pole", "spark",
-        "electrocution", "electric shock", "live wire", "power line"
-    ]
-}
-
-GENERIC_IMAGE_LABELS = {
-    "other", "outdoor", "outdoor space", "public space", "area", "scene", "general"
-}
+
+# Candidate image labels, category keywords and the image label → category
+# reference live in config/rules.json (see app/rules.py).
 
 
 # ------------------------------------
 # Model initialization
 # ------------------------------------
 def initialize_models():
-    """Initialize ML models (CLIP for image classification)"""
+    """Initialize ML models (CLIP for image classification unless IMAGE_MODE is lazy/disabled, linear text model if selected)"""
+    if ic.IMAGE_MODE == "eager":
+        try:
+            ic.load_image_stack()
+        except Exception as e:
+            logger.warning("Model initialization failed (will use fallback): %s", e)
+            pass
+    else:
+        logger.info("IMAGE_MODE=%s: image stack not loaded at startup", ic.IMAGE_MODE)
+    # Recompile rules so CLIP label embeddings are computed once, not per image
     try:
-        ic.initialize_clip()
+        rules_config.reload()
     except Exception as e:
-        print(f"Model initialization failed (will use fallback): {str(e)}")
-        pass
+        logger.warning("Rules compilation failed (keeping current rules): %s", e)
+    _get_text_model()
+
+
+# ------------------------------------
+# Text category engine selection
+# ------------------------------------
+_text_model_lock = threading.Lock()
+_text_model = None
+_text_model_loaded = False
+
+
+def _get_text_model():
+    """Load the linear text model once if TEXT_ENGINE=linear; None means use keywords."""
+    global _text_model, _text_model_loaded
+    if TEXT_ENGINE != "linear" or _text_model_loaded:
+        return _text_model
+    with _text_model_lock:
+        if not _text_model_loaded:
+            try:
+                from app import text_model
+                path = TEXT_MODEL_PATH or text_model.DEFAULT_MODEL_PATH
+                _text_model = text_model.LinearTextClassifier.load(path)
+                logger.info("Linear text engine loaded from %s", path)
+            except Exception as e:
+                logger.warning("Linear text engine unavailable, using keyword engine: %s", e)
+                _text_model = None
+            _text_model_loaded = True
+    return _text_model
+
+
+def detect_categories(descriptions, rules=None) -> list:
+    """Detect (category, confidence) for many descriptions with the configured engine."""
+    model = _get_text_model()
+    if model is not None:
+        return model.predict_batch(list(descriptions))
+    rules = rules or rules_config.current()
+    return [detect_category(d, rules) for d in descriptions]
 
 
 # ------------------------------------
 # Main pipeline (OPTIMIZED)
 # ------------------------------------
-def classify_report(report: dict):
+def classify_report(report: dict, rules=None, detected=None, image_label=None):
+    """
+    Validate and classify one report.
+    rules: rules snapshot to use (defaults to the active one).
+    detected / image_label: optional precomputed (category, confidence) and CLIP
+    label, used by classify_reports() to batch the expensive stages.
+    """
+    started = time.perf_counter()
+    result = _classify_report(report, rules, detected, image_label)
+    metrics.record_result(result, time.perf_counter() - started)
+    return result
+
+
+def _classify_report(report: dict, rules, detected, image_label):
     try:
+        # One rules snapshot for the whole request, even if a reload swaps rules meanwhile
+        # (inside the try: a rules failure becomes a rejection, not an exception)
+        rules = rules or rules_config.current()
         description = (report.get("description") or "").strip()
         if not description:
             return reject(report, "Description is required", confidence=0.0)
 
         # Category detection with confidence scoring
         try:
-            category, confidence = detect_category(description)
+            with metrics.timed("text_analysis"):
+                category, confidence = detected or detect_categories([description], rules)[0]
         except Exception as e:
-            print(f"[ERROR] Category detection failed: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+            logger.exception("Category detection failed: %s", e)
             return reject(report, f"Category detection error: {str(e)}", "Other", 0.0)
         
         # Reject if category is "Other" or confidence is below threshold
         if category == "Other" or confidence < CATEGORY_CONFIDENCE_THRESHOLD:
             return reject(report, "Unable to determine issue category. Please provide more details.", category, confidence)
 
-        if is_abusive(description):
+        with metrics.timed("abuse"):
+            abusive = is_abusive(description)
+        if abusive:
             return reject(report, "Abusive language detected", category, confidence)
 
         # Check for same user duplicate (same user, same description, same category)
         user_id = report.get("user_id", "anon")
         try:
-            if storage.is_duplicate(user_id, description, category, store=False):
+            with metrics.timed("dedup_text"):
+                is_dup = storage.is_duplicate(user_id, description, category, store=False)
+            if is_dup:
                 return reject(report, "You have already submitted this report.", category, confidence)
         except Exception as e:
-            print(f"[ERROR] Text duplicate check failed: {str(e)}")
+            logger.error("Text duplicate check failed: %s", e)
+            # Continue - don't block on technical errors
+
+        # Check for same user near-duplicate (paraphrased description, same category)
+        try:
+            with metrics.timed("dedup_near"):
+                is_dup = storage.is_near_duplicate(user_id, description, category, store=False)
+            if is_dup:
+                return reject(report, "You have already submitted a similar report.", category, confidence)
+        except Exception as e:
+            logger.error("Near-duplicate check failed: %s", e)
             # Continue - don't block on technical errors
 
         # Check for location-based duplicate (same category within 10 meters)
@@ -132,25 +155,30 @@ def classify_report(report: dict):
         longitude = report.get("longitude")
         if latitude is not None and longitude is not None:
             try:
-                if storage.is_duplicate_location(latitude, longitude, description, category, threshold=10.0, store=False):
+                with metrics.timed("dedup_location"):
+                    is_dup = storage.is_duplicate_location(latitude, longitude, description, category, threshold=10.0, store=False)
+                if is_dup:
                     return reject(report, "A similar issue has already been reported at this location.", category, confidence)
             except Exception as e:
-                print(f"[ERROR] Location duplicate check failed: {str(e)}")
+                logger.error("Location duplicate check failed: %s", e)
                 # Continue - don't block on technical errors
 
+        # Cheap, and decides this report's place in the image stage queue
+        urgency = detect_urgency(description)
+
         # STEP 1: Check image against detected category FIRST (BEFORE duplicate check)
         image_bytes = report.get("image_bytes")  # Changed from image_url to image_bytes
         if image_bytes:
-            print(f"[DEBUG] Processing image for category '{category}' (image size: {len(image_bytes)} bytes)")
+            logger.debug("Processing image for category '%s' (image size: %s bytes)", category, len(image_bytes))
             
             try:
                 # CRITICAL: Validate image matches category FIRST
                 # If image doesn't match, reject immediately - don't check duplicates
-                image_matches = image_matches_category_from_bytes(image_bytes, category)
+                image_matches = image_matches_category_from_bytes(image_bytes, category, rules, image_label, urgency)
                 
                 if not image_matches:
                     # Image doesn't match category - reject immediately
-                    print(f"[DEBUG] Image does NOT match category '{category}' - rejecting without duplicate check")
+                    logger.debug("Image does NOT match category '%s' - rejecting without duplicate check", category)
                     return reject(
                         report,
                         "Image does not match the issue description. Please provide an image related to the reported category.",
@@ -158,34 +186,29 @@ def classify_report(report: dict):
                         confidence
                     )
                 
-                print(f"[DEBUG] Image matches category '{category}' - proceeding to duplicate check")
+                logger.debug("Image matches category '%s' - proceeding to duplicate check", category)
                 
                 # STEP 2: Only check for duplicates if image matches category
                 try:
                     # Check for duplicates with threshold=0 (EXACT match only - most strict)
-                    print(f"[DEBUG] Checking for duplicate image")
-                    is_dup = storage.is_duplicate_image_from_bytes(image_bytes, threshold=0, store=False)
+                    logger.debug("Checking for duplicate image")
+                    with metrics.timed("dedup_image"):
+                        is_dup = storage.is_duplicate_image_from_bytes(image_bytes, threshold=0, store=False)
                     
                     if is_dup:
-                        print(f"[DEBUG] DUPLICATE DETECTED")
+                        logger.debug("DUPLICATE DETECTED")
                         return reject(report, "Duplicate image detected. This image has already been used in another report.", category, confidence)
                     
-                    print(f"[DEBUG] Image is NOT duplicate - will be stored in dataset after acceptance")
+                    logger.debug("Image is NOT duplicate - will be stored in dataset after acceptance")
                     # Image hash will be stored in dataset when report is saved
                 except Exception as e:
                     # If duplicate check fails, allow submission (don't block on technical errors)
-                    print(f"[ERROR] Duplicate check failed (allowing submission): {str(e)}")
-                    import traceback
-                    print(traceback.format_exc())
+                    logger.exception("Duplicate check failed (allowing submission): %s", e)
                     # Continue - don't block legitimate reports due to technical issues
             except Exception as e:
-                print(f"[ERROR] Image validation failed: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
+                logger.exception("Image validation failed: %s", e)
                 # If image validation fails, reject the report
                 return reject(report, f"Image validation error: {str(e)}", category, confidence)
-
-        urgency = detect_urgency(description)
         
         # Prepare result with all necessary data for duplicate checking
         result = {
@@ -210,11 +233,12 @@ def classify_report(report: dict):
                 from PIL import Image
                 import imagehash
                 import io
-                img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-                img_hash = imagehash.phash(img)
+                with metrics.timed("phash"):
+                    img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+                    img_hash = imagehash.phash(img)
                 result["image_hash"] = str(img_hash)  # Store as string for JSON serialization
             except Exception as e:
-                print(f"[WARNING] Failed to compute image hash (non-critical): {str(e)}")
+                logger.warning("Failed to compute image hash (non-critical): %s", e)
                 # Continue without image hash
 
         # Save to dataset (this is how we "store" for future duplicate checks)
@@ -226,115 +250,101 @@ def classify_report(report: dict):
         
         try:
             dataset.save_report(report_for_save)
-            print(f"[DEBUG] Successfully saved accepted report to dataset")
+            logger.debug("Successfully saved accepted report to dataset")
         except Exception as e:
-            print(f"[ERROR] Failed to save report to dataset (non-critical): {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+            logger.exception("Failed to save report to dataset (non-critical): %s", e)
             # Continue - dataset save failure shouldn't block acceptance
         
         return result
 
     except Exception as e:
-        print(f"[ERROR] Critical error in classify_report: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Critical error in classify_report: %s", e)
         return reject(report, f"Processing error: {str(e)}", confidence=0.0)
 
 
+# ------------------------------------
+# Batch pipeline
+# ------------------------------------
+# Reports are processed in chunks: category detection for the whole chunk in one
+# vectorised call, then one batched CLIP pass over the images of reports that
+# survive the cheap text checks, then the usual per-report decision in order (so
+# duplicates within a batch are still caught against earlier reports).
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "16"))
+
+
+def classify_reports(reports):
+    """Classify many reports; yields one result per report, in order, as each chunk completes."""
+    reports = list(reports)
+    for start in range(0, len(reports), BATCH_CHUNK_SIZE):
+        chunk = reports[start:start + BATCH_CHUNK_SIZE]
+        rules = rules_config.current()
+
+        descriptions = [(r.get("description") or "").strip() for r in chunk]
+        try:
+            detected = detect_categories(descriptions, rules)
+        except Exception as e:
+            logger.error("Batch category detection failed, falling back per report: %s", e)
+            detected = [None] * len(chunk)
+
+        # Only classify images whose report can still be accepted on text grounds
+        needs_image = [
+            i for i, (report, desc, det) in enumerate(zip(chunk, descriptions, detected))
+            if report.get("image_bytes") and desc and det is not None
+            and det[0] != "Other" and det[1] >= CATEGORY_CONFIDENCE_THRESHOLD
+            and not is_abusive(desc)
+        ]
+        labels = [None] * len(chunk)
+        if needs_image:
+            try:
+                # The chunk queues for the image stage at its most urgent report's priority
+                levels = {detect_urgency(descriptions[i]) for i in needs_image}
+                urgency = next(level for level in ("high", "medium", "low") if level in levels)
+                with image_stage.slot(urgency) as waited:
+                    metrics.observe_stage("image_queue_wait", waited)
+                    batch_labels = ic.classify_images_from_bytes(
+                        [chunk[i]["image_bytes"] for i in needs_image],
+                        list(rules.candidate_labels),
+                        rules.text_features,
+                    )
+                for i, label in zip(needs_image, batch_labels):
+                    labels[i] = label
+            except Exception as e:
+                logger.error("Batch image classification failed, falling back per report: %s", e)
+
+        for report, det, label in zip(chunk, detected, labels):
+            yield classify_report(report, rules, det, label)
+
+
 # ------------------------------------
 # Image validation logic (BALANCED) - FROM BYTES
 # ------------------------------------
-def image_matches_category_from_bytes(image_bytes: bytes, category: str) -> bool:
+def image_matches_category_from_bytes(image_bytes: bytes, category: str, rules=None, image_label=None, urgency: str = "low") -> bool:
     """
     Check if image matches the detected category.
     Works with image bytes directly (no URL required).
     Returns True if image matches or if classification is uncertain (allow through).
     Returns False ONLY if we can confidently determine the image doesn't match.
+    The decision is a lookup in the precomputed label → category table of `rules`.
+    image_label: optional precomputed CLIP label (skips classification).
+    urgency: the report's detected urgency; CLIP runs are scheduled by it (see app/scheduler.py).
     """
+    rules = rules or rules_config.current()
     try:
-        image_label = ic.classify_image_from_bytes(image_bytes)
+        if image_label is None:
+            with image_stage.slot(urgency) as waited:
+                metrics.observe_stage("image_queue_wait", waited)
+                image_label = ic.classify_image_from_bytes(image_bytes, list(rules.candidate_labels), rules.text_features)
         image_label = str(image_label).lower().strip() if image_label else "other"
-        
-        print(f"[DEBUG] Image classified as: '{image_label}' for category '{category}'")
-        
-        # If classifier completely fails or returns empty, allow through (uncertain)
-        if not image_label or image_label == "":
-            print(f"[DEBUG] Image classification returned empty - allowing through (uncertain)")
-            return True  # Allow through if classification fails
-        
-        # Get allowed labels and keywords for this category
-        allowed_labels = [lbl.lower() for lbl in IMAGE_TO_CATEGORY_MAP.get(category, [])]
-        category_keywords = [kw.lower() for kw in CATEGORY_KEYWORDS.get(category, [])]
-
-        # If "other" - classification uncertain, allow through (don't reject uncertain cases)
-        if image_label == "other":
-            print(f"[DEBUG] Image classified as 'other' - allowing through (uncertain classification)")
-            return True  # Allow through - don't reject uncertain classifications
-
-        # If generic label, allow through (too vague to confidently reject)
-        if image_label in GENERIC_IMAGE_LABELS:
-            print(f"[DEBUG] Image classified as generic '{image_label}' - allowing through (uncertain)")
-            return True  # Allow through - generic labels are too vague to reject
-
-        # Method 1: Direct exact match with allowed labels
-        if image_label in allowed_labels:
-            print(f"Image label '{image_label}' exactly matches category '{category}' - accepting")
-            return True
-
-        # Method 2: Check if image label contains any allowed label (substring match)
-        for lbl in allowed_labels:
-            if lbl in image_label or image_label in lbl:
-                print(f"Image label '{image_label}' contains allowed label '{lbl}' for category '{category}' - accepting")
-                return True
-
-        # Method 3: Check if image label contains any category keyword from description
-        for kw in category_keywords:
-            if kw in image_label or image_label in kw:
-                print(f"Image label '{image_label}' matches keyword '{kw}' for category '{category}' - accepting")
-                return True
-
-        # Method 4: Word-level matching (split and check for common words)
-        image_words = set(image_label.split())
-        for lbl in allowed_labels:
-            lbl_words = set(lbl.split())
-            common_words = image_words.intersection(lbl_words)
-            if common_words and len(common_words) > 0:
-                print(f"Image label '{image_label}' shares words with '{lbl}' for category '{category}' - accepting")
-                return True
-
-        # Method 5: Check if any word from image appears in category keywords
-        for word in image_words:
-            if len(word) > 2:  # Only check meaningful words (length > 2)
-                for kw in category_keywords:
-                    if word in kw or kw in word:
-                        print(f"Image word '{word}' matches keyword '{kw}' for category '{category}' - accepting")
-                        return True
-                for lbl in allowed_labels:
-                    if word in lbl or lbl in word:
-                        print(f"Image word '{word}' matches label '{lbl}' for category '{category}' - accepting")
-                        return True
-
-        # If no validation rules for this category, allow through (can't validate)
-        if not allowed_labels and not category_keywords:
-            print(f"[DEBUG] No validation rules for category '{category}' - allowing through")
-            return True  # Allow through if we can't validate
-
-        # If none of the methods match and we have validation rules, reject
-        # Only reject if we have clear validation rules and can confidently say it doesn't match
-        if allowed_labels or category_keywords:
-            print(f"[DEBUG] Image label '{image_label}' does NOT match category '{category}' - rejecting")
-            return False  # Reject only if we have validation rules and it clearly doesn't match
-
-        # If no validation rules, allow through
-        print(f"[DEBUG] No clear match but no validation rules - allowing through")
-        return True
+
+        logger.debug("Image classified as: '%s' for category '%s'", image_label, category)
+
+        matches = rules.label_matches_category(image_label, category)
+        logger.debug("Image label '%s' %s category '%s'", image_label, 'matches' if matches else 'does NOT match', category)
+        return matches
 
     except Exception as e:
         # If classification fails completely, allow through (don't block on technical errors)
-        print(f"[DEBUG] Image classification error for category '{category}' - allowing through (technical error): {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.debug("Image classification error for category '%s' - allowing through (technical error): %s", category, e, exc_info=True)
         return True  # Allow through if classification fails (technical error)
 
 
@@ -358,10 +368,8 @@ def reject(report, reason, category="Other", confidence=0.0):
     
     try:
         dataset.save_report(report_for_save)
-        print(f"[DEBUG] Successfully saved rejected report to dataset")
+        logger.debug("Successfully saved rejected report to dataset")
     except Exception as e:
-        print(f"[ERROR] Failed to save rejected report to dataset (non-critical): {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Failed to save rejected report to dataset (non-critical): %s", e)
         # Continue - dataset save failure shouldn't block rejection response
     return result
@@ -0,0 +1,207 @@
+# Offline re-evaluation of dataset history under new rules or thresholds.
+#
+# Streams dataset.jsonl (one or more files / segments) in chunks of lines,
+# re-runs the text stages of the pipeline (category detection, confidence
+# threshold, abuse filter, urgency) on a process pool and writes one JSON line
+# per report whose decision would change. Duplicate checks and the image stage
+# are not replayed: they depend on the dataset as it was when each report
+# arrived, and on images that are not stored.
+#
+# Memory stays bounded whatever the file size: the reader keeps at most
+# 2 x workers chunks in flight and only per-change counters are aggregated.
+#
+#   python -m app.reprocess --rules new_rules.json --output changes.jsonl
+import argparse
+import json
+import logging
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from app import dataset
+from app import rules as rules_config
+
+logger = logging.getLogger(__name__)
+
+# Rejection reasons produced by the text stages (see pipeline._classify_report)
+REASON_NO_DESCRIPTION = "Description is required"
+REASON_UNCLEAR = "Unable to determine issue category. Please provide more details."
+REASON_ABUSE = "Abusive language detected"
+TEXT_REASONS = (REASON_NO_DESCRIPTION, REASON_UNCLEAR, REASON_ABUSE, "Category detection error")
+
+_rules = None  # Rules snapshot used by this (worker) process
+
+
+def _init_worker(rules_path=None, text_engine=None, text_model_path=None, confidence_threshold=None):
+    """Configure the pipeline in a worker process (also used for in-process runs)."""
+    global _rules
+    from app import pipeline
+
+    _rules = rules_config.load_rules(rules_path, with_embeddings=False) if rules_path else rules_config.current()
+    if text_engine:
+        pipeline.TEXT_ENGINE = text_engine
+    if text_model_path:
+        pipeline.TEXT_MODEL_PATH = text_model_path
+    if text_engine or text_model_path:
+        pipeline._text_model_loaded = False
+        pipeline._text_model = None
+    if confidence_threshold is not None:
+        pipeline.CATEGORY_CONFIDENCE_THRESHOLD = confidence_threshold
+
+
+def is_text_rejection(reason: str) -> bool:
+    return any((reason or "").startswith(r) for r in TEXT_REASONS)
+
+
+def text_decision(description: str, detected) -> dict:
+    """Outcome of the text stages: a rejection reason, or None with category/urgency."""
+    from app import pipeline
+    from app.text_rules import is_abusive, detect_urgency
+
+    category, confidence = detected
+    if not description:
+        return {"reason": REASON_NO_DESCRIPTION, "category": "Other", "confidence": 0.0}
+    decision = {"reason": None, "category": category, "confidence": round(confidence, 2)}
+    if category == "Other" or confidence < pipeline.CATEGORY_CONFIDENCE_THRESHOLD:
+        decision["reason"] = REASON_UNCLEAR
+    elif is_abusive(description):
+        decision["reason"] = REASON_ABUSE
+    else:
+        decision["urgency"] = detect_urgency(description)
+    return decision
+
+
+def compare(report: dict, after: dict):
+    """Change type for one report, or None if the text stages decide as before."""
+    before_reason = report.get("reason")
+    before_text_rejected = report.get("status") == "rejected" and is_text_rejection(before_reason)
+    if after["reason"]:
+        if not before_text_rejected:
+            return "newly_rejected"
+        return "reason_changed" if not before_reason.startswith(after["reason"]) else None
+    if before_text_rejected:
+        # Would now go on to the duplicate and image stages
+        return "rejection_lifted"
+    if report.get("category") != after["category"]:
+        return "category_changed"
+    if report.get("status") == "accepted" and report.get("urgency") not in (None, after.get("urgency")):
+        return "urgency_changed"
+    return None
+
+
+def reprocess_chunk(lines: list, first_line: int):
+    """Re-run the text stages over raw dataset lines; returns (changes, counts)."""
+    from app import pipeline
+
+    reports, numbers = [], []
+    counts = {"reports": 0, "invalid": 0}
+    for offset, line in enumerate(lines):
+        try:
+            report = json.loads(line)
+        except json.JSONDecodeError:
+            counts["invalid"] += 1
+            continue
+        reports.append(report)
+        numbers.append(first_line + offset)
+    counts["reports"] = len(reports)
+
+    descriptions = [(r.get("description") or "").strip() for r in reports]
+    detected = pipeline.detect_categories(descriptions, _rules)
+
+    changes = []
+    for report, number, description, det in zip(reports, numbers, descriptions, detected):
+        after = text_decision(description, det)
+        change = compare(report, after)
+        if change is None:
+            continue
+        counts[change] = counts.get(change, 0) + 1
+        changes.append({
+            "line": number,
+            "report_id": report.get("report_id"),
+            "change": change,
+            "before": {k: report.get(k) for k in ("status", "reason", "category", "confidence", "urgency")},
+            "after": after,
+        })
+    return changes, counts
+
+
+def iter_chunks(paths, chunk_size: int):
+    """Yield (lines, first line number) chunks across all files; line numbers are global and 1-based."""
+    line_number = 1
+    for path in paths:
+        with open(path, "r", encoding="utf8") as f:
+            while True:
+                lines = list(islice(f, chunk_size))
+                if not lines:
+                    break
+                yield lines, line_number
+                line_number += len(lines)
+
+
+def run(paths, output, workers: int = 0, chunk_size: int = 2000, rules_path=None, text_engine=None,
+        text_model_path=None, confidence_threshold=None) -> dict:
+    """
+    Reprocess the given dataset files and write changed decisions as JSON lines
+    to `output` (an open text stream). workers=0 runs in this process.
+    Returns the summary counts.
+    """
+    worker_config = (rules_path, text_engine, text_model_path, confidence_threshold)
+    totals = {"reports": 0, "invalid": 0}
+    transitions = {}  # "old category -> new category" for category changes
+
+    def collect(result):
+        changes, counts = result
+        for key, value in counts.items():
+            totals[key] = totals.get(key, 0) + value
+        for change in changes:
+            if change["change"] == "category_changed":
+                key = f"{change['before']['category']} -> {change['after']['category']}"
+                transitions[key] = transitions.get(key, 0) + 1
+            output.write(json.dumps(change, ensure_ascii=False) + "\n")
+
+    if workers <= 0:
+        _init_worker(*worker_config)
+        for lines, first in iter_chunks(paths, chunk_size):
+            collect(reprocess_chunk(lines, first))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=worker_config) as pool:
+            pending = deque()
+            for lines, first in iter_chunks(paths, chunk_size):
+                pending.append(pool.submit(reprocess_chunk, lines, first))
+                if len(pending) >= 2 * workers:
+                    collect(pending.popleft().result())
+            while pending:
+                collect(pending.popleft().result())
+
+    totals["changed"] = sum(v for k, v in totals.items() if k not in ("reports", "invalid"))
+    totals["category_transitions"] = dict(sorted(transitions.items(), key=lambda item: -item[1]))
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-evaluate dataset.jsonl decisions with the current (or given) text rules")
+    parser.add_argument("datasets", nargs="*", default=[str(dataset.DATA_FILE)], help="dataset.jsonl files or segments, in order")
+    parser.add_argument("--rules", default=None, help="Rules file to evaluate (default: the active rules)")
+    parser.add_argument("--text-engine", choices=("keyword", "linear"), default=None)
+    parser.add_argument("--text-model", default=None, help="Linear text model artifact")
+    parser.add_argument("--confidence-threshold", type=float, default=None, help="Override CATEGORY_CONFIDENCE_THRESHOLD")
+    parser.add_argument("--output", default="-", help="Changed decisions as JSON lines (default: stdout)")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes (0 = run in this process)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Dataset lines per work item")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else Path(args.output).open("w", encoding="utf8")
+    try:
+        summary = run(args.datasets, output, workers=args.workers, chunk_size=args.chunk_size,
+                      rules_path=args.rules, text_engine=args.text_engine, text_model_path=args.text_model,
+                      confidence_threshold=args.confidence_threshold)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# Config-driven label/keyword rules, compiled into matchers and lookup tables,
+# with atomic hot reload.
+#
+# The rules live in config/rules.json (override with RULES_FILE). Each load
+# compiles a complete CompiledRules snapshot (keyword regexes, spelling index,
+# image label -> category table, CLIP label embeddings) and only then swaps it
+# in with a single reference assignment. Callers take one snapshot via
+# current() per request and use it throughout, so a request never sees a mix
+# of old and new rules.
+import json
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from app import text_rules
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # points to ml-backend-with-image/
+RULES_FILE = Path(os.getenv("RULES_FILE", str(BASE_DIR / "config" / "rules.json")))
+
+logger = logging.getLogger(__name__)
+
+# Image labels outside candidate_labels whose compatible categories are cached per snapshot
+UNSEEN_LABEL_CACHE_SIZE = 256
+
+_REQUIRED_KEYS = ("version", "candidate_labels", "category_keywords", "image_to_category_map")
+
+
+class CompiledRules:
+    """Immutable snapshot of one rules config version and everything derived from it."""
+
+    def __init__(self, config: dict, source: str = ""):
+        self.version = config["version"]
+        self.source = source
+        self.loaded_at = time.time()
+        self.candidate_labels = tuple(config["candidate_labels"])
+        self.category_keywords = {c: list(kws) for c, kws in config["category_keywords"].items()}
+        self.image_to_category_map = {c: list(lbls) for c, lbls in config["image_to_category_map"].items()}
+        self.generic_image_labels = frozenset(config.get("generic_image_labels", ()))
+
+        # Keyword matchers: whole word / exact phrase regexes, compiled once
+        self.keyword_patterns = {
+            category: [(kw, re.compile(rf"\b{re.escape(kw)}\b")) for kw in keywords]
+            for category, keywords in self.category_keywords.items()
+        }
+        self.avg_keyword_length = {
+            category: sum(len(kw) for kw in keywords) / max(len(keywords), 1)
+            for category, keywords in self.category_keywords.items()
+        }
+
+        # Typo tolerance: symmetric delete index over every keyword word
+        self.spelling_vocabulary, self.spelling_index = text_rules.build_spelling_index(
+            self.category_keywords.values()
+        )
+
+        # Image label -> compatible categories
+        self.ruled_categories = frozenset(self.image_to_category_map) | frozenset(self.category_keywords)
+        labels = {lbl.lower().strip() for lbl in self.candidate_labels} | self.generic_image_labels | {"other"}
+        self.label_table = {label: self._compatible_categories(label) for label in labels}
+        # Labels outside the vocabulary (e.g. from another backend): bounded cache,
+        # so label_table itself never changes after compilation
+        self._unseen_labels = lru_cache(maxsize=UNSEEN_LABEL_CACHE_SIZE)(self._compatible_categories)
+
+        # CLIP text embeddings for the candidate labels (None when CLIP is not loaded)
+        self.text_features = None
+
+    # ----- image label matching -----
+    def _label_matches_category(self, image_label: str, category: str) -> bool:
+        """
+        Reference matching rules for one (label, category) pair: exact, substring,
+        reverse substring, word overlap and per-word keyword checks. Only used to
+        build label_table; the request path does a single set lookup.
+        """
+        if not image_label or image_label == "other" or image_label in self.generic_image_labels:
+            return True  # Uncertain / too vague to reject
+
+        allowed_labels = [lbl.lower() for lbl in self.image_to_category_map.get(category, [])]
+        category_keywords = [kw.lower() for kw in self.category_keywords.get(category, [])]
+
+        # If no validation rules for this category, allow through (can't validate)
+        if not allowed_labels and not category_keywords:
+            return True
+
+        # Method 1: Direct exact match with allowed labels
+        if image_label in allowed_labels:
+            return True
+
+        # Method 2: Image label contains an allowed label (or vice versa)
+        for lbl in allowed_labels:
+            if lbl in image_label or image_label in lbl:
+                return True
+
+        # Method 3: Image label contains a category keyword (or vice versa)
+        for kw in category_keywords:
+            if kw in image_label or image_label in kw:
+                return True
+
+        # Method 4: Word-level matching (shared words with an allowed label)
+        image_words = set(image_label.split())
+        for lbl in allowed_labels:
+            if image_words.intersection(lbl.split()):
+                return True
+
+        # Method 5: Any meaningful image word appears in a keyword or allowed label
+        for word in image_words:
+            if len(word) > 2:
+                for kw in category_keywords:
+                    if word in kw or kw in word:
+                        return True
+                for lbl in allowed_labels:
+                    if word in lbl or lbl in word:
+                        return True
+
+        return False
+
+    def _compatible_categories(self, image_label: str) -> frozenset:
+        return frozenset(c for c in self.ruled_categories if self._label_matches_category(image_label, c))
+
+    def label_matches_category(self, image_label: str, category: str) -> bool:
+        """O(1) lookup; labels outside the vocabulary go through a bounded LRU cache."""
+        if category not in self.ruled_categories:
+            return True
+        compatible = self.label_table.get(image_label)
+        if compatible is None:
+            compatible = self._unseen_labels(image_label)
+        return category in compatible
+
+
+def compile_rules(config: dict, source: str = "", with_embeddings: bool = True) -> CompiledRules:
+    """Validate a rules config and build every derived artifact."""
+    missing = [key for key in _REQUIRED_KEYS if key not in config]
+    if missing:
+        raise ValueError(f"Rules config is missing keys: {', '.join(missing)}")
+    if not isinstance(config["candidate_labels"], list) or not config["candidate_labels"]:
+        raise ValueError("Rules config 'candidate_labels' must be a non-empty list")
+    for key in ("category_keywords", "image_to_category_map"):
+        if not isinstance(config[key], dict) or not all(isinstance(v, list) for v in config[key].values()):
+            raise ValueError(f"Rules config '{key}' must map category names to lists")
+
+    compiled = CompiledRules(config, source)
+    if with_embeddings:
+        from app import image_classifier as ic
+        compiled.text_features = ic.encode_labels(list(compiled.candidate_labels))
+    return compiled
+
+
+def load_rules(path=None, with_embeddings: bool = True) -> CompiledRules:
+    path = Path(path) if path else RULES_FILE
+    with path.open("r", encoding="utf8") as f:
+        config = json.load(f)
+    return compile_rules(config, source=str(path), with_embeddings=with_embeddings)
+
+
+# ------------------------------------
+# Current snapshot + hot reload
+# ------------------------------------
+_current = None
+_init_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_last_error = None
+
+
+def current() -> CompiledRules:
+    """The active rules snapshot (loaded on first use)."""
+    global _current
+    if _current is None:
+        with _init_lock:
+            if _current is None:
+                # First load skips embeddings: CLIP may not be loaded yet and
+                # initialize_models() reloads once it is.
+                _current = load_rules(with_embeddings=False)
+    return _current
+
+
+def reload(path=None) -> CompiledRules:
+    """
+    Rebuild all compiled artifacts from the rules file and swap them in atomically.
+    On any error the previous snapshot stays active and the error is re-raised.
+    Concurrent reloads are serialised.
+    """
+    global _current, _last_error
+    with _reload_lock:
+        try:
+            compiled = load_rules(path)
+        except Exception as e:
+            _last_error = f"{type(e).__name__}: {e}"
+            logger.error("Rules reload failed, keeping version %s: %s", _current.version if _current else None, _last_error)
+            raise
+        _current = compiled  # single reference assignment - atomic for readers
+        _last_error = None
+        logger.info("Rules version %s loaded from %s", compiled.version, compiled.source)
+        return compiled
+
+
+def reload_in_background(path=None) -> threading.Thread:
+    """Run reload() on a daemon thread; requests keep using the old snapshot meanwhile."""
+    def _run():
+        try:
+            reload(path)
+        except Exception:
+            pass  # Already logged, old rules stay active
+    thread = threading.Thread(target=_run, name="rules-reload", daemon=True)
+    thread.start()
+    return thread
+
+
+def status() -> dict:
+    rules = current()
+    return {
+        "version": rules.version,
+        "source": rules.source,
+        "loaded_at": rules.loaded_at,
+        "candidate_labels": len(rules.candidate_labels),
+        "categories": sorted(rules.category_keywords),
+        "text_embeddings": rules.text_features is not None,
+        "reloading": _reload_lock.locked(),
+        "last_error": _last_error,
+    }
+
+
+def install_sighup_handler():
+    """Reload rules in the background on SIGHUP (POSIX only, main thread only)."""
+    import signal
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGHUP, lambda signum, frame: reload_in_background())
+    return True
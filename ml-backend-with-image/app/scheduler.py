@@ -0,0 +1,122 @@
+# Urgency-aware priority scheduling for the expensive image (CLIP) stage.
+#
+# Reports waiting for an image slot are served by urgency (high before medium
+# before low, as detected by text_rules.detect_urgency), FIFO within a level.
+# A waiter is promoted one level for every SCHEDULER_AGING_SECONDS it has
+# waited, so a steady stream of urgent reports cannot starve low ones forever.
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from itertools import count
+
+from app import metrics
+
+PRIORITIES = ("high", "medium", "low")  # index = base priority, lower is served first
+
+IMAGE_STAGE_CONCURRENCY = int(os.getenv("IMAGE_STAGE_CONCURRENCY", "1"))
+SCHEDULER_AGING_SECONDS = float(os.getenv("SCHEDULER_AGING_SECONDS", "5"))
+
+_WAIT_SAMPLES = 512  # recent waits kept per priority for percentiles
+
+
+class _Waiter:
+    __slots__ = ("seq", "priority", "enqueued_at")
+
+    def __init__(self, seq: int, priority: int):
+        self.seq = seq
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class PriorityScheduler:
+    """A counting semaphore whose waiters are granted slots by (aged) priority."""
+
+    def __init__(self, name: str, slots: int = IMAGE_STAGE_CONCURRENCY, aging_seconds: float = SCHEDULER_AGING_SECONDS):
+        self.name = name
+        self.slots = max(1, slots)
+        self.aging_seconds = aging_seconds
+        self._cond = threading.Condition()
+        self._busy = 0
+        self._waiting = []
+        self._seq = count()
+        self._waits = {p: deque(maxlen=_WAIT_SAMPLES) for p in PRIORITIES}
+        self._served = {p: 0 for p in PRIORITIES}
+        self._promoted = 0
+        self._depth = {p: 0 for p in PRIORITIES}
+        for level in PRIORITIES:
+            metrics.scheduler_queue_depth.set(0, name, level)
+
+    def _set_depth(self, level: str, delta: int):
+        self._depth[level] += delta
+        metrics.scheduler_queue_depth.set(self._depth[level], self.name, level)
+
+    def _effective(self, waiter: _Waiter, now: float) -> tuple:
+        aged = int((now - waiter.enqueued_at) / self.aging_seconds) if self.aging_seconds > 0 else 0
+        return (max(0, waiter.priority - aged), waiter.seq)
+
+    def _next(self) -> _Waiter:
+        now = time.monotonic()
+        return min(self._waiting, key=lambda w: self._effective(w, now))
+
+    @contextmanager
+    def slot(self, urgency: str = "low"):
+        """Hold one stage slot for the duration of the block."""
+        level = urgency if urgency in PRIORITIES else "low"
+        waiter = _Waiter(next(self._seq), PRIORITIES.index(level))
+        with self._cond:
+            self._waiting.append(waiter)
+            self._set_depth(level, 1)
+            while self._busy >= self.slots or self._next() is not waiter:
+                self._cond.wait()
+            self._waiting.remove(waiter)
+            self._set_depth(level, -1)
+            self._busy += 1
+            waited = time.monotonic() - waiter.enqueued_at
+            self._waits[level].append(waited)
+            self._served[level] += 1
+            metrics.scheduler_wait_seconds.observe(waited, self.name, level)
+            if self._effective(waiter, time.monotonic())[0] < waiter.priority:
+                self._promoted += 1
+                metrics.scheduler_promotions_total.inc(self.name)
+            # Another slot may still be free for the next waiter
+            self._cond.notify_all()
+        try:
+            yield waited
+        finally:
+            with self._cond:
+                self._busy -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = dict(self._depth)
+            priorities = {}
+            for level in PRIORITIES:
+                waits = sorted(self._waits[level])
+                priorities[level] = {
+                    "queue_depth": depth[level],
+                    "served": self._served[level],
+                    "wait_p50_ms": round(_percentile(waits, 0.50) * 1000, 2),
+                    "wait_p95_ms": round(_percentile(waits, 0.95) * 1000, 2),
+                    "wait_max_ms": round((waits[-1] if waits else 0.0) * 1000, 2),
+                }
+            return {
+                "stage": self.name,
+                "slots": self.slots,
+                "busy": self._busy,
+                "aging_seconds": self.aging_seconds,
+                "promoted": self._promoted,
+                "priorities": priorities,
+            }
+
+
+def _percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+# Shared scheduler in front of CLIP image classification
+image_stage = PriorityScheduler("image")
@@ -0,0 +1,152 @@
+# Startup phase timing and a cold-start profiler.
+#
+# app.main wraps each init step (logging, imports, model load, rules, ...) in
+# phase(); the timings are logged once the app is built and returned by
+# GET /admin/startup. Recording a phase is two perf_counter() calls.
+#
+# `python -m app.startup` profiles a cold start in a fresh interpreter: time
+# per imported module (python -X importtime), time per init phase and the
+# time to the first served request, which test_startup.py holds to
+# STARTUP_BUDGET_SECONDS.
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent  # points to ml-backend-with-image/
+
+# Cold start (interpreter launch to first served request) allowed by test_startup.py
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "5.0"))
+
+_phases = []  # (name, seconds), in order
+
+
+@contextmanager
+def phase(name: str):
+    """Time one startup step."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - started))
+
+
+def phases() -> dict:
+    """Recorded startup phases in seconds, in the order they ran."""
+    return {name: round(seconds, 6) for name, seconds in _phases}
+
+
+# ------------------------------------
+# Cold-start profiler
+# ------------------------------------
+# Runs in the child interpreter: import the app, then serve one request in-process
+_CHILD = """
+import json, sys, time, asyncio
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from app import dataset, startup
+dataset.DATA_FILE = __import__("pathlib").Path(sys.argv[1])
+import httpx
+
+async def first_request():
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+        response = await client.post("/submit", data={
+            "report_id": "startup-probe", "description": "Pothole on the main road near the school",
+            "user_id": "startup-probe"})
+        return response.status_code
+
+status = asyncio.run(first_request())
+print("STARTUP_PROFILE " + json.dumps({
+    "import_app_s": imported - started,
+    "first_request_s": time.perf_counter() - imported,
+    "first_request_status": status,
+    "phases": startup.phases(),
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """Rows of `python -X importtime` output as dicts (self/cumulative in seconds)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append({"module": name.strip(), "depth": (len(name) - len(name.lstrip())) // 2,
+                         "self_s": int(self_us) / 1e6, "cumulative_s": int(cumulative_us) / 1e6})
+        except ValueError:
+            continue
+    return rows
+
+
+def profile_cold_start(env: dict = None, top: int = 20) -> dict:
+    """
+    Start a fresh interpreter, import app.main and serve one text-only /submit
+    (against a throwaway dataset file). Returns the timings.
+    """
+    import subprocess
+    import tempfile
+
+    child_env = {**os.environ, "LOG_LEVEL": "WARNING", **(env or {})}
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _CHILD, str(Path(tmp) / "dataset.jsonl")],
+            cwd=str(BASE_DIR), env=child_env, capture_output=True, text=True,
+        )
+        total = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"Startup probe failed ({proc.returncode}): {proc.stderr[-2000:]}")
+
+    result = next(json.loads(line.split(" ", 1)[1]) for line in proc.stdout.splitlines()
+                  if line.startswith("STARTUP_PROFILE "))
+    imports = parse_importtime(proc.stderr)
+    packages = {}
+    for row in imports:
+        package = row["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + row["self_s"]
+    return {
+        "total_s": total,
+        "interpreter_s": total - result["import_app_s"] - result["first_request_s"],
+        **result,
+        "top_packages": dict(sorted(packages.items(), key=lambda item: -item[1])[:top]),
+        "top_modules_self": sorted(imports, key=lambda row: -row["self_s"])[:top],
+    }
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile a cold start of app.main: imports, init phases, first request")
+    parser.add_argument("--top", type=int, default=20, help="Modules and packages to list")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Setting for the profiled process")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args(argv)
+
+    report = profile_cold_start(dict(item.split("=", 1) for item in args.env), args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Cold start to first request: {report['total_s']:.3f}s (budget {STARTUP_BUDGET_SECONDS:g}s)")
+    print(f"  interpreter        {report['interpreter_s']:8.3f}s")
+    print(f"  import app.main    {report['import_app_s']:8.3f}s")
+    print(f"  first request      {report['first_request_s']:8.3f}s (status {report['first_request_status']})")
+    print("\nInit phases:")
+    for name, seconds in report["phases"].items():
+        print(f"  {name:24} {seconds:8.3f}s")
+    print("\nImport time by top-level package (sum of module self times):")
+    for package, seconds in report["top_packages"].items():
+        print(f"  {package:24} {seconds:8.3f}s")
+    print("\nSlowest modules (self time):")
+    for row in report["top_modules_self"]:
+        print(f"  {row['module']:48} {row['self_s']:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
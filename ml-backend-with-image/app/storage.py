@@ -1,13 +1,16 @@
-from PIL import Image
-import imagehash
-import requests
 import io
+import os
 import json
+import logging
+import threading
 from pathlib import Path
 from math import radians, cos, sin, asin, sqrt
 
 # Import dataset module to access the dataset file
-from app import dataset
+from app import dataset, tracing
+from app.minhash import LSHIndex
+
+logger = logging.getLogger(__name__)
 
 def _load_accepted_reports():
     """Load all accepted reports from dataset.jsonl."""
@@ -29,9 +32,10 @@ def _load_accepted_reports():
                 except json.JSONDecodeError:
                     continue  # Skip invalid JSON lines
         
+        tracing.note("accepted_reports", len(accepted_reports))
         return accepted_reports
     except Exception as e:
-        print(f"[ERROR] Failed to load accepted reports from dataset: {str(e)}")
+        logger.error("Failed to load accepted reports from dataset: %s", e)
         return []
 
 
@@ -62,16 +66,85 @@ def is_duplicate(user_id: str, description: str, category: str, store: bool = Tr
             if (report_user_id == user_id_normalized and 
                 report_desc == normalized_desc and 
                 report_category == category_normalized):
-                print(f"[DEBUG] Text duplicate found in dataset: user_id={user_id_normalized}, category={category}")
+                logger.debug("Text duplicate found in dataset: user_id=%s, category=%s", user_id_normalized, category)
                 return True
         
         return False
     except Exception as e:
-        print(f"[ERROR] Text duplicate check failed: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Text duplicate check failed: %s", e)
         return False  # On error, don't block submission
 
+# ------------------------------------
+# Near-duplicate text detection (MinHash + LSH)
+# ------------------------------------
+# Minimum estimated Jaccard similarity (character 4-shingles) for two
+# descriptions to count as the same report. Configurable via environment.
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.5"))
+
+_near_dup_lock = threading.Lock()
+_near_dup_index = None
+_near_dup_offset = 0  # bytes of dataset.jsonl already folded into the index
+
+
+def _refresh_near_dup_index():
+    """
+    Fold newly appended accepted reports into the LSH index.
+    dataset.jsonl is append-only, so we only read past the last consumed
+    offset; this also picks up reports written by other worker processes.
+    Must be called with _near_dup_lock held.
+    """
+    global _near_dup_index, _near_dup_offset
+    if _near_dup_index is None:
+        _near_dup_index = LSHIndex(threshold=NEAR_DUPLICATE_THRESHOLD)
+    if not dataset.DATA_FILE.exists():
+        return
+    if dataset.DATA_FILE.stat().st_size < _near_dup_offset:
+        # File was truncated or replaced - rebuild from scratch
+        _near_dup_index = LSHIndex(threshold=NEAR_DUPLICATE_THRESHOLD)
+        _near_dup_offset = 0
+    with dataset.DATA_FILE.open("rb") as f:
+        f.seek(_near_dup_offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # Partially written last line - picked up on the next refresh
+            _near_dup_offset += len(line)
+            try:
+                report = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            if report.get("status") == "accepted" and report.get("accept") is True:
+                _near_dup_index.add(
+                    report.get("description") or "",
+                    report.get("category") or "",
+                    payload=(report.get("user_id") or "anon").lower(),
+                )
+
+
+def is_near_duplicate(user_id: str, description: str, category: str, threshold: float = None, store: bool = True) -> bool:
+    """
+    Return True if the same user already has an ACCEPTED report in the same category
+    whose description is Jaccard-similar (MinHash estimate >= threshold).
+    Catches paraphrases such as "Clear the water on road immediately" vs
+    "Clear the water on road immediately. This is pathole issue".
+    threshold defaults to NEAR_DUPLICATE_THRESHOLD.
+    Note: store parameter is kept for compatibility but doesn't do anything (data is stored via dataset.save_report).
+    """
+    try:
+        user_id_normalized = (user_id or "anon").lower()
+        with _near_dup_lock:
+            _refresh_near_dup_index()
+            matches = _near_dup_index.query(description, category, threshold)
+            tracing.note("near_dup_index", f"size={len(_near_dup_index)}")
+        for match_user, similarity in matches:
+            if match_user == user_id_normalized:
+                logger.debug("Near-duplicate found in dataset: user_id=%s, category=%s, similarity=%.2f", user_id_normalized, category, similarity)
+                return True
+        return False
+    except Exception as e:
+        logger.exception("Near-duplicate check failed: %s", e)
+        return False  # On error, don't block submission
+
+
 def is_duplicate_image(image_url: str, threshold: int = 0, store: bool = True) -> bool:
     """Check if an image is a duplicate using URL first, then perceptual hash (pHash).
     Checks ACCEPTED reports from dataset.jsonl.
@@ -101,16 +174,20 @@ def is_duplicate_image(image_url: str, threshold: int = 0, store: bool = True) -
                         report_parsed = urlparse(report_image_url)
                         report_normalized = urlunparse((report_parsed.scheme, report_parsed.netloc, report_parsed.path, '', '', ''))
                         if report_normalized == normalized_url:
-                            print(f"[DEBUG] Duplicate detected: Exact URL match in dataset for {normalized_url}")
+                            logger.debug("Duplicate detected: Exact URL match in dataset for %s", normalized_url)
                             return True
                     except Exception:
                         continue
         except Exception as e:
-            print(f"[WARNING] URL normalization failed: {str(e)}")
+            logger.warning("URL normalization failed: %s", e)
             # Continue with hash check
         
         # Step 2: Hash-based check (only for exact matches with threshold=0)
         try:
+            import requests
+            from PIL import Image
+            import imagehash
+
             resp = requests.get(image_url, timeout=10)
             resp.raise_for_status()
             img = Image.open(io.BytesIO(resp.content)).convert('RGB')
@@ -129,7 +206,7 @@ def is_duplicate_image(image_url: str, threshold: int = 0, store: bool = True) -
                             report_hash_int = int(report_hash)
                         
                         if abs(img_hash_int - report_hash_int) == 0:
-                            print(f"[DEBUG] Duplicate detected: Exact hash match in dataset")
+                            logger.debug("Duplicate detected: Exact hash match in dataset")
                             return True
                     except (ValueError, TypeError):
                         continue
@@ -137,10 +214,10 @@ def is_duplicate_image(image_url: str, threshold: int = 0, store: bool = True) -
             return False
         except Exception as e:
             # On any failure to fetch/process image, treat as non-duplicate
-            print(f"[ERROR] Image hash check failed for {image_url}: {str(e)}")
+            logger.error("Image hash check failed for %s: %s", image_url, e)
             return False
     except Exception as e:
-        print(f"[ERROR] Image duplicate check failed: {str(e)}")
+        logger.error("Image duplicate check failed: %s", e)
         return False
 
 
@@ -157,6 +234,10 @@ def is_duplicate_image_from_bytes(image_bytes: bytes, threshold: int = 0, store:
         return False
     
     try:
+        # Image stack is imported on first use so text-only processes never load it
+        from PIL import Image
+        import imagehash
+
         # Open image directly from bytes and compute hash
         img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
         img_hash = imagehash.phash(img)
@@ -179,7 +260,7 @@ def is_duplicate_image_from_bytes(image_bytes: bytes, threshold: int = 0, store:
                     
                     # With threshold=0, only exact hash matches are duplicates
                     if abs(img_hash_int - report_hash_int) == 0:
-                        print(f"[DEBUG] Image duplicate detected: Exact hash match in dataset")
+                        logger.debug("Image duplicate detected: Exact hash match in dataset")
                         return True
                 except (ValueError, TypeError):
                     continue  # Skip invalid hash values
@@ -188,9 +269,7 @@ def is_duplicate_image_from_bytes(image_bytes: bytes, threshold: int = 0, store:
     except Exception as e:
         # On any failure to process image, treat as non-duplicate
         # Log the error for debugging but don't block submission
-        print(f"[ERROR] Image hash check failed: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Image hash check failed: %s", e)
         return False
 
 def haversine(lat1, lon1, lat2, lon2):
@@ -232,13 +311,11 @@ def is_duplicate_location(lat: float, lon: float, description: str, category: st
                     dist = haversine(lat, lon, float(report_lat), float(report_lon))
                     # Consider duplicate if same category within threshold meters
                     if dist <= threshold:
-                        print(f"[DEBUG] Location duplicate found in dataset: ({lat}, {lon}) is {dist:.2f}m from ({report_lat}, {report_lon}) for category '{category}'")
+                        logger.debug("Location duplicate found in dataset: (%s, %s) is %.2fm from (%s, %s) for category '%s'", lat, lon, dist, report_lat, report_lon, category)
                         return True
         
         return False
     except Exception as e:
         # On error, don't block submission - be permissive
-        print(f"[ERROR] Location duplicate check failed: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Location duplicate check failed: %s", e)
         return False
@@ -0,0 +1,219 @@
+# Hashing-vectoriser + linear (softmax) text classifier, trained offline from dataset.jsonl.
+#
+# Train:    python -m app.text_model train [--dataset data/dataset.jsonl] [--output data/text_model.npz]
+# Evaluate: python benchmarks/bench_text_engines.py
+import argparse
+import json
+import re
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from app import dataset, rules as rules_config
+from app.text_rules import normalize
+
+N_FEATURES = 2 ** 18
+DEFAULT_MODEL_PATH = dataset.BASE_DIR / "data" / "text_model.npz"
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def extract_features(text: str, n_features: int = N_FEATURES) -> dict:
+    """Hashed unigram + bigram counts, L2-normalised. Returns {feature index: value}."""
+    tokens = _TOKEN.findall(normalize(text or ""))
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    counts = {}
+    for gram in grams:
+        idx = zlib.crc32(gram.encode("utf8")) % n_features
+        counts[idx] = counts.get(idx, 0.0) + 1.0
+    norm = sum(v * v for v in counts.values()) ** 0.5
+    return {idx: v / norm for idx, v in counts.items()} if norm else {}
+
+
+def _vectorize(texts, n_features: int):
+    """Flatten a batch into (doc ids, feature ids, values) arrays - a COO sparse matrix."""
+    doc_ids, feat_ids, values = [], [], []
+    for doc, text in enumerate(texts):
+        for idx, value in extract_features(text, n_features).items():
+            doc_ids.append(doc)
+            feat_ids.append(idx)
+            values.append(value)
+    return (np.array(doc_ids, dtype=np.int64),
+            np.array(feat_ids, dtype=np.int64),
+            np.array(values, dtype=np.float32))
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class LinearTextClassifier:
+    """
+    Multinomial logistic regression over hashed n-gram features.
+    Only feature rows with non-zero weights are kept, so the artifact stays small.
+    """
+
+    def __init__(self, classes, feature_ids, weights, bias, n_features: int = N_FEATURES, min_confidence: float = 0.4):
+        self.classes = list(classes)
+        self.n_features = n_features
+        self.min_confidence = min_confidence
+        self.weights = np.asarray(weights, dtype=np.float32)  # (kept features, classes)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.feature_ids = np.asarray(feature_ids, dtype=np.int32)
+        # Dense feature -> compact row lookup (-1 = feature never seen in training)
+        self._row_of = np.full(n_features, -1, dtype=np.int32)
+        self._row_of[self.feature_ids] = np.arange(len(self.feature_ids), dtype=np.int32)
+
+    # ----- inference -----
+    def predict_proba(self, texts):
+        """Return (probabilities (n, classes), known-feature count per text)."""
+        doc_ids, feat_ids, values = _vectorize(texts, self.n_features)
+        rows = self._row_of[feat_ids]
+        known = rows >= 0
+        doc_ids, rows, values = doc_ids[known], rows[known], values[known]
+        scores = np.tile(self.bias, (len(texts), 1))
+        np.add.at(scores, doc_ids, self.weights[rows] * values[:, None])
+        known_counts = np.bincount(doc_ids, minlength=len(texts))
+        return _softmax(scores), known_counts
+
+    def predict_batch(self, texts) -> list:
+        """Vectorised detect_category over many descriptions: [(category, confidence)]."""
+        if not texts:
+            return []
+        probs, known_counts = self.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        results = []
+        for i, cls in enumerate(best):
+            confidence = float(probs[i, cls])
+            if known_counts[i] == 0 or confidence < self.min_confidence:
+                results.append(("Other", 0.0 if known_counts[i] == 0 else confidence))
+            else:
+                results.append((self.classes[cls], confidence))
+        return results
+
+    def detect_category(self, description: str) -> tuple[str, float]:
+        """Drop-in replacement for text_rules.detect_category."""
+        return self.predict_batch([description])[0]
+
+    # ----- persistence -----
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            classes=np.array(self.classes),
+            feature_ids=self.feature_ids,
+            weights=self.weights.astype(np.float16),
+            bias=self.bias,
+            n_features=np.int64(self.n_features),
+            min_confidence=np.float32(self.min_confidence),
+        )
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        return cls(
+            classes=[str(c) for c in data["classes"]],
+            feature_ids=data["feature_ids"],
+            weights=data["weights"].astype(np.float32),
+            bias=data["bias"],
+            n_features=int(data["n_features"]),
+            min_confidence=float(data["min_confidence"]),
+        )
+
+
+# ------------------------------------
+# Offline training
+# ------------------------------------
+def load_training_data(path=None, include_keywords: bool = True):
+    """
+    Accepted reports from dataset.jsonl as (description, category) pairs.
+    Each category keyword is added as a short pseudo-document so the model
+    covers the full keyword vocabulary even when the dataset is small.
+    """
+    path = Path(path) if path else dataset.DATA_FILE
+    texts, labels = [], []
+    if path.exists():
+        with path.open("r", encoding="utf8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    report = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if report.get("status") == "accepted" and report.get("accept") is True and report.get("category"):
+                    texts.append(report.get("description") or "")
+                    labels.append(report["category"])
+    if include_keywords:
+        for category, keywords in rules_config.current().category_keywords.items():
+            for kw in keywords:
+                texts.append(kw)
+                labels.append(category)
+    return texts, labels
+
+
+def train(texts, labels, epochs: int = 100, learning_rate: float = 4.0, l2: float = 1e-4,
+          n_features: int = N_FEATURES, min_confidence: float = 0.4, seed: int = 0) -> LinearTextClassifier:
+    """Mini-batch softmax regression on hashed features."""
+    classes = sorted(set(labels))
+    class_index = {c: i for i, c in enumerate(classes)}
+    y = np.array([class_index[label] for label in labels], dtype=np.int64)
+    doc_ids, feat_ids, values = _vectorize(texts, n_features)
+
+    # Train on the compact set of features that actually occur
+    used, compact = np.unique(feat_ids, return_inverse=True)
+    weights = np.zeros((len(used), len(classes)), dtype=np.float32)
+    bias = np.zeros(len(classes), dtype=np.float32)
+    onehot = np.eye(len(classes), dtype=np.float32)[y]
+    rng = np.random.default_rng(seed)
+    batch_size = 32
+
+    for _ in range(epochs):
+        order = rng.permutation(len(texts))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            position = np.full(len(texts), -1, dtype=np.int64)
+            position[batch] = np.arange(len(batch))
+            mask = position[doc_ids] >= 0
+            b_docs, b_feats, b_vals = position[doc_ids[mask]], compact[mask], values[mask]
+
+            scores = np.tile(bias, (len(batch), 1))
+            np.add.at(scores, b_docs, weights[b_feats] * b_vals[:, None])
+            error = (_softmax(scores) - onehot[batch]) / len(batch)
+
+            grad = np.zeros_like(weights)
+            np.add.at(grad, b_feats, error[b_docs] * b_vals[:, None])
+            weights -= learning_rate * (grad + l2 * weights)
+            bias -= learning_rate * error.sum(axis=0)
+
+    keep = np.abs(weights).max(axis=1) > 1e-4
+    # Rounded to the float16 the artifact stores, so a saved and reloaded model predicts exactly the same
+    weights = weights[keep].astype(np.float16).astype(np.float32)
+    return LinearTextClassifier(classes, used[keep], weights, bias, n_features, np.float32(min_confidence))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the linear text classifier from dataset.jsonl")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train_cmd = sub.add_parser("train", help="Train and save a model artifact")
+    train_cmd.add_argument("--dataset", default=str(dataset.DATA_FILE))
+    train_cmd.add_argument("--output", default=str(DEFAULT_MODEL_PATH))
+    train_cmd.add_argument("--epochs", type=int, default=100)
+    train_cmd.add_argument("--min-confidence", type=float, default=0.4)
+    train_cmd.add_argument("--no-keywords", action="store_true", help="Do not add keyword pseudo-documents")
+    args = parser.parse_args(argv)
+
+    texts, labels = load_training_data(args.dataset, include_keywords=not args.no_keywords)
+    if not texts:
+        raise SystemExit("No training data found")
+    model = train(texts, labels, epochs=args.epochs, min_confidence=args.min_confidence)
+    model.save(args.output)
+    size = Path(args.output).stat().st_size
+    print(f"Trained on {len(texts)} examples, {len(model.classes)} classes, "
+          f"{len(model.weights)} features kept -> {args.output} ({size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
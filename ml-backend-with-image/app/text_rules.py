@@ -61,108 +61,134 @@ def is_abusive(description: str) -> bool:
 
 
 # ------------------------------------
-# Category keywords (CORRECTED)
+# Category keywords
 # ------------------------------------
-CATEGORY_KEYWORDS = {
-
-    "Road & Traffic": [
-        "road", "pothole", "crack", "broken road", "damaged road",
-        "road caved", "road sinking", "uneven road",
-        "traffic", "traffic jam", "congestion",
-        "signal", "traffic signal", "junction", "crossroad",
-        "accident", "collision", "crash", "hit",
-        "speed breaker", "speed bump", "divider",
-        "footpath", "sidewalk", "zebra crossing", "pedestrian"
-    ],
-
-    "Garbage & Sanitation": [
-        "garbage", "trash", "waste", "dump", "dumping",
-        "garbage pile", "waste pile",
-        "dirty", "filthy", "unclean",
-        "bad smell", "toxic smell", "foul smell",
-        "dustbin", "overflowing bin",
-        "sanitation", "sewage", "sewer", "manhole",
-
-        # DEAD ANIMAL (strict & safe)
-        "dead", "dead animal", "animal carcass",
-        "dead dog", "dead cat", "dead cow",
-        "dead body",
+# The category keyword lists live in config/rules.json and are compiled by
+# app.rules (regex matchers, spelling index). Functions below take an optional
+# `rules` snapshot and default to the currently active one.
+def _active_rules(rules):
+    if rules is not None:
+        return rules
+    from app import rules as rules_config
+    return rules_config.current()
 
-        "mosquito", "flies", "infection", "disease"
-    ],
-
-    "Water & Drainage": [
-        "water", "no water", "low pressure",
-        "drinking water", "contaminated water",
-        "leak", "leakage", "pipe leak",
-        "pipe burst", "broken pipe",
-        "drain", "drainage", "blocked drain",
-        "overflow", "overflowing drain",
-        "flood", "waterlogging", "stagnant water",
-        "sewage water", "rain water"
-    ],
-
-    "Electricity": [
-        "electricity", "electric", "power",
-        "no power", "power cut", "power outage",
-        "wire", "cable", "pole", "electric pole",
-        "transformer", "meter",
-        "short circuit", "spark",
-        "electrocution", "electric shock",
-        "live wire"
-    ],
-
-    "Street Lighting": [
-        "streetlight", "street light", "lamp",
-        "lamp post", "pole light",
-        "not working", "broken light",
-        "flickering", "dim light",
-        "dark", "dark area", "no lighting"
-    ],
 
-    "Public Safety": [
-        "fire", "smoke", "burning",
-        "gas", "gas leak", "cylinder leak",
-        "collapse", "building collapse",
-        "wall collapse", "roof falling",
-        "crime", "theft", "robbery",
-        "violence", "fight", "assault",
-        "hazard", "danger", "unsafe",
-        "emergency", "life risk"
-    ],
-
-    "Parks & Recreation": [
-        "park", "garden", "playground",
-        "children park", "public park",
-        "bench", "swing", "slide",
-        "walking track",
-        "tree", "fallen tree", "tree fallen",
-        "lawn", "grass", "maintenance",
-        "broken fence"
-    ]
-}
+# ------------------------------------
+# Typo tolerance (SymSpell-style symmetric delete index)
+# ------------------------------------
+# Tokens shorter than this are never corrected ("fine" -> "fire", "will" -> "wall")
+SPELLING_MIN_TOKEN_LENGTH = 5
+# Tokens this long or longer may be corrected at edit distance 2, shorter ones at 1
+SPELLING_DISTANCE_2_MIN_LENGTH = 8
+SPELLING_MAX_DISTANCE = 2
+# Phonetic spellings that are too far from the keyword for edit distance
+# ("streetlite" is 3 edits from "streetlight"); tried before the distance search
+PHONETIC_SUFFIXES = (("lite", "light"), ("nite", "night"), ("rite", "right"), ("thru", "through"))
+
+
+def _deletes(word: str, max_distance: int) -> set:
+    """All strings reachable from word by deleting up to max_distance characters."""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Optimal string alignment distance (Levenshtein + adjacent transpositions)."""
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[len(b)]
+
+
+def build_spelling_index(keyword_lists, max_distance: int = SPELLING_MAX_DISTANCE):
+    """Map every delete-variant of every keyword word to the words that produce it."""
+    vocabulary = {word for keywords in keyword_lists for kw in keywords for word in kw.split()}
+    index = {}
+    for word in vocabulary:
+        for variant in _deletes(word, max_distance):
+            index.setdefault(variant, set()).add(word)
+    return vocabulary, index
+
+
+def correct_token(token: str, rules=None) -> str:
+    """
+    Return the keyword word closest to token (edit distance 1-2), or token itself.
+    Lookup generates the token's own delete-variants and intersects them with the
+    precomputed index, so the cost does not depend on the vocabulary size.
+    Candidates must share the first letter ("night" must not become "fight").
+    Phonetic suffixes ("-lite" for "-light") are respelled first.
+    """
+    if len(token) < SPELLING_MIN_TOKEN_LENGTH:
+        return token
+    rules = _active_rules(rules)
+    if token in rules.spelling_vocabulary:
+        return token
+    for suffix, replacement in PHONETIC_SUFFIXES:
+        if token.endswith(suffix) and token[:-len(suffix)] + replacement in rules.spelling_vocabulary:
+            return token[:-len(suffix)] + replacement
+    max_distance = 2 if len(token) >= SPELLING_DISTANCE_2_MIN_LENGTH else 1
+    candidates = set()
+    for variant in _deletes(token, max_distance):
+        candidates |= rules.spelling_index.get(variant, set())
+    best, best_distance = token, max_distance + 1
+    for word in sorted(candidates):
+        if word[0] != token[0]:
+            continue
+        distance = _edit_distance(token, word)
+        if distance < best_distance:
+            best, best_distance = word, distance
+    return best
+
+
+def correct_spelling(text: str, rules=None) -> str:
+    """Correct each out-of-vocabulary word in already-normalised text."""
+    rules = _active_rules(rules)
+    return re.sub(r"[a-z]+", lambda m: correct_token(m.group(0), rules), text)
 
 
 # ------------------------------------
 # Category detection (IMPROVED with confidence scoring)
 # ------------------------------------
-def detect_category(description: str) -> tuple[str, float]:
+def detect_category(description: str, rules=None) -> tuple[str, float]:
     """
     Detect category and return confidence score (0.0 to 1.0).
     Returns: (category, confidence)
     - confidence >= 0.8: High confidence
     - confidence >= 0.5: Medium confidence
     - confidence < 0.5: Low confidence
+    If no keyword matches, misspelled words are corrected against the
+    keyword vocabulary ("pathole" -> "pothole") and matching is retried.
     """
+    rules = _active_rules(rules)
     text = normalize(description)
+    category, confidence = _score_categories(text, rules)
+    if category == "Other":
+        corrected = correct_spelling(text, rules)
+        if corrected != text:
+            category, confidence = _score_categories(corrected, rules)
+    return (category, confidence)
+
 
+def _score_categories(text: str, rules) -> tuple[str, float]:
+    """Keyword-count scoring over already-normalised text."""
     best_category = "Other"
     max_score = 0
     max_keyword_length = 0
     total_keywords_matched = 0
 
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        matches = [kw for kw in keywords if contains(text, kw)]
+    for category, patterns in rules.keyword_patterns.items():
+        matches = [kw for kw, pattern in patterns if pattern.search(text)]
         score = len(matches)
 
         if score > max_score:
@@ -189,7 +215,7 @@ def detect_category(description: str) -> tuple[str, float]:
         
         # Boost for specific keywords (longer = more specific)
         # Normalize by average keyword length in best category
-        avg_keyword_length = sum(len(kw) for kw in CATEGORY_KEYWORDS.get(best_category, [])) / max(len(CATEGORY_KEYWORDS.get(best_category, [])), 1)
+        avg_keyword_length = rules.avg_keyword_length.get(best_category, 0)
         specificity_boost = min(max_keyword_length / (avg_keyword_length * 2), 0.3) if avg_keyword_length > 0 else 0
         
         confidence = min(base_confidence + specificity_boost, 1.0)
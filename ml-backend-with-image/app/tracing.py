@@ -0,0 +1,92 @@
+# Opt-in per-request timing trace, returned as a Server-Timing header.
+#
+# Send "X-Debug-Timing: 1" and the response carries a Server-Timing header
+# with the time spent in each classify_report stage (the same stages as
+# /metrics) plus notes such as index sizes and cache hits. Without the header
+# no trace object exists: stage timers only check a ContextVar that is None.
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+DEBUG_HEADER = b"x-debug-timing"
+
+_current = ContextVar("request_trace", default=None)
+
+
+class RequestTrace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}  # stage -> [total seconds, count], in first-seen order
+        self.notes = {}
+
+    def add(self, stage: str, seconds: float):
+        entry = self.stages.get(stage)
+        if entry is None:
+            self.stages[stage] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def server_timing(self) -> str:
+        """Server-Timing header value; durations in milliseconds."""
+        parts = []
+        for stage, (seconds, count) in self.stages.items():
+            part = f"{stage};dur={seconds * 1000:.2f}"
+            if count > 1:
+                part += f';desc="x{count}"'
+            parts.append(part)
+        for key, value in self.notes.items():
+            parts.append(f'{key};desc="{value}"')
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+def current() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+def record(stage: str, seconds: float):
+    trace = _current.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def note(key: str, value):
+    """Attach a fact (index size, cache outcome, ...) to the active trace, if any."""
+    trace = _current.get()
+    if trace is not None:
+        trace.notes[key] = value
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware: trace requests that send X-Debug-Timing and add Server-Timing to the response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_trace(scope):
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+
+
+def _wants_trace(scope) -> bool:
+    for name, value in scope.get("headers", ()):
+        if name == DEBUG_HEADER:
+            return value.strip() not in (b"", b"0", b"false")
+    return False
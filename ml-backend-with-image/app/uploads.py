@@ -0,0 +1,267 @@
+# Image upload helpers: size limits, incremental base64 decoding, reusable buffers,
+# chunked multipart reads and a per-route request body limit.
+import base64
+import threading
+from typing import Optional
+
+from starlette.exceptions import HTTPException
+
+MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Multipart uploads are read this many bytes at a time; images up to this size
+# are returned straight from a single read, without copying
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Base64 characters decoded per step (multiple of 4 so chunks decode independently)
+_B64_CHUNK_CHARS = 64 * 1024
+
+
+class ImageTooLarge(ValueError):
+    """Raised as soon as an image is known to exceed the size limit."""
+
+    def __init__(self, size: int, max_size: int = MAX_IMAGE_SIZE):
+        self.size = size
+        self.max_size = max_size
+        super().__init__(
+            f"Image file too large. Maximum size is {max_size / (1024*1024):.1f}MB, "
+            f"got {size / (1024*1024):.1f}MB"
+        )
+
+
+def strip_data_uri(value: str) -> str:
+    """Remove a data URI prefix (e.g. "data:image/jpeg;base64,") if present."""
+    value = value.strip()
+    if value.startswith("data:"):
+        # The prefix is short; don't scan the whole payload for the comma
+        comma = value.find(",", 0, 256)
+        if comma != -1:
+            return value[comma + 1:]
+    return value
+
+
+def decoded_base64_length(data: str) -> int:
+    """Exact decoded size of padded base64 text, without decoding it."""
+    if len(data) % 4:
+        raise ValueError("Invalid base64-encoded image data (length is not a multiple of 4)")
+    padding = 2 if data.endswith("==") else 1 if data.endswith("=") else 0
+    return len(data) // 4 * 3 - padding
+
+
+class BufferPool:
+    """
+    Small pool of reusable bytearrays for decoded images, so steady traffic does
+    not allocate a fresh multi-megabyte buffer per request. A buffer must be
+    released once nothing references the decoded image any more.
+    """
+
+    def __init__(self, max_buffers: int = 4, max_buffer_size: int = MAX_IMAGE_SIZE):
+        self.max_buffers = max_buffers
+        self.max_buffer_size = max_buffer_size
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self, size: int) -> bytearray:
+        with self._lock:
+            for i, buf in enumerate(self._free):
+                if len(buf) >= size:
+                    return self._free.pop(i)
+        return bytearray(size)
+
+    def release(self, buf: bytearray):
+        if buf is None or len(buf) > self.max_buffer_size:
+            return
+        with self._lock:
+            if len(self._free) < self.max_buffers:
+                self._free.append(buf)
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(len(buf) for buf in self._free)
+
+
+image_buffers = BufferPool()
+
+
+def decode_base64_image(value: str, max_size: int = MAX_IMAGE_SIZE, pool: BufferPool = None):
+    """
+    Decode a base64 image (data URI or plain) exactly once, chunk by chunk, into
+    one buffer. The size limit is enforced before decoding (from the encoded
+    length) and again while decoding, so oversized payloads are rejected without
+    materialising the decoded image.
+
+    Returns (image, buffer): image is a memoryview of the decoded bytes; buffer is
+    the backing bytearray to hand back to pool.release() when done (None if no pool).
+    """
+    data = strip_data_uri(value)
+    size = decoded_base64_length(data)
+    if size > max_size:
+        raise ImageTooLarge(size, max_size)
+    if size == 0:
+        raise ValueError("Image file is empty")
+
+    buffer = pool.acquire(size) if pool is not None else bytearray(size)
+    try:
+        view = memoryview(buffer)
+        written = 0
+        for start in range(0, len(data), _B64_CHUNK_CHARS):
+            try:
+                decoded = base64.b64decode(data[start:start + _B64_CHUNK_CHARS], validate=True)
+            except Exception:
+                raise ValueError("Invalid base64-encoded image data")
+            end = written + len(decoded)
+            if end > max_size or end > size:
+                raise ImageTooLarge(end, max_size)
+            view[written:end] = decoded
+            written = end
+        return view[:written], (buffer if pool is not None else None)
+    except Exception:
+        if pool is not None:
+            pool.release(buffer)
+        raise
+
+
+# ------------------------------------
+# Multipart uploads
+# ------------------------------------
+class UnsupportedImageType(ValueError):
+    """Raised when the first bytes of an upload are not a known image signature."""
+
+
+# (offset, magic bytes, content type) - the formats PIL can open without plugins.
+# Multipart uploads whose first bytes match none of these (or ISO_IMAGE_BRANDS)
+# are rejected before the rest is read; the declared content type is ignored.
+IMAGE_SIGNATURES = (
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (8, b"WEBP", "image/webp"),
+    (0, b"BM", "image/bmp"),
+    (0, b"II*\x00", "image/tiff"),
+    (0, b"MM\x00*", "image/tiff"),
+)
+# ISO base media files ("....ftyp<brand>"): AVIF (decoded by Pillow 11.3+) and
+# HEIC (decoded when a HEIF plugin such as pillow-heif is installed, else
+# classified as 'other' like any image PIL cannot open)
+ISO_IMAGE_BRANDS = {
+    b"avif": "image/avif", b"avis": "image/avif",
+    b"heic": "image/heic", b"heix": "image/heic", b"heim": "image/heic", b"heis": "image/heic",
+    b"hevc": "image/heic", b"mif1": "image/heif", b"msf1": "image/heif",
+}
+SUPPORTED_FORMATS = "JPEG, PNG, GIF, WebP, BMP, TIFF, AVIF or HEIC"
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Content type from the file signature, or None if it is not a supported image."""
+    for offset, magic, content_type in IMAGE_SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            if content_type == "image/webp" and head[:4] != b"RIFF":
+                continue
+            return content_type
+    if head[4:8] == b"ftyp":
+        return ISO_IMAGE_BRANDS.get(head[8:12])
+    return None
+
+
+async def read_upload_limited(upload, max_size: int = MAX_IMAGE_SIZE, chunk_size: int = UPLOAD_CHUNK_SIZE):
+    """
+    Read an UploadFile in chunks, stopping as soon as it exceeds max_size.
+
+    The declared size (when the server knows it) is checked before anything is
+    read, and the file signature is checked on the first chunk, so oversized or
+    non-image uploads are rejected without being loaded into memory. Images
+    that fit in one chunk are returned as the bytes of that single read; larger
+    ones are accumulated into one bytearray.
+    """
+    declared = getattr(upload, "size", None)
+    if declared is not None and declared > max_size:
+        raise ImageTooLarge(declared, max_size)
+
+    first = await upload.read(chunk_size)
+    if not first:
+        raise ValueError("Image file is empty")
+    if sniff_image_type(first[:16]) is None:
+        raise UnsupportedImageType(f"Unsupported image format (expected {SUPPORTED_FORMATS})")
+    if len(first) < chunk_size:
+        return first
+
+    data = bytearray(first)
+    del first
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        if len(data) + len(chunk) > max_size:
+            raise ImageTooLarge(len(data) + len(chunk), max_size)
+        data += chunk
+    if len(data) > max_size:
+        raise ImageTooLarge(len(data), max_size)
+    return data
+
+
+# ------------------------------------
+# Request body limit
+# ------------------------------------
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware capping the request body size for selected paths.
+
+    A Content-Length over the limit is answered with 413 before the body is
+    read. Otherwise the body is counted as it streams in and the request is
+    aborted with 413 as soon as the limit is crossed, so an oversized multipart
+    upload is never fully received or spooled.
+    """
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length" and value.isdigit() and int(value) > limit:
+                await self._reject(send, limit)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=self._detail(limit))
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(send, limit)
+
+    @staticmethod
+    def _detail(limit: int) -> str:
+        return f"Request body too large. Maximum is {limit} bytes"
+
+    async def _reject(self, send, limit: int):
+        body = ('{"detail": "%s"}' % self._detail(limit)).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pipeline.classify_report and the storage duplicate checks against
+synthetic datasets of increasing size.
+
+For each dataset size a dataset.jsonl of accepted reports is generated (see
+generate_dataset.py) in a temporary directory, then each operation is timed over a set of queries,
+text-only and with images. Reports throughput and p50/p95/p99 latency.
+
+Runs offline: CLIP is replaced by a stub classifier (no model weights needed)
+and the keyword text engine is used.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 1000,100000,1000000] [--queries 200] [--json]
+The duplicate checks scan the whole dataset per call, so the number of
+queries is scaled down for large datasets (see --scan-budget).
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import dataset, storage, pipeline
+from app import image_classifier as ic
+from generate_dataset import DatasetGenerator, write_dataset
+
+# Every generated report is accepted, so a dataset of N records has N accepted reports
+ACCEPTED_ONLY = {"reject_rate": 0.0, "duplicate_rate": 0.0, "near_duplicate_rate": 0.0, "phash_collision_rate": 0.0}
+
+
+# ------------------------------------
+# Offline stub classifier
+# ------------------------------------
+def install_stub_classifier(latency_ms: float = 0.0):
+    """Replace the image backend with a deterministic stub ("other" = allowed through, like an uncertain CLIP label)."""
+    def classify_image_from_bytes(image_bytes, candidate_labels=None, text_features=None):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        return "other"
+
+    def classify_images_from_bytes(images, candidate_labels=None, text_features=None):
+        return [classify_image_from_bytes(image) for image in images]
+
+    ic.initialize_backend = lambda: None
+    ic.classify_image_from_bytes = classify_image_from_bytes
+    ic.classify_images_from_bytes = classify_images_from_bytes
+    pipeline.TEXT_ENGINE = "keyword"
+
+
+# ------------------------------------
+# Timing
+# ------------------------------------
+def percentile(sorted_values, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def measure(fn, queries) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for query in queries:
+        t0 = time.perf_counter()
+        fn(query)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "ops_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def run_size(size: int, queries: int, with_images: bool, seed: int) -> dict:
+    tmp_dir = Path(tempfile.mkdtemp(prefix="bench-pipeline-"))
+    dataset.DATA_FILE = tmp_dir / "dataset.jsonl"
+    storage._near_dup_index = None
+    storage._near_dup_offset = 0
+    image_rate = 1.0 if with_images else 0.0
+
+    started = time.perf_counter()
+    write_dataset(dataset.DATA_FILE, size, seed=seed, image_rate=image_rate, **ACCEPTED_ONLY)
+    results = {"dataset_write_s": time.perf_counter() - started}
+
+    generator = DatasetGenerator(seed=seed + 1, image_rate=image_rate, **ACCEPTED_ONLY)
+    reports = list(generator.generate(queries))
+    for i, report in enumerate(reports):
+        report["report_id"] = f"bench-query-{size}-{i}"
+        report["image_bytes"] = generator.make_image(i, report["category"]) if with_images else None
+
+    started = time.perf_counter()
+    storage.is_near_duplicate("warmup", "warm up the index", "Road & Traffic", store=False)
+    results["near_dup_index_build_s"] = time.perf_counter() - started
+
+    ops = {
+        "is_duplicate": lambda r: storage.is_duplicate(r["user_id"], r["description"], r["category"], store=False),
+        "is_near_duplicate": lambda r: storage.is_near_duplicate(r["user_id"], r["description"], r["category"], store=False),
+        "is_duplicate_location": lambda r: storage.is_duplicate_location(
+            r["latitude"], r["longitude"], r["description"], r["category"], threshold=10.0, store=False),
+    }
+    if with_images:
+        ops["is_duplicate_image_from_bytes"] = lambda r: storage.is_duplicate_image_from_bytes(r["image_bytes"], threshold=0, store=False)
+    fields = ("report_id", "description", "user_id", "latitude", "longitude", "image_bytes")
+    ops["classify_report"] = lambda r: pipeline.classify_report({k: r[k] for k in fields})
+
+    for name, fn in ops.items():
+        results[name] = measure(fn, reports)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma-separated dataset sizes")
+    parser.add_argument("--queries", type=int, default=200, help="Timed calls per operation (before scaling)")
+    parser.add_argument("--scan-budget", type=int, default=5_000_000,
+                        help="Max dataset rows scanned per operation; queries = min(--queries, budget / size)")
+    parser.add_argument("--modes", default="text,image", help="text, image or both")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated CLIP latency per image")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    install_stub_classifier(args.stub_latency_ms)
+    original_file = dataset.DATA_FILE
+    report = {}
+    try:
+        for size in [int(s) for s in args.sizes.split(",")]:
+            queries = max(5, min(args.queries, args.scan_budget // size))
+            for mode in args.modes.split(","):
+                report[f"{mode}_{size}"] = run_size(size, queries, mode == "image", args.seed)
+    finally:
+        dataset.DATA_FILE = original_file
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 86)
+    print("Pipeline benchmark (stub image classifier, keyword text engine)")
+    print("=" * 86)
+    for key, results in report.items():
+        print(f"\n{key}: dataset written in {results['dataset_write_s']:.1f}s, "
+              f"near-duplicate index built in {results['near_dup_index_build_s']:.2f}s")
+        print(f"  {'operation':32} {'calls':>6} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for name, stats in results.items():
+            if isinstance(stats, dict):
+                print(f"  {name:32} {stats['calls']:6d} {stats['ops_per_sec']:10.1f} "
+                      f"{stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
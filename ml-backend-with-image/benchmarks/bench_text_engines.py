@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark: keyword engine vs linear text engine.
+Reports per-report latency, throughput at several batch sizes, and how often
+the linear engine agrees with the keyword engine (overall and per category).
+
+Agreement is measured on a held-out split of the dataset's accepted reports
+(--holdout, default 20%): a model is trained in memory on the rest (plus the
+keyword pseudo-documents) so it is never scored on its own training examples.
+With --model an existing artifact is used instead; it was normally trained on
+the whole dataset, so its agreement is in-sample and reported as such.
+
+Usage:
+    python benchmarks/bench_text_engines.py [--dataset data/dataset.jsonl] [--holdout 0.2] [--json]
+    python benchmarks/bench_text_engines.py --model data/text_model.npz
+"""
+import sys
+import os
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import dataset, text_model
+from app import rules as rules_config
+from app.text_rules import detect_category
+
+
+def load_descriptions(path: Path) -> list:
+    """All descriptions in the dataset (accepted and rejected)."""
+    descriptions = []
+    if path.exists():
+        with path.open("r", encoding="utf8") as f:
+            for line in f:
+                try:
+                    report = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if report.get("description"):
+                    descriptions.append(report["description"])
+    return descriptions
+
+
+def split_holdout(path: Path, fraction: float, seed: int):
+    """Accepted (description, category) pairs, shuffled and split into (training, held out)."""
+    texts, labels = text_model.load_training_data(path, include_keywords=False)
+    pairs = list(zip(texts, labels))
+    random.Random(seed).shuffle(pairs)
+    cut = int(round(len(pairs) * fraction))
+    return pairs[cut:], pairs[:cut]
+
+
+def train_without(training_pairs) -> "text_model.LinearTextClassifier":
+    """Train on the training split plus the keyword pseudo-documents, as app.text_model does."""
+    texts = [text for text, _ in training_pairs]
+    labels = [label for _, label in training_pairs]
+    for category, keywords in rules_config.current().category_keywords.items():
+        texts.extend(keywords)
+        labels.extend([category] * len(keywords))
+    return text_model.train(texts, labels)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=str(dataset.DATA_FILE))
+    parser.add_argument("--model", default=None, help="Use this artifact instead of training on the split (in-sample)")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of accepted reports kept out of training")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=200, help="Replicate the descriptions this many times")
+    parser.add_argument("--batch-sizes", default="1,32,256")
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+
+    descriptions = load_descriptions(Path(args.dataset))
+    if not descriptions:
+        raise SystemExit(f"No descriptions found in {args.dataset}")
+    texts = descriptions * args.repeat
+
+    training, held_out = split_holdout(Path(args.dataset), args.holdout, args.seed)
+    if args.model:
+        model = text_model.LinearTextClassifier.load(args.model)
+        evaluated = [text for text, _ in training + held_out]
+        evaluation = f"in-sample: {len(evaluated)} accepted reports (artifact {args.model})"
+    else:
+        if not held_out or not training:
+            raise SystemExit(f"Not enough accepted reports in {args.dataset} for a {args.holdout:.0%} held-out split")
+        model = train_without(training)
+        evaluated = [text for text, _ in held_out]
+        evaluation = f"held out: {len(evaluated)} of {len(training) + len(held_out)} accepted reports"
+
+    _, keyword_time = timed(lambda: [detect_category(t) for t in texts])
+    report = {
+        "reports": len(texts),
+        "keyword": {
+            "us_per_report": keyword_time / len(texts) * 1e6,
+            "reports_per_sec": len(texts) / keyword_time,
+        },
+        "linear": {},
+    }
+
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        def run():
+            out = []
+            for i in range(0, len(texts), batch_size):
+                out.extend(model.predict_batch(texts[i:i + batch_size]))
+            return out
+        _, linear_time = timed(run)
+        report["linear"][f"batch_{batch_size}"] = {
+            "us_per_report": linear_time / len(texts) * 1e6,
+            "reports_per_sec": len(texts) / linear_time,
+        }
+
+    per_category = {}
+    for text, (lin_cat, _) in zip(evaluated, model.predict_batch(evaluated)):
+        kw_cat = detect_category(text)[0]
+        stats = per_category.setdefault(kw_cat, {"total": 0, "agree": 0})
+        stats["total"] += 1
+        stats["agree"] += int(kw_cat == lin_cat)
+    report["agreement_on"] = evaluation
+    report["agreement"] = sum(s["agree"] for s in per_category.values()) / len(evaluated)
+    report["agreement_per_category"] = {
+        cat: s["agree"] / s["total"] for cat, s in sorted(per_category.items())
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 60)
+    print(f"Text engine benchmark ({len(texts)} reports)")
+    print("=" * 60)
+    print(f"keyword          : {report['keyword']['us_per_report']:8.1f} us/report  {report['keyword']['reports_per_sec']:10.0f} reports/s")
+    for name, stats in report["linear"].items():
+        print(f"linear {name:10}: {stats['us_per_report']:8.1f} us/report  {stats['reports_per_sec']:10.0f} reports/s")
+    print(f"\nAgreement with keyword engine ({evaluation}): {report['agreement']:.1%}")
+    for cat, rate in report["agreement_per_category"].items():
+        print(f"  {cat:22} {rate:.1%}")
+
+
+if __name__ == "__main__":
+    main()
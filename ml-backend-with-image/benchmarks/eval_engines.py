@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Accuracy vs latency across engines: replays a labelled set of reports through
+several text and image engines (one worker process per engine, in parallel)
+and reports, per engine, accuracy against the labels, agreement with the
+reference engine (overall and per category), per-report latency and batch
+throughput.
+
+Engines are <stage>:<name>:
+  text:keyword   rule-based category engine (text reference)
+  text:linear    hashed n-gram model (--text-model, see app/text_model.py)
+  image:clip     IMAGE_BACKEND=clip (image reference)
+  image:onnx     IMAGE_BACKEND=onnx
+  image:stub     IMAGE_BACKEND=stub
+Text engines predict the category. Image engines predict a label; a report
+counts as correct when the label is compatible with its labelled category
+(rules.label_matches_category, the check the pipeline rejects on). The image
+fallback label "other" (undecodable image, backend failure) is never correct,
+even though the pipeline lets it through. Each engine's fallback rate (text
+"Other", image "other") is reported next to its accuracy. Engines that cannot
+be loaded here (e.g. clip without weights) are reported with an error.
+
+The labelled set is a JSONL file of reports with `description` and the expected
+`category` (dataset.jsonl works: accepted reports are used), images from
+`image_path` or <--images-dir>/<report_id>.png. Without --labelled a synthetic
+set is generated (generate_dataset.py). Its categories agree with the keyword
+engine by construction, so use it for latency and agreement, and a
+hand-labelled file for accuracy.
+
+Usage:
+    python benchmarks/eval_engines.py [--engines text:keyword,text:linear,image:stub,image:clip] [--count 500] [--json]
+    python benchmarks/eval_engines.py --labelled labelled.jsonl --images-dir images/ --json
+"""
+import sys
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_ENGINES = "text:keyword,text:linear,image:stub,image:clip"
+REFERENCE = {"text": "text:keyword", "image": "image:clip"}
+
+
+# ------------------------------------
+# Labelled set
+# ------------------------------------
+def load_labelled(path: Path, images_dir: Path = None) -> list:
+    """Reports with a description and expected category; image bytes if there is an image."""
+    items = []
+    with path.open("r", encoding="utf8") as f:
+        for line in f:
+            try:
+                report = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not report.get("description") or not report.get("category") or report.get("status", "accepted") != "accepted":
+                continue
+            image_path = report.get("image_path")
+            if image_path is None and images_dir is not None:
+                image_path = images_dir / f"{report.get('report_id')}.png"
+            image = Path(image_path).read_bytes() if image_path and Path(image_path).exists() else None
+            items.append({"description": report["description"], "category": report["category"], "image": image})
+    return items
+
+
+def generate_labelled(count: int, seed: int) -> list:
+    from bench_pipeline import ACCEPTED_ONLY
+    from generate_dataset import DatasetGenerator
+
+    generator = DatasetGenerator(seed=seed, image_rate=1.0, **ACCEPTED_ONLY)
+    return [{"description": r["description"], "category": r["category"], "image": generator.make_image(i, r["category"])}
+            for i, r in enumerate(generator.generate(count))]
+
+
+# ------------------------------------
+# Engine workers (one process per engine)
+# ------------------------------------
+def _text_engine(name: str, text_model_path: str):
+    from app import pipeline
+    from app import rules as rules_config
+
+    pipeline.TEXT_ENGINE = name
+    if text_model_path:
+        pipeline.TEXT_MODEL_PATH = text_model_path
+    pipeline._text_model_loaded = False
+    if name == "linear" and pipeline._get_text_model() is None:
+        raise RuntimeError("linear text model not found (train it with python -m app.text_model train)")
+    rules = rules_config.current()
+
+    def predict(batch):
+        return [category for category, _ in pipeline.detect_categories([item["description"] for item in batch], rules)]
+    return predict, lambda item, category: category == item["category"], "Other"
+
+
+def _image_engine(name: str):
+    from app import image_classifier as ic
+    from app import rules as rules_config
+
+    ic.IMAGE_BACKEND = name
+    ic.initialize_backend()
+    if not ic._available:
+        raise RuntimeError(f"image backend '{name}' could not be loaded")
+    rules = rules_config.load_rules()  # label embeddings from this backend
+    labels = list(rules.candidate_labels)
+
+    def predict(batch):
+        return ic.classify_images_from_bytes([item["image"] for item in batch], labels, rules.text_features)
+
+    def correct(item, label):
+        # label_matches_category accepts the fallback for any category; here it is no answer
+        return label != "other" and rules.label_matches_category(label, item["category"])
+    return predict, correct, "other"
+
+
+def run_engine(engine: str, items: list, batch_size: int, text_model_path: str = None) -> dict:
+    """Predictions, correctness, fallbacks, per-report latencies and batch throughput for one engine."""
+    import logging
+    logging.disable(logging.WARNING)
+    stage, name = engine.split(":", 1)
+    started = time.perf_counter()
+    try:
+        predict, correct, fallback = _text_engine(name, text_model_path) if stage == "text" else _image_engine(name)
+    except Exception as e:
+        return {"engine": engine, "error": str(e)}
+    load_s = time.perf_counter() - started
+
+    if stage == "image":
+        items = [item for item in items if item["image"]]
+    predict(items[:1])  # warm-up
+
+    predictions, latencies = [], []
+    for item in items:
+        t0 = time.perf_counter()
+        predictions.append(predict([item])[0])
+        latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    for i in range(0, len(items), batch_size):
+        predict(items[i:i + batch_size])
+    batch_s = time.perf_counter() - started
+
+    return {
+        "engine": engine,
+        "load_s": load_s,
+        "predictions": predictions,
+        "correct": [bool(correct(item, p)) for item, p in zip(items, predictions)],
+        "fallback": [p == fallback for p in predictions],
+        "categories": [item["category"] for item in items],
+        "latencies": latencies,
+        "batch_s": batch_s,
+    }
+
+
+# ------------------------------------
+# Report
+# ------------------------------------
+def percentile(sorted_values, q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _rate(flags) -> float:
+    return sum(flags) / len(flags) if flags else 0.0
+
+
+def _per_category(categories, flags) -> dict:
+    grouped = {}
+    for category, flag in zip(categories, flags):
+        grouped.setdefault(category, []).append(flag)
+    return {category: _rate(values) for category, values in sorted(grouped.items())}
+
+
+def summarize(raw: dict, batch_size: int) -> dict:
+    """Per-engine accuracy, fallback rate, agreement with the reference engine, latency and throughput."""
+    report = {}
+    for engine, result in raw.items():
+        if "error" in result:
+            report[engine] = {"error": result["error"]}
+            continue
+        count = len(result["predictions"])
+        latencies = sorted(result["latencies"])
+        summary = {
+            "reports": count,
+            "load_s": result["load_s"],
+            "accuracy": _rate(result["correct"]),
+            "accuracy_per_category": _per_category(result["categories"], result["correct"]),
+            "fallback_rate": _rate(result["fallback"]),
+            "latency_ms": {"mean": sum(latencies) / count * 1000 if count else 0.0,
+                           "p50": percentile(latencies, 0.50) * 1000 if count else 0.0,
+                           "p95": percentile(latencies, 0.95) * 1000 if count else 0.0,
+                           "p99": percentile(latencies, 0.99) * 1000 if count else 0.0},
+            "single_per_sec": count / sum(latencies) if sum(latencies) else 0.0,
+            f"batch_{batch_size}_per_sec": count / result["batch_s"] if result["batch_s"] else 0.0,
+        }
+        reference = raw.get(REFERENCE[engine.split(":", 1)[0]])
+        if reference is not None and "error" not in reference and reference is not result:
+            agree = [a == b for a, b in zip(result["predictions"], reference["predictions"])]
+            summary["reference"] = reference["engine"]
+            summary["agreement"] = _rate(agree)
+            summary["agreement_per_category"] = _per_category(result["categories"], agree)
+            # Same accept/reject outcome for the stage, even where the exact label differs
+            summary["decision_agreement"] = _rate([a == b for a, b in zip(result["correct"], reference["correct"])])
+        report[engine] = summary
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default=DEFAULT_ENGINES, help="Comma-separated <stage>:<name> engines")
+    parser.add_argument("--labelled", default=None, help="Labelled reports (JSONL with description and category)")
+    parser.add_argument("--images-dir", default=None, help="Images as <report_id>.png for --labelled")
+    parser.add_argument("--count", type=int, default=500, help="Synthetic reports when --labelled is not given")
+    parser.add_argument("--text-model", default=None, help="Linear text model artifact")
+    parser.add_argument("--batch-size", type=int, default=32, help="Batch size for the throughput pass")
+    parser.add_argument("--workers", type=int, default=0, help="Engines evaluated at once (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args(argv)
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    for engine in engines:
+        if engine.split(":", 1)[0] not in REFERENCE or ":" not in engine:
+            parser.error(f"bad engine '{engine}' (expected text:<name> or image:<name>)")
+    if args.labelled:
+        items = load_labelled(Path(args.labelled), Path(args.images_dir) if args.images_dir else None)
+    else:
+        items = generate_labelled(args.count, args.seed)
+    if not items:
+        raise SystemExit("No labelled reports to evaluate")
+
+    with ProcessPoolExecutor(max_workers=args.workers or len(engines)) as pool:
+        futures = {engine: pool.submit(run_engine, engine, items, args.batch_size, args.text_model) for engine in engines}
+        raw = {engine: future.result() for engine, future in futures.items()}
+    report = {
+        "labelled_set": args.labelled or f"synthetic ({args.count} reports, seed {args.seed})",
+        "reports": len(items),
+        "with_images": sum(1 for item in items if item["image"]),
+        "parallel_workers": args.workers or len(engines),
+        "engines": summarize(raw, args.batch_size),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 106)
+    print(f"Engine evaluation: {report['reports']} reports ({report['with_images']} with images), {report['labelled_set']}")
+    print("=" * 106)
+    print(f"{'engine':14} {'accuracy':>9} {'fallback':>9} {'agreement':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'single/s':>10} {f'batch{args.batch_size}/s':>10}")
+    for engine, stats in report["engines"].items():
+        if "error" in stats:
+            print(f"{engine:14} unavailable: {stats['error']}")
+            continue
+        agreement = f"{stats['agreement']:10.1%}" if "agreement" in stats else f"{'-':>10}"
+        print(f"{engine:14} {stats['accuracy']:9.1%} {stats['fallback_rate']:9.1%} {agreement} {stats['latency_ms']['p50']:9.3f} "
+              f"{stats['latency_ms']['p95']:9.3f} {stats['latency_ms']['p99']:9.3f} "
+              f"{stats['single_per_sec']:10.0f} {stats[f'batch_{args.batch_size}_per_sec']:10.0f}")
+    for engine, stats in report["engines"].items():
+        if "error" in stats:
+            continue
+        print(f"\n{engine} accuracy per category" + (f" (agreement with {stats['reference']})" if "reference" in stats else ""))
+        for category, rate in stats["accuracy_per_category"].items():
+            agree = f"  ({stats['agreement_per_category'][category]:.1%})" if "agreement_per_category" in stats else ""
+            print(f"  {category:24} {rate:7.1%}{agree}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset.jsonl generator for scale testing.
+
+Streams reports in the exact schema pipeline.classify_report saves through
+dataset.save_report (accepted reports carry urgency and image_hash, rejected
+ones the rejection reason), with:
+  - locations clustered around hotspots in real city centres
+  - a weighted category mix over the categories in config/rules.json
+  - exact and near-duplicate resubmissions (rejected with the pipeline's reasons)
+  - re-uploaded images: exact copies (rejected as duplicate images) and lightly
+    edited copies whose pHash lands a few bits away (accepted)
+  - a target overall rejected/accepted ratio
+Output is deterministic for a given --seed and memory stays bounded: only a
+window of recent reports is kept as duplicate sources.
+
+With --images-dir a small PNG is written for every report that has an image
+(<report_id>.png) and image_hash is the pHash of that file, so benchmarks and
+index builds can replay real inputs. Without it image_hash is a synthetic
+64-bit value (much faster for millions of records).
+
+Usage:
+    python benchmarks/generate_dataset.py --count 1000000 --output /tmp/dataset.jsonl [--seed 0]
+    python benchmarks/generate_dataset.py --count 5000 --images-dir /tmp/images --output /tmp/dataset.jsonl
+"""
+import sys
+import os
+import io
+import json
+import time
+import random
+import argparse
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import rules as rules_config
+from app.text_rules import detect_urgency
+
+# (name, latitude, longitude, share of reports)
+CITY_CENTRES = [
+    ("Bengaluru", 12.9716, 77.5946, 0.25),
+    ("Hyderabad", 17.3850, 78.4867, 0.20),
+    ("Mumbai", 19.0760, 72.8777, 0.20),
+    ("Delhi", 28.6139, 77.2090, 0.15),
+    ("Chennai", 13.0827, 80.2707, 0.10),
+    ("Visakhapatnam", 17.6868, 83.2185, 0.10),
+]
+HOTSPOTS_PER_CITY = 40
+HOTSPOT_SPREAD_DEG = 0.003   # ~300 m around a hotspot
+CITY_SPREAD_DEG = 0.05       # ~5 km for reports outside hotspots
+HOTSPOT_SHARE = 0.7
+
+# Relative weights; categories missing here get weight 1.0
+CATEGORY_WEIGHTS = {
+    "Road & Traffic": 3.0,
+    "Garbage & Sanitation": 2.5,
+    "Water & Drainage": 1.5,
+    "Street Lighting": 1.0,
+    "Electricity": 0.8,
+    "Public Safety": 0.7,
+    "Parks & Recreation": 0.5,
+}
+
+# Places and streets are category-neutral for the keyword engine, so the detected
+# category of a generated description is the one it was generated for
+PLACES = ["market", "school", "bus stop", "hospital", "temple", "post office", "bank", "mall",
+          "railway station", "colony", "apartment", "library", "church", "college", "lake"]
+TEMPLATES = [
+    "{kw} near {place} on {street}",
+    "There is a {kw} near the {place}, please fix it",
+    "{kw} at {street} {place} for {days} days",
+    "Please look into the {kw} problem near {place}",
+    "Big {kw} issue beside {street} {place}",
+    "{kw} near {place} since {days} days, very dangerous",
+    "Clear the {kw} near {place} immediately",
+]
+STREETS = ["MG Layout", "Station Street", "Anna Nagar", "1st Cross", "2nd Main", "Gandhi Nagar",
+           "Nehru Street", "Lake View Colony", "Temple Street", "Market Street", "Jubilee Hills"]
+INSULTS = ["useless idiots", "stupid officials", "what nonsense", "bloody fools"]
+NEAR_DUPLICATE_SUFFIXES = [" please fix", " urgently", ". Still not fixed", " asap", ". Please check"]
+
+REASON_ACCEPTED = "Report accepted successfully"
+REASON_DUPLICATE = "You have already submitted this report."
+REASON_NEAR_DUPLICATE = "You have already submitted a similar report."
+REASON_LOCATION = "A similar issue has already been reported at this location."
+REASON_IMAGE_MISMATCH = ("Image does not match the issue description. "
+                         "Please provide an image related to the reported category.")
+REASON_IMAGE_DUPLICATE = "Duplicate image detected. This image has already been used in another report."
+REASON_ABUSE = "Abusive language detected"
+REASON_UNCLEAR = "Unable to determine issue category. Please provide more details."
+
+FIRST_REPORT_MS = 1767700000000  # report ids are millisecond timestamps, like the app's clients send
+RECENT_WINDOW = 5000             # accepted reports kept as duplicate sources
+RECENT_IMAGES = 500              # images kept as re-upload sources
+
+# Templated descriptions repeat a lot; detect_urgency dominates generation time otherwise
+_urgency = lru_cache(maxsize=1 << 16)(detect_urgency)
+
+
+class DatasetGenerator:
+    """
+    Deterministic stream of dataset records. The rates are fractions of all
+    generated reports except phash_collision_rate, which applies to reports
+    with an image.
+    """
+
+    def __init__(self, seed: int = 0, reject_rate: float = 0.3, duplicate_rate: float = 0.05,
+                 near_duplicate_rate: float = 0.05, image_rate: float = 0.6,
+                 phash_collision_rate: float = 0.02, images_dir: Path = None, image_size: int = 64,
+                 users: int = None):
+        self.rng = random.Random(seed)
+        self.reject_rate = reject_rate
+        self.duplicate_rate = duplicate_rate
+        self.near_duplicate_rate = near_duplicate_rate
+        self.image_rate = image_rate
+        self.phash_collision_rate = phash_collision_rate
+        self.images_dir = Path(images_dir) if images_dir else None
+        self.image_size = image_size
+        self.users = users
+
+        # Rejections other than duplicates make up the rest of the target reject rate
+        resubmissions = duplicate_rate + near_duplicate_rate
+        self.other_reject_rate = max(0.0, reject_rate - resubmissions) / max(1e-9, 1.0 - resubmissions)
+
+        keywords = rules_config.current().category_keywords
+        self.categories = sorted(keywords)
+        self.category_weights = [CATEGORY_WEIGHTS.get(c, 1.0) for c in self.categories]
+        self.keywords = keywords
+        self.cities = [(lat, lon) for _, lat, lon, _ in CITY_CENTRES]
+        self.city_weights = [share for *_, share in CITY_CENTRES]
+        self.hotspots = [
+            [(lat + self.rng.gauss(0, CITY_SPREAD_DEG), lon + self.rng.gauss(0, CITY_SPREAD_DEG))
+             for _ in range(HOTSPOTS_PER_CITY)]
+            for lat, lon in self.cities
+        ]
+        self.recent = deque(maxlen=RECENT_WINDOW)
+        self.recent_images = deque(maxlen=RECENT_IMAGES)  # (image seed, category, pHash)
+        self.report_ms = FIRST_REPORT_MS
+        self.counts = {}
+        if self.images_dir:
+            self.images_dir.mkdir(parents=True, exist_ok=True)
+
+    # ---- building blocks ----
+    def _user_id(self, index: int) -> str:
+        users = self.users or max(1, index // 20 + 1)
+        # Skewed: a few users file most reports
+        user = int(users * self.rng.random() ** 3)
+        return f"{0x65a0000000000000 + user:016x}{user:08x}"
+
+    def _location(self):
+        city = self.rng.choices(range(len(self.cities)), self.city_weights)[0]
+        if self.rng.random() < HOTSPOT_SHARE:
+            lat, lon = self.rng.choice(self.hotspots[city])
+            spread = HOTSPOT_SPREAD_DEG
+        else:
+            lat, lon = self.cities[city]
+            spread = CITY_SPREAD_DEG
+        return round(lat + self.rng.gauss(0, spread), 7), round(lon + self.rng.gauss(0, spread), 7)
+
+    def _description(self, category: str) -> str:
+        template = self.rng.choice(TEMPLATES)
+        text = template.format(kw=self.rng.choice(self.keywords[category]), place=self.rng.choice(PLACES),
+                               street=self.rng.choice(STREETS), days=self.rng.randint(2, 30))
+        return text[0].upper() + text[1:]
+
+    def _near_duplicate(self, description: str) -> str:
+        if self.rng.random() < 0.5:
+            return description + self.rng.choice(NEAR_DUPLICATE_SUFFIXES)
+        words = description.split()
+        if len(words) > 4:
+            del words[self.rng.randrange(1, len(words))]
+        return " ".join(words).lower()
+
+    def _next_report_id(self) -> str:
+        self.report_ms += self.rng.randint(1, 4000)
+        return str(self.report_ms)
+
+    # ---- images ----
+    def make_image(self, image_seed: int, category: str = "", edited: bool = False) -> bytes:
+        """Small PNG, deterministic for (image_seed, category, edited)."""
+        from PIL import Image
+        rng = random.Random(image_seed)
+        size = self.image_size
+        base = random.Random(category).randrange(1 << 24)
+        img = Image.new("RGB", (size, size), (base >> 16, (base >> 8) & 255, base & 255))
+        block = max(2, size // 8)
+        for _ in range(24):
+            x, y = rng.randrange(size - block), rng.randrange(size - block)
+            img.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + block, y + block))
+        if edited:
+            # A re-save with a small brightness change: same photo to a person, pHash a few bits off
+            img = img.point(lambda v: min(255, v + 12))
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        return buf.getvalue()
+
+    def _image_hash(self, report_id: str, image_seed: int, category: str, edited: bool, source_hash: str = None) -> str:
+        if self.images_dir is None:
+            if source_hash is None:
+                return f"{random.Random(image_seed).getrandbits(64):016x}"
+            if not edited:
+                return source_hash
+            flipped = int(source_hash, 16)
+            for bit in self.rng.sample(range(64), self.rng.randint(1, 3)):
+                flipped ^= 1 << bit
+            return f"{flipped:016x}"
+
+        import imagehash
+        from PIL import Image
+        image_bytes = self.make_image(image_seed, category, edited)
+        (self.images_dir / f"{report_id}.png").write_bytes(image_bytes)
+        return str(imagehash.phash(Image.open(io.BytesIO(image_bytes)).convert("RGB")))
+
+    # ---- records ----
+    def _record(self, report_id, description, user_id, latitude, longitude, category, reason,
+                urgency=None, image_hash=None) -> dict:
+        """Field order matches {**report, **result} in pipeline.classify_report / reject."""
+        accepted = reason == REASON_ACCEPTED
+        record = {
+            "report_id": report_id,
+            "description": description,
+            "user_id": user_id,
+            "latitude": latitude,
+            "longitude": longitude,
+            "accept": accepted,
+            "status": "accepted" if accepted else "rejected",
+            "category": category,
+            "confidence": round(self.rng.uniform(0.5, 0.95) if category != "Other" else 0.0, 2),
+        }
+        if accepted:
+            record["urgency"] = urgency
+        record["reason"] = reason
+        if accepted and image_hash:
+            record["image_hash"] = image_hash
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        return record
+
+    def generate(self, count: int):
+        """Yield `count` records."""
+        for index in range(count):
+            yield self._next(index)
+
+    def _next(self, index: int) -> dict:
+        report_id = self._next_report_id()
+        roll = self.rng.random()
+
+        # Resubmission of an earlier accepted report by the same user
+        if self.recent and roll < self.duplicate_rate + self.near_duplicate_rate:
+            source = self.rng.choice(self.recent)
+            if roll < self.duplicate_rate:
+                description, reason = source["description"], REASON_DUPLICATE
+            else:
+                description, reason = self._near_duplicate(source["description"]), REASON_NEAR_DUPLICATE
+            if self.images_dir is not None and self.rng.random() < self.image_rate:
+                self._image_hash(report_id, self.rng.getrandbits(32), source["category"], False)
+            return self._record(report_id, description, source["user_id"], source["latitude"],
+                                source["longitude"], source["category"], reason)
+
+        category = self.rng.choices(self.categories, self.category_weights)[0]
+        description = self._description(category)
+        user_id = self._user_id(index)
+        latitude, longitude = self._location()
+
+        if self.rng.random() < self.other_reject_rate:
+            return self._rejected(report_id, description, user_id, latitude, longitude, category)
+
+        image_hash = None
+        if self.rng.random() < self.image_rate:
+            if self.recent_images and self.rng.random() < self.phash_collision_rate:
+                image_seed, source_category, source_hash = self.rng.choice(self.recent_images)
+                edited = self.rng.random() < 0.5
+                if not edited:
+                    # Exact re-upload: the pipeline rejects it as a duplicate image
+                    if self.images_dir is not None:
+                        self._image_hash(report_id, image_seed, source_category, False)
+                    return self._record(report_id, description, user_id, latitude, longitude, category,
+                                        REASON_IMAGE_DUPLICATE)
+                image_hash = self._image_hash(report_id, image_seed, source_category, True, source_hash)
+            else:
+                image_seed = self.rng.getrandbits(32)
+                image_hash = self._image_hash(report_id, image_seed, category, False)
+                self.recent_images.append((image_seed, category, image_hash))
+
+        record = self._record(report_id, description, user_id, latitude, longitude, category,
+                              REASON_ACCEPTED, _urgency(description), image_hash)
+        self.recent.append(record)
+        return record
+
+    def _rejected(self, report_id, description, user_id, latitude, longitude, category) -> dict:
+        kind = self.rng.random()
+        if kind < 0.35 and self.recent:
+            # Same category within a few metres of an accepted report
+            nearby = [self.recent[-i] for i in range(1, min(50, len(self.recent)) + 1)]
+            source = self.rng.choice([r for r in nearby if r["category"] == category] or [None])
+            if source is not None:
+                latitude = round(source["latitude"] + self.rng.uniform(-0.00003, 0.00003), 7)
+                longitude = round(source["longitude"] + self.rng.uniform(-0.00003, 0.00003), 7)
+                return self._record(report_id, description, user_id, latitude, longitude, category, REASON_LOCATION)
+        if kind < 0.65:
+            if self.images_dir is not None:
+                self._image_hash(report_id, self.rng.getrandbits(32), category, False)
+            return self._record(report_id, description, user_id, latitude, longitude, category, REASON_IMAGE_MISMATCH)
+        if kind < 0.85:
+            description = f"{description}, {self.rng.choice(INSULTS)}"
+            return self._record(report_id, description, user_id, latitude, longitude, category, REASON_ABUSE)
+        vague = self.rng.choice(["Please help", "Problem here", "Nobody is responding", "Very bad condition"])
+        return self._record(report_id, vague, user_id, latitude, longitude, "Other", REASON_UNCLEAR)
+
+
+def write_dataset(output, count: int, generator: DatasetGenerator = None, **options) -> dict:
+    """
+    Write `count` records as JSON lines to a path or open text stream.
+    Returns the per-reason counts.
+    """
+    generator = generator or DatasetGenerator(**options)
+    close = False
+    if not hasattr(output, "write"):
+        output = Path(output).open("w", encoding="utf8")
+        close = True
+    try:
+        lines = []
+        for record in generator.generate(count):
+            lines.append(json.dumps(record, ensure_ascii=False))
+            if len(lines) >= 1000:
+                output.write("\n".join(lines) + "\n")
+                lines.clear()
+        if lines:
+            output.write("\n".join(lines) + "\n")
+    finally:
+        if close:
+            output.close()
+    return dict(generator.counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000, help="Number of records")
+    parser.add_argument("--output", default="-", help="Output path (default: stdout)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reject-rate", type=float, default=0.3, help="Target fraction of rejected reports")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="Exact resubmissions (rejected)")
+    parser.add_argument("--near-duplicate-rate", type=float, default=0.05, help="Paraphrased resubmissions (rejected)")
+    parser.add_argument("--image-rate", type=float, default=0.6, help="Fraction of reports with an image")
+    parser.add_argument("--phash-collision-rate", type=float, default=0.02,
+                        help="Fraction of image reports re-uploading an earlier image (half exact, half edited)")
+    parser.add_argument("--users", type=int, default=None, help="Distinct users (default: count / 20)")
+    parser.add_argument("--images-dir", default=None, help="Write <report_id>.png per image report; hashes become real pHashes")
+    parser.add_argument("--image-size", type=int, default=64, help="Image width and height in pixels")
+    args = parser.parse_args()
+
+    generator = DatasetGenerator(
+        seed=args.seed, reject_rate=args.reject_rate, duplicate_rate=args.duplicate_rate,
+        near_duplicate_rate=args.near_duplicate_rate, image_rate=args.image_rate,
+        phash_collision_rate=args.phash_collision_rate, images_dir=args.images_dir,
+        image_size=args.image_size, users=args.users,
+    )
+    started = time.perf_counter()
+    if args.output == "-":
+        counts = write_dataset(sys.stdout, args.count, generator)
+    else:
+        counts = write_dataset(args.output, args.count, generator)
+    elapsed = time.perf_counter() - started
+
+    accepted = counts.get(REASON_ACCEPTED, 0)
+    print(f"Wrote {args.count} records in {elapsed:.1f}s ({args.count / max(elapsed, 1e-9):.0f}/s): "
+          f"{accepted} accepted, {args.count - accepted} rejected", file=sys.stderr)
+    for reason, n in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"  {n:9d}  {reason}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
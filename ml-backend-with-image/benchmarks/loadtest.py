@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+In-process load test: drives app.main:app through httpx's ASGI transport (no
+network, no server) with a mixed workload of text-only, image and duplicate
+submissions to POST /submit.
+
+Requests arrive open-loop at --rate per second (Poisson), or closed-loop
+(each of --concurrency clients sends back-to-back) with --rate 0. At most
+--concurrency requests are in flight per process. Records per-request latency
+(from the scheduled arrival, so queueing in the client counts), status codes
+and event-loop lag, and prints them per time window and as a summary.
+
+Executor settings to compare:
+  --processes N        N independent app instances, like uvicorn --workers N
+                       (the offered rate and concurrency are split between them)
+  --threadpool-tokens  size of the thread pool run_in_threadpool uses (anyio default: 40)
+  --env KEY=VALUE      app settings read at import, e.g. ADMISSION_IMAGE_MAX_IN_FLIGHT=2
+                       (applied before anything imports app, in every process)
+
+Runs offline with the stub image classifier from bench_pipeline.py (unless
+--real-classifier) against a temporary dataset.jsonl, optionally pre-filled
+with --dataset-size generated reports.
+
+Usage:
+    python benchmarks/loadtest.py [--duration 20] [--rate 50] [--concurrency 32] [--mix text=0.5,image=0.3,duplicate=0.2] [--json]
+"""
+import sys
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# bench_pipeline and generate_dataset import app modules, which read their settings
+# at import time, so they are only imported once --env has been applied
+
+LAG_INTERVAL = 0.01  # Event-loop probe period (seconds)
+
+
+# ------------------------------------
+# Workload
+# ------------------------------------
+class Workload:
+    """Request bodies for the text / image / duplicate mix."""
+
+    def __init__(self, mix: dict, seed: int, image_pool: int):
+        from bench_pipeline import ACCEPTED_ONLY
+        from generate_dataset import DatasetGenerator
+
+        self.rng = random.Random(seed)
+        self.kinds = list(mix)
+        self.weights = [mix[k] for k in self.kinds]
+        self.generator = DatasetGenerator(seed=seed, image_rate=0.0, **ACCEPTED_ONLY)
+        self.reports = self.generator.generate(sys.maxsize)
+        # Pre-rendered so encoding PNGs does not load the event loop being measured
+        self.images = [self.generator.make_image(seed * 100003 + i) for i in range(image_pool)] if "image" in mix else []
+        self.sent = deque(maxlen=1000)
+        self.count = 0
+
+    def next(self):
+        """(kind, form fields, files) for the next request."""
+        kind = self.rng.choices(self.kinds, self.weights)[0]
+        self.count += 1
+        if kind == "duplicate" and self.sent:
+            fields = dict(self.rng.choice(self.sent))
+        else:
+            if kind == "duplicate":
+                kind = "text"
+            report = next(self.reports)
+            fields = {
+                "description": report["description"],
+                "user_id": report["user_id"],
+                "latitude": str(report["latitude"]),
+                "longitude": str(report["longitude"]),
+            }
+            self.sent.append(fields)
+            fields = dict(fields)
+        fields["report_id"] = f"load-{os.getpid()}-{self.count}"
+        files = None
+        if kind == "image":
+            image = self.images[self.count % len(self.images)]
+            files = {"image": ("report.png", image, "image/png")}
+        return kind, fields, files
+
+
+# ------------------------------------
+# One load-generating process
+# ------------------------------------
+async def _drive(config: dict, start_at: float) -> dict:
+    import httpx
+    from app.main import app
+
+    workload = Workload(config["mix"], config["seed"], config["image_pool"])
+    samples = []  # (offset from start, latency, kind, status)
+    lag = []      # (offset from start, lag seconds)
+    in_flight = asyncio.Semaphore(config["concurrency"])
+    stop = asyncio.Event()
+
+    async def monitor_loop():
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            expected = loop.time() + LAG_INTERVAL
+            await asyncio.sleep(LAG_INTERVAL)
+            lag.append((time.time() - start_at, max(0.0, loop.time() - expected)))
+
+    async def send(client, arrival: float):
+        kind, fields, files = workload.next()
+        async with in_flight:
+            try:
+                response = await client.post("/submit", data=fields, files=files)
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+        samples.append((arrival - start_at, time.time() - arrival, kind, status))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+        while time.time() < start_at:
+            await asyncio.sleep(0.001)
+        monitor = asyncio.create_task(monitor_loop())
+        deadline = start_at + config["duration"]
+        rng = random.Random(config["seed"])
+        if config["rate"] > 0:
+            tasks = set()
+            arrival = start_at
+            while True:
+                arrival += rng.expovariate(config["rate"])
+                if arrival >= deadline:
+                    break
+                delay = arrival - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.create_task(send(client, arrival))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        else:
+            async def client_loop():
+                while time.time() < deadline:
+                    await send(client, time.time())
+            await asyncio.gather(*(client_loop() for _ in range(config["concurrency"])))
+        stop.set()
+        await monitor
+    return {"samples": samples, "lag": lag}
+
+
+def apply_env(env: dict):
+    """Set the --env app settings; must run before the first app import to take effect."""
+    for key, value in env.items():
+        os.environ[key] = value
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def run_process(config: dict, start_at: float) -> dict:
+    """Entry point of each load-generating process."""
+    apply_env(config["env"])  # No-op under fork (inherited from main), needed under spawn
+
+    from app import dataset
+    from bench_pipeline import install_stub_classifier
+    dataset.DATA_FILE = Path(config["data_file"])
+    if not config["real_classifier"]:
+        install_stub_classifier(config["stub_latency_ms"])
+    if config["threadpool_tokens"]:
+        import anyio.to_thread
+
+        async def main():
+            anyio.to_thread.current_default_thread_limiter().total_tokens = config["threadpool_tokens"]
+            return await _drive(config, start_at)
+        return asyncio.run(main())
+    return asyncio.run(_drive(config, start_at))
+
+
+# ------------------------------------
+# Reporting
+# ------------------------------------
+def latency_stats(latencies: list) -> dict:
+    from bench_pipeline import percentile
+
+    if not latencies:
+        return {"count": 0}
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def summarize(samples: list, lag: list, duration: float, window: float) -> dict:
+    from bench_pipeline import percentile
+
+    status_counts = {}
+    for *_, status in samples:
+        status_counts[str(status)] = status_counts.get(str(status), 0) + 1
+    errors = sum(n for status, n in status_counts.items() if not status.isdigit() or int(status) >= 500)
+    by_kind = {}
+    for _, latency, kind, _ in samples:
+        by_kind.setdefault(kind, []).append(latency)
+    lags = sorted(value for _, value in lag)
+
+    windows = []
+    for i in range(int(duration / window + 0.999)):
+        lo, hi = i * window, (i + 1) * window
+        in_window = [s for s in samples if lo <= s[0] < hi]
+        window_lag = [value for t, value in lag if lo <= t < hi]
+        windows.append({
+            "start_s": lo,
+            "requests": len(in_window),
+            "throughput_rps": len(in_window) / window,
+            "errors": sum(1 for *_, status in in_window if not str(status).isdigit() or int(status) >= 500),
+            "rejected_503": sum(1 for *_, status in in_window if status == 503),
+            **{k: v for k, v in latency_stats([s[1] for s in in_window]).items() if k != "count"},
+            "max_loop_lag_ms": max(window_lag, default=0.0) * 1000,
+        })
+
+    return {
+        "requests": len(samples),
+        "throughput_rps": len(samples) / duration,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "status_counts": status_counts,
+        "latency": latency_stats([s[1] for s in samples]),
+        "latency_by_kind": {kind: latency_stats(values) for kind, values in sorted(by_kind.items())},
+        "loop_lag": {
+            "p50_ms": percentile(lags, 0.50) * 1000 if lags else 0.0,
+            "p99_ms": percentile(lags, 0.99) * 1000 if lags else 0.0,
+            "max_ms": lags[-1] * 1000 if lags else 0.0,
+        },
+        "windows": windows,
+    }
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in ("text", "image", "duplicate"):
+            raise argparse.ArgumentTypeError(f"unknown request kind '{kind}' (text, image, duplicate)")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--rate", type=float, default=50.0, help="Arrivals per second in total (0 = closed loop)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Max in-flight requests in total")
+    parser.add_argument("--mix", type=parse_mix, default="text=0.5,image=0.3,duplicate=0.2")
+    parser.add_argument("--processes", type=int, default=1, help="Independent app instances (like uvicorn --workers)")
+    parser.add_argument("--threadpool-tokens", type=int, default=0, help="run_in_threadpool size (0 = anyio default)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="App setting, repeatable")
+    parser.add_argument("--dataset-size", type=int, default=10000, help="Generated reports in the dataset before the run")
+    parser.add_argument("--image-pool", type=int, default=256, help="Distinct images; repeats hit the duplicate-image check")
+    parser.add_argument("--real-classifier", action="store_true", help="Use the configured CLIP model instead of the stub")
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated CLIP latency per image")
+    parser.add_argument("--window", type=float, default=1.0, help="Seconds per reporting window")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args()
+    env = dict(item.split("=", 1) for item in args.env)
+    # Before any app import here, so the single-process run and forked workers see the settings
+    apply_env(env)
+    from generate_dataset import write_dataset
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="loadtest-"))
+    data_file = tmp_dir / "dataset.jsonl"
+    write_dataset(data_file, args.dataset_size, seed=args.seed)
+
+    processes = max(1, args.processes)
+    configs = [{
+        "duration": args.duration,
+        "rate": args.rate / processes,
+        "concurrency": max(1, args.concurrency // processes),
+        "mix": args.mix,
+        "seed": args.seed * 1000 + i,
+        "image_pool": args.image_pool,
+        "env": env,
+        "data_file": str(data_file),
+        "real_classifier": args.real_classifier,
+        "stub_latency_ms": args.stub_latency_ms,
+        "threadpool_tokens": args.threadpool_tokens,
+    } for i in range(processes)]
+
+    # Processes start together once all have imported the app
+    start_at = time.time() + 3.0 + processes * 0.5
+    if processes == 1:
+        results = [run_process(configs[0], start_at)]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(run_process, configs, [start_at] * processes))
+
+    samples = [s for r in results for s in r["samples"]]
+    lag = [sample for r in results for sample in r["lag"]]
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "json"},
+        **summarize(samples, lag, args.duration, args.window),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print("=" * 86)
+    print(f"Load test: {args.duration:g}s, rate={args.rate:g}/s, concurrency={args.concurrency}, "
+          f"processes={processes}, mix={args.mix}")
+    print("=" * 86)
+    print(f"{'t (s)':>6} {'req':>6} {'rps':>8} {'err':>5} {'503':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'lag ms':>8}")
+    for w in report["windows"]:
+        print(f"{w['start_s']:6.0f} {w['requests']:6d} {w['throughput_rps']:8.1f} {w['errors']:5d} {w['rejected_503']:5d} "
+              f"{w.get('p50_ms', 0):9.1f} {w.get('p95_ms', 0):9.1f} {w.get('p99_ms', 0):9.1f} {w['max_loop_lag_ms']:8.1f}")
+    latency = report["latency"]
+    print(f"\n{report['requests']} requests, {report['throughput_rps']:.1f} req/s, "
+          f"error rate {report['error_rate']:.2%}, status codes {report['status_counts']}")
+    if latency["count"]:
+        print(f"latency p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, "
+              f"p99 {latency['p99_ms']:.1f} ms, max {latency['max_ms']:.1f} ms")
+    for kind, stats in report["latency_by_kind"].items():
+        print(f"  {kind:10} {stats['count']:6d} requests, p50 {stats['p50_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms")
+    loop_lag = report["loop_lag"]
+    print(f"event-loop lag p50 {loop_lag['p50_ms']:.1f} ms, p99 {loop_lag['p99_ms']:.1f} ms, max {loop_lag['max_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
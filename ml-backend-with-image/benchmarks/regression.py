@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Performance regression gate: runs the service's micro-benchmarks and compares
+them with the baseline stored for this machine.
+
+Benchmarks (time per operation, best of --repeat rounds):
+  keyword_matching     text_rules.detect_category
+  dedup_exact          storage.is_duplicate            } against a generated dataset
+  dedup_near           storage.is_near_duplicate       } of --dataset-size accepted
+  dedup_location       storage.is_duplicate_location   } reports
+  image_decode_hash    PIL decode + imagehash.phash of a PNG upload
+  text_pipeline        pipeline.classify_report, text-only (all stages incl. duplicate checks)
+
+Baselines are JSON files in benchmarks/baselines/, one per environment
+fingerprint (OS, kernel, CPU model, CPU count, Python and package versions), so
+a run is only ever compared with numbers from the same kind of box. A metric
+fails when it is more than --tolerance slower than its baseline; exit status 1.
+If there is no baseline for this fingerprint nothing is compared (exit 0).
+
+Usage:
+    python benchmarks/regression.py                 # compare with the stored baseline
+    python benchmarks/regression.py --update        # record / replace this machine's baseline
+    python benchmarks/regression.py --only keyword_matching,text_pipeline --tolerance 0.3 --json
+"""
+import sys
+import os
+import copy
+import json
+import time
+import hashlib
+import argparse
+import platform
+import shutil
+import tempfile
+from importlib.metadata import version, PackageNotFoundError
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import dataset, storage, pipeline
+from app.text_rules import detect_category
+from bench_pipeline import ACCEPTED_ONLY, install_stub_classifier
+from generate_dataset import DatasetGenerator, write_dataset
+
+BASELINES_DIR = Path(__file__).resolve().parent / "baselines"
+DEFAULT_TOLERANCE = 0.20  # 20% slower than baseline fails
+
+# Packages whose versions change the numbers
+FINGERPRINT_PACKAGES = ("numpy", "pillow", "imagehash", "fastapi", "pydantic", "torch", "transformers")
+
+
+# ------------------------------------
+# Environment fingerprint
+# ------------------------------------
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "unknown"
+
+
+def _package_version(name: str):
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def fingerprint() -> dict:
+    """What makes two runs comparable."""
+    return {
+        "system": platform.system(),
+        "kernel": platform.release(),
+        "machine": platform.machine(),
+        "cpu_model": _cpu_model(),
+        "cpu_count": os.cpu_count(),
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "packages": {name: _package_version(name) for name in FINGERPRINT_PACKAGES},
+    }
+
+
+def fingerprint_id(env: dict) -> str:
+    return hashlib.sha256(json.dumps(env, sort_keys=True).encode("utf8")).hexdigest()[:16]
+
+
+# ------------------------------------
+# Benchmarks
+# ------------------------------------
+class Fixtures:
+    """Inputs shared by the benchmarks: a generated dataset (set as dataset.DATA_FILE) and query reports."""
+
+    def __init__(self, tmp_dir: Path, dataset_size: int, queries: int, seed: int):
+        dataset.DATA_FILE = tmp_dir / "dataset.jsonl"
+        storage._near_dup_index = None
+        storage._near_dup_offset = 0
+        write_dataset(dataset.DATA_FILE, dataset_size, seed=seed, image_rate=0.0, **ACCEPTED_ONLY)
+
+        # Default generator rates: the queries hit the rejection paths as well
+        generator = DatasetGenerator(seed=seed + 1, image_rate=0.0)
+        self.reports = list(generator.generate(queries))
+        for i, report in enumerate(self.reports):
+            report["report_id"] = f"regression-{i}"
+        self.images = [generator.make_image(i, report["category"]) for i, report in enumerate(self.reports[:50])]
+
+        # What reset_dataset() goes back to
+        with storage._near_dup_lock:
+            storage._refresh_near_dup_index()
+        self._dataset_bytes = dataset.DATA_FILE.stat().st_size
+        self._index = copy.deepcopy(storage._near_dup_index)
+        self._index_offset = storage._near_dup_offset
+
+    def reset_dataset(self):
+        """Drop the reports earlier rounds accepted (and their index entries), so every round sees the same dataset."""
+        with dataset.DATA_FILE.open("r+b") as f:
+            f.truncate(self._dataset_bytes)
+        storage._near_dup_index = copy.deepcopy(self._index)
+        storage._near_dup_offset = self._index_offset
+
+
+def _decode_and_hash(image_bytes: bytes):
+    import io
+    from PIL import Image
+    import imagehash
+    return imagehash.phash(Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+
+
+def benchmarks(fx: Fixtures) -> dict:
+    """name -> (callable taking one input, inputs, callable run before every round or None)"""
+    fields = ("report_id", "description", "user_id", "latitude", "longitude")
+    return {
+        "keyword_matching": (lambda r: detect_category(r["description"]), fx.reports, None),
+        "dedup_exact": (lambda r: storage.is_duplicate(r["user_id"], r["description"], r["category"], store=False),
+                        fx.reports, None),
+        "dedup_near": (lambda r: storage.is_near_duplicate(r["user_id"], r["description"], r["category"], store=False),
+                       fx.reports, None),
+        "dedup_location": (lambda r: storage.is_duplicate_location(
+            r["latitude"], r["longitude"], r["description"], r["category"], threshold=10.0, store=False), fx.reports, None),
+        "image_decode_hash": (_decode_and_hash, fx.images, None),
+        # Accepted reports are saved; without the reset later rounds would only time duplicate rejections
+        "text_pipeline": (lambda r: pipeline.classify_report({k: r[k] for k in fields}), fx.reports, fx.reset_dataset),
+    }
+
+
+def time_benchmark(fn, inputs, repeat: int, reset=None) -> dict:
+    """One warm-up round, then `repeat` timed rounds over all inputs. Best round is the metric (least noisy)."""
+    rounds = []
+    for round_number in range(repeat + 1):
+        if reset is not None:
+            reset()
+        started = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        if round_number:  # round 0 is the warm-up
+            rounds.append((time.perf_counter() - started) / len(inputs) * 1e6)
+    rounds.sort()
+    return {"us_per_op": rounds[0], "median_us_per_op": rounds[len(rounds) // 2], "ops": len(inputs)}
+
+
+def run_benchmarks(names=None, dataset_size: int = 1000, queries: int = 100, repeat: int = 5, seed: int = 0) -> dict:
+    install_stub_classifier()
+    original_file = dataset.DATA_FILE
+    tmp_dir = Path(tempfile.mkdtemp(prefix="bench-regression-"))
+    try:
+        fx = Fixtures(tmp_dir, dataset_size, queries, seed)
+        results = {}
+        for name, (fn, inputs, reset) in benchmarks(fx).items():
+            if names and name not in names:
+                continue
+            results[name] = time_benchmark(fn, inputs, repeat, reset)
+        return results
+    finally:
+        dataset.DATA_FILE = original_file
+        storage._near_dup_index = None
+        storage._near_dup_offset = 0
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+# ------------------------------------
+# Baselines
+# ------------------------------------
+def baseline_path(env: dict) -> Path:
+    return BASELINES_DIR / f"{fingerprint_id(env)}.json"
+
+
+def load_baseline(env: dict):
+    path = baseline_path(env)
+    if not path.exists():
+        return None
+    with path.open("r", encoding="utf8") as f:
+        return json.load(f)
+
+
+def save_baseline(env: dict, settings: dict, results: dict, previous: dict = None) -> Path:
+    """Write this machine's baseline; benchmarks not run this time keep their previous numbers (same settings only)."""
+    merged = dict(previous["results"]) if previous and previous.get("settings") == settings else {}
+    merged.update(results)
+    BASELINES_DIR.mkdir(parents=True, exist_ok=True)
+    path = baseline_path(env)
+    with path.open("w", encoding="utf8") as f:
+        json.dump({"fingerprint": env, "settings": settings, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                   "results": merged}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> dict:
+    """Per benchmark: baseline and current us/op, relative change and status (ok / regressed / improved / new)."""
+    rows = {}
+    for name, current in results.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            rows[name] = {"current_us": current["us_per_op"], "status": "new"}
+            continue
+        change = current["us_per_op"] / before["us_per_op"] - 1.0
+        status = "regressed" if change > tolerance else "improved" if change < -tolerance else "ok"
+        rows[name] = {"baseline_us": before["us_per_op"], "current_us": current["us_per_op"],
+                      "change": change, "status": status}
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="Record the results as this machine's baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown (0.2 = 20%%)")
+    parser.add_argument("--only", default="", help="Comma-separated benchmark names")
+    parser.add_argument("--dataset-size", type=int, default=1000, help="Accepted reports in the generated dataset")
+    parser.add_argument("--queries", type=int, default=100, help="Inputs per benchmark round")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print a machine-readable report")
+    args = parser.parse_args(argv)
+
+    env = fingerprint()
+    settings = {"dataset_size": args.dataset_size, "queries": args.queries, "repeat": args.repeat, "seed": args.seed}
+    baseline = load_baseline(env)
+    if baseline is not None and baseline.get("settings") != settings and not args.update:
+        raise SystemExit(f"Baseline {baseline_path(env).name} was recorded with {baseline.get('settings')}; "
+                         f"rerun with the same settings or --update")
+
+    names = set(filter(None, args.only.split(",")))
+    results = run_benchmarks(names, args.dataset_size, args.queries, args.repeat, args.seed)
+    rows = compare(results, baseline, args.tolerance) if baseline else {}
+    regressed = sorted(name for name, row in rows.items() if row["status"] == "regressed")
+
+    if args.update:
+        path = save_baseline(env, settings, results, baseline)
+
+    if args.json:
+        print(json.dumps({"fingerprint_id": fingerprint_id(env), "fingerprint": env, "settings": settings,
+                          "tolerance": args.tolerance, "results": results, "comparison": rows,
+                          "regressed": regressed}, indent=2))
+    else:
+        print("=" * 78)
+        print(f"Benchmark regression gate (fingerprint {fingerprint_id(env)}: {env['cpu_model']}, "
+              f"{env['cpu_count']} CPU, {env['python']})")
+        print("=" * 78)
+        print(f"  {'benchmark':22} {'baseline us':>12} {'current us':>12} {'change':>9}  status")
+        for name, stats in results.items():
+            row = rows.get(name, {})
+            baseline_us = f"{row['baseline_us']:12.2f}" if "baseline_us" in row else f"{'-':>12}"
+            change = f"{row['change']:+9.1%}" if "change" in row else f"{'-':>9}"
+            print(f"  {name:22} {baseline_us} {stats['us_per_op']:12.2f} {change}  {row.get('status', '-')}")
+        if args.update:
+            print(f"\nBaseline written to {path}")
+        elif baseline is None:
+            print(f"\nNo baseline for this environment ({baseline_path(env).name}); run with --update to record one")
+        elif regressed:
+            print(f"\nREGRESSED beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+        else:
+            print(f"\nNo regressions beyond {args.tolerance:.0%}")
+
+    if regressed and not args.update:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
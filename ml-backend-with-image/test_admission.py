@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script to verify admission control (bounded in-flight work + waiting queue)
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.admission import StageLimiter, Overloaded
+
+def test_overflow_rejected_with_retry_after():
+    """Requests beyond in-flight + queue capacity are refused immediately"""
+    print("Testing admission limits...")
+    stage = StageLimiter("test", max_in_flight=1, max_queue=1, initial_service_time=2.0)
+    release = threading.Event()
+    started = threading.Event()
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+
+        async def admitted_call():
+            await stage.acquire()
+            await loop.run_in_executor(None, stage.run, lambda: (started.set(), release.wait()))
+
+        calls = [asyncio.create_task(admitted_call()) for _ in range(2)]
+        await loop.run_in_executor(None, started.wait)
+        await asyncio.sleep(0.05)  # second request is now queued
+
+        stats = stage.stats()
+        print(f"Stats while full: {stats}")
+        assert stats["in_flight"] == 1 and stats["waiting"] == 1
+
+        began = time.monotonic()
+        try:
+            await stage.acquire()
+            raise AssertionError("expected Overloaded")
+        except Overloaded as e:
+            print(f"Rejected: {e}")
+            assert time.monotonic() - began < 0.1  # fast rejection, no waiting
+            assert e.retry_after == 4  # 1 waiting + this one, at 0.5 requests/s
+        release.set()
+        await asyncio.gather(*calls)
+
+        stats = stage.stats()
+        assert stats["completed"] == 2 and stats["rejected"] == 1
+        assert stats["in_flight"] == 0 and stats["waiting"] == 0
+        await stage.acquire()
+        assert stage.run(lambda: "ok") == "ok"
+
+    asyncio.run(scenario())
+    print("✅ Admission limits work")
+
+def test_waiters_served_by_urgency_without_threads():
+    """Queued requests wait on the event loop and get slots most urgent first"""
+    print("\nTesting urgency order of admission waiters...")
+    stage = StageLimiter("test", max_in_flight=1, max_queue=20, aging_seconds=60)
+    order = []
+
+    async def scenario():
+        await stage.acquire()  # hold the only slot
+        threads_before = threading.active_count()
+
+        async def waiter(name, urgency):
+            await stage.acquire(urgency)
+            order.append(name)
+            stage.release(0.01)
+
+        tasks = [asyncio.create_task(waiter(f"{urgency}-{i}", urgency))
+                 for i in range(4) for urgency in ("low", "medium", "high")]
+        cancelled = asyncio.create_task(waiter("cancelled", "high"))
+        await asyncio.sleep(0.05)
+        assert stage.stats()["waiting"] == 13
+        assert stage.stats()["waiting_by_urgency"] == {"high": 5, "medium": 4, "low": 4}
+        assert threading.active_count() == threads_before  # waiting takes no threads
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert stage.stats()["waiting"] == 12  # a cancelled waiter gives its place up
+
+        stage.release(0.01)
+        await asyncio.gather(*tasks)
+        assert stage.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+    print(f"Order: {order}")
+    assert [name.split("-")[0] for name in order] == ["high"] * 4 + ["medium"] * 4 + ["low"] * 4
+    assert order[:4] == ["high-0", "high-1", "high-2", "high-3"]  # FIFO within a level
+    print("✅ Admission waiters are served by urgency")
+
+def test_release_waits_for_worker_after_cancel():
+    """A cancelled request's image buffer is released when classification ends, not before"""
+    print("\nTesting buffer release after a cancelled request...")
+    from app import main
+
+    events = []
+    original = main.run_classification
+
+    def slow_classification(report_data):
+        events.append("classify started")
+        time.sleep(0.3)
+        events.append("classify finished")
+        return {"report_id": report_data["report_id"], "status": "error"}
+
+    async def cancel_mid_classification():
+        report_data = {"report_id": "release_001", "description": "Pothole near school"}
+        task = asyncio.create_task(main.run_admitted(report_data, on_finished=lambda: events.append("released")))
+        await asyncio.sleep(0.1)
+        assert main.admission.text_stage.stats()["in_flight"] == 1
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.4)
+
+    main.run_classification = slow_classification
+    try:
+        asyncio.run(cancel_mid_classification())
+    finally:
+        main.run_classification = original
+    print(f"Events: {events}")
+    assert events == ["classify started", "classify finished", "released"]
+    assert main.admission.text_stage.stats()["in_flight"] == 0  # slot held until the worker finished
+    print("✅ Buffer is released only after the worker is done with it")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Admission Control Test")
+    print("=" * 60)
+    test_overflow_rejected_with_retry_after()
+    test_waiters_served_by_urgency_without_threads()
+    test_release_waits_for_worker_after_cancel()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script to verify NDJSON framing and limits of POST /submit/batch
+"""
+import sys
+import os
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+from app import admission, dataset, main
+
+client = TestClient(main.app)
+
+def _post(chunks):
+    """POST the body in the given chunks; returns the result lines"""
+    original = dataset.DATA_FILE
+    dataset.DATA_FILE = Path(tempfile.mkdtemp()) / "dataset.jsonl"  # accepted reports are saved
+    try:
+        response = client.post("/submit/batch", content=iter(chunks),
+                               headers={"Content-Type": "application/x-ndjson"})
+    finally:
+        dataset.DATA_FILE = original
+    return response, [json.loads(line) for line in response.text.splitlines()] if response.status_code == 200 else []
+
+def test_ndjson_framing():
+    """Lines split across chunks, several lines per chunk and a last line without newline"""
+    print("Testing NDJSON framing...")
+    body = "\n".join(json.dumps({"report_id": f"batch_{i}", "description": f"Big pothole on road number {i}",
+                                 "user_id": f"batch_user_{i}"}) for i in range(5)).encode()
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)] + [b"\n\n"]
+    response, results = _post(chunks)
+    print(f"Results: {[(r['report_id'], r['status']) for r in results]}")
+    assert response.status_code == 200
+    assert [r["report_id"] for r in results] == [f"batch_{i}" for i in range(5)]
+    assert all(r["status"] == "accepted" for r in results)
+    _, results = _post([body])  # the same body in one chunk, no trailing newline
+    assert len(results) == 5
+    print("✅ Reports are framed by newlines, whatever the chunking")
+
+def test_oversized_line_and_item_errors():
+    """Oversized lines and invalid items become error lines; the rest are classified"""
+    print("\nTesting oversized lines and per-item errors...")
+    original = main.MAX_BATCH_LINE
+    main.MAX_BATCH_LINE = 200
+    try:
+        good = json.dumps({"report_id": "batch_ok", "description": "Garbage dumped near the market"}).encode()
+        huge = json.dumps({"report_id": "batch_huge", "description": "x" * 1000}).encode()
+        chunks = [good + b"\n" + huge[:150], huge[150:600], huge[600:] + b"\nnot json\n",
+                  b'{"report_id": "batch_empty", "description": ""}\n', huge]
+        response, results = _post(chunks)
+    finally:
+        main.MAX_BATCH_LINE = original
+    by_id = {r["report_id"]: r for r in results}
+    print(f"Results: {[(r['report_id'], r['status']) for r in results]}")
+    assert response.status_code == 200 and len(results) == 5
+    assert by_id["line-2"]["status"] == "error" and "longer than 200 bytes" in by_id["line-2"]["reason"]
+    assert by_id["line-5"]["status"] == "error" and "longer than" in by_id["line-5"]["reason"]
+    assert by_id["line-3"]["status"] == "error"
+    assert by_id["batch_empty"]["status"] == "error"
+    assert by_id["batch_ok"]["status"] == "accepted"
+    print("✅ Oversized and invalid lines are reported per item")
+
+def test_body_limit():
+    """The batch route is registered with the body size limit"""
+    print("\nTesting the batch body limit...")
+    body = b"x" * 1024
+    response = client.post("/submit/batch", content=body,
+                           headers={"Content-Type": "application/x-ndjson", "Content-Length": str(main.MAX_BATCH_BODY + 1)})
+    print(f"Status with an oversized Content-Length: {response.status_code}")
+    assert response.status_code == 413
+    print("✅ Oversized batch bodies are refused")
+
+def test_batch_admission():
+    """A batch takes a slot of its stage and is refused with 503 when the stage is full"""
+    print("\nTesting batch admission...")
+    original = admission.text_stage
+    admission.text_stage = admission.StageLimiter("text", max_in_flight=1, max_queue=0)
+    try:
+        asyncio.run(admission.text_stage.acquire())  # another request holds the only slot
+        body = json.dumps({"report_id": "batch_admit", "description": "Streetlight not working at night"}).encode()
+        response, _ = _post([body])
+        print(f"Status with the stage full: {response.status_code} (Retry-After {response.headers.get('retry-after')})")
+        assert response.status_code == 503 and response.headers["retry-after"]
+
+        admission.text_stage.release()
+        response, results = _post([body])
+        assert response.status_code == 200 and len(results) == 1
+        stats = admission.text_stage.stats()
+        assert stats["in_flight"] == 0 and stats["completed"] == 1  # slot handed back once the batch finished
+    finally:
+        admission.text_stage = original
+    print("✅ Batches go through admission control")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Batch Submission Test")
+    print("=" * 60)
+    test_ndjson_framing()
+    test_oversized_line_and_item_errors()
+    test_body_limit()
+    test_batch_admission()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
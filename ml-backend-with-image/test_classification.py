@@ -7,6 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.pipeline import classify_report
+from app.text_rules import detect_category
 
 def test_park_water_classification():
     """Test park filled with water classification"""
@@ -74,6 +75,28 @@ def test_without_image():
     
     return result["status"] == "accepted"
 
+def test_misspelled_keywords():
+    """Test that common misspellings still map to the right category"""
+    print("\nTesting misspelled keywords (typo tolerance)...")
+
+    cases = [
+        ("there is a big pathole here", "Road & Traffic"),
+        ("garbge not collected for a week", "Garbage & Sanitation"),
+        ("the drianage is blocked", "Water & Drainage"),
+        ("streetlite is broken", "Street Lighting"),
+        ("everything is fine", "Other"),
+    ]
+
+    all_ok = True
+    for description, expected in cases:
+        category, confidence = detect_category(description)
+        ok = category == expected
+        all_ok = all_ok and ok
+        print(f"{'✅' if ok else '❌'} '{description}' -> {category} ({confidence:.2f}), expected {expected}")
+
+    assert all_ok
+    return all_ok
+
 if __name__ == "__main__":
     print("🧪 Testing improved image classification...")
     print("=" * 50)
@@ -82,12 +105,14 @@ if __name__ == "__main__":
     park_test = test_park_water_classification()
     light_test = test_streetlight_classification()
     text_test = test_without_image()
+    typo_test = test_misspelled_keywords()
     
     print("\n" + "=" * 50)
     print("📊 Test Results:")
     print(f"Park water classification: {'✅ PASSED' if park_test else '❌ FAILED'}")
     print(f"Streetlight classification: {'✅ PASSED' if light_test else '❌ FAILED'}")
     print(f"Text-only classification: {'✅ PASSED' if text_test else '❌ FAILED'}")
+    print(f"Misspelled keywords: {'✅ PASSED' if typo_test else '❌ FAILED'}")
     
-    all_passed = park_test and light_test and text_test
+    all_passed = park_test and light_test and text_test and typo_test
     print(f"\nOverall: {'✅ ALL TESTS PASSED' if all_passed else '❌ SOME TESTS FAILED'}")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script to verify idempotent resubmission (result cache + single-flight)
+"""
+import sys
+import os
+import asyncio
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.idempotency import ResultCache, request_key
+
+def _classifier(calls, status="accepted"):
+    def classify(report):
+        calls.append(report["report_id"])
+        time.sleep(0.1)
+        return {"report_id": report["report_id"], "status": status, "accept": status == "accepted"}
+    return classify
+
+def test_retries_coalesce_and_hit_cache():
+    """Concurrent retries share one run; later retries are served from the cache"""
+    print("Testing single-flight and cached retries...")
+    cache = ResultCache(max_entries=10, ttl=60)
+    calls = []
+    classify = _classifier(calls)
+    report = {"report_id": "idem_001", "description": "Pothole on Main Street", "image_bytes": b"img"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute(dict(report), classify)))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Pipeline runs for 3 concurrent retries: {len(calls)}")
+    assert len(calls) == 1
+    assert all(result["status"] == "accepted" for result in results)
+
+    assert cache.get_or_compute(dict(report), classify)["status"] == "accepted"
+    assert len(calls) == 1  # served from the cache
+
+    changed = dict(report, image_bytes=b"other image")
+    cache.get_or_compute(changed, classify)
+    assert len(calls) == 2  # same report_id, different content -> recomputed
+    stats = cache.stats()
+    print(f"Stats: {stats}")
+    assert stats["hits"] == 1 and stats["coalesced"] == 2 and stats["in_flight"] == 0
+    print("✅ Retries are idempotent")
+
+def test_errors_not_cached_and_expiry():
+    """Transient errors are retried; entries expire after the TTL"""
+    print("\nTesting error results and TTL...")
+    calls = []
+    cache = ResultCache(max_entries=10, ttl=60)
+    report = {"report_id": "idem_002", "description": "Garbage"}
+    cache.get_or_compute(report, _classifier(calls, status="error"))
+    cache.get_or_compute(report, _classifier(calls, status="error"))
+    assert len(calls) == 2
+
+    cache = ResultCache(max_entries=10, ttl=0.05)
+    cache.get_or_compute(report, _classifier(calls))
+    time.sleep(0.1)
+    cache.get_or_compute(report, _classifier(calls))
+    assert len(calls) == 4
+    print("✅ Errors are not cached and entries expire")
+
+def test_async_waiters_hold_no_threads():
+    """Coalesced coroutines await the leader on the event loop and give up after the timeout"""
+    print("\nTesting async waiters...")
+    cache = ResultCache(max_entries=10, ttl=60)
+    key = request_key({"report_id": "idem_003", "description": "Broken streetlight"})
+    _, flight, owner = cache.begin(key)
+    assert owner
+
+    async def scenario():
+        threads_before = threading.active_count()
+        waiters = [asyncio.create_task(cache.begin(key)[1].wait_async()) for _ in range(20)]
+        slow = asyncio.create_task(flight.wait_async(timeout=0.05))
+        await asyncio.sleep(0.1)
+        assert threading.active_count() == threads_before  # nobody parked in a thread
+        assert await slow is None  # timed out before the leader finished
+        finisher = threading.Thread(target=cache.finish, args=(key, flight, {"report_id": "idem_003", "status": "accepted"}))
+        finisher.start()
+        results = await asyncio.gather(*waiters)
+        finisher.join()
+        assert all(r["status"] == "accepted" for r in results)
+        assert (await flight.wait_async())["status"] == "accepted"  # already finished: returns at once
+
+    asyncio.run(scenario())
+    assert cache.stats()["coalesced"] == 20
+    print("✅ Async waiters get the leader's result without holding threads")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Idempotent Resubmission Test")
+    print("=" * 60)
+    test_retries_coalesce_and_hit_cache()
+    test_errors_not_cached_and_expiry()
+    test_async_waiters_hold_no_threads()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
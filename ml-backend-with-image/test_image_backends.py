@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the pluggable image classifier backends (app/image_backends.py)
+"""
+import sys
+import os
+import io
+import random
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from app import image_backends, pipeline
+from app import image_classifier as ic
+from app import rules as rules_config
+
+def _image(seed: int) -> bytes:
+    rng = random.Random(seed)
+    img = Image.new("RGB", (64, 64), tuple(rng.randrange(256) for _ in range(3)))
+    for _ in range(12):
+        x, y = rng.randrange(48), rng.randrange(48)
+        img.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + 16, y + 16))
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+def test_registry():
+    """Backends are created by name; unknown names are an error"""
+    print("Testing backend registry...")
+    assert {"clip", "onnx", "stub"} <= set(image_backends.BACKENDS)
+    assert isinstance(image_backends.create_backend("stub"), image_backends.StubBackend)
+    try:
+        image_backends.create_backend("no-such-backend")
+        assert False, "unknown backend accepted"
+    except ValueError as e:
+        print(f"Unknown backend: {e}")
+
+    class IncompleteBackend(image_backends.ImageBackend):
+        name = "incomplete"
+
+        def load(self):
+            pass
+
+        def encode_labels(self, labels):
+            return labels
+
+    image_backends.register_backend(IncompleteBackend.name, IncompleteBackend)
+    try:
+        image_backends.create_backend("incomplete")
+        assert False, "backend without embed_images accepted"
+    except TypeError as e:
+        print(f"Incomplete backend: {e}")
+    finally:
+        del image_backends.BACKENDS["incomplete"]
+    print("✅ Registry resolves backends by name")
+
+def test_stub_is_deterministic():
+    """The stub gives the same label for the same image, and spreads different images over labels"""
+    print("\nTesting stub backend determinism...")
+    labels = list(rules_config.current().candidate_labels)
+    backend = image_backends.create_backend("stub")
+    backend.load()
+    label_features = backend.encode_labels(labels)
+    images = [Image.open(io.BytesIO(_image(seed))).convert("RGB") for seed in range(30)]
+
+    def best(batch):
+        return backend.score_labels(backend.embed_images(batch), label_features).argmax(axis=1).tolist()
+
+    batched = best(images)
+    assert batched == best(images)
+    assert batched == [best([image])[0] for image in images]
+    print(f"Distinct labels for 30 images: {len(set(batched))}")
+    assert len(set(batched)) >= 5
+    print("✅ Same image, same label; batched and single scoring agree")
+
+def test_classifier_with_stub():
+    """IMAGE_BACKEND=stub drives classify_image(s)_from_bytes and the pipeline image check offline"""
+    print("\nTesting image_classifier with IMAGE_BACKEND=stub...")
+    saved = (ic.IMAGE_BACKEND, ic._backend, ic._available, ic._load_attempted)
+    ic.IMAGE_BACKEND, ic._load_attempted = "stub", False
+    try:
+        _check_classifier_with_stub()
+    finally:
+        ic.IMAGE_BACKEND, ic._backend, ic._available, ic._load_attempted = saved
+    print("✅ Stub backend classifies images without network or weights")
+
+def _check_classifier_with_stub():
+    ic.initialize_backend()
+    rules = rules_config.load_rules()  # label embeddings come from the stub backend
+    labels = list(rules.candidate_labels)
+    assert rules.text_features is not None and len(rules.text_features) == len(labels)
+
+    images = [_image(seed) for seed in range(8)]
+    single = [ic.classify_image_from_bytes(image, labels, rules.text_features) for image in images]
+    assert single == [ic.classify_image_from_bytes(image, labels) for image in images]
+    assert all(label in labels for label in single)
+    batch = ic.classify_images_from_bytes(images + [b"", b"not an image"], labels, rules.text_features)
+    assert batch == single + ["other", "other"]
+
+    for image, label in zip(images, single):
+        for category in ("Road & Traffic", "Garbage & Sanitation"):
+            expected = rules.label_matches_category(label, category)
+            assert pipeline.image_matches_category_from_bytes(image, category, rules=rules) == expected
+
+class _SlowStubBackend(image_backends.StubBackend):
+    name = "slow-stub"
+
+    def load(self):
+        time.sleep(0.3)
+
+def test_concurrent_first_use_waits_for_load():
+    """Images arriving while the backend is still loading wait for it instead of getting 'other'"""
+    print("\nTesting concurrent first use of a slow-loading backend...")
+    labels = ["pothole on road", "garbage pile", "broken streetlight", "fallen tree"]
+    text_features = image_backends.StubBackend().encode_labels(labels)
+    images = [_image(seed) for seed in range(4)]
+    backend = image_backends.StubBackend()
+    expected = [labels[int(row.argmax())] for row in
+                backend.score_labels(backend.embed_images([Image.open(io.BytesIO(b)).convert("RGB") for b in images]), text_features)]
+
+    saved = (ic.IMAGE_BACKEND, ic._backend, ic._available, ic._load_attempted, ic.IMAGE_MODE)
+    image_backends.register_backend("slow-stub", _SlowStubBackend)
+    ic.IMAGE_BACKEND, ic._backend, ic._available, ic._load_attempted = "slow-stub", None, False, False
+    ic.IMAGE_MODE = "eager"  # no background rules reload after the load
+    results = [None] * len(images)
+    def classify(i):
+        results[i] = ic.classify_image_from_bytes(images[i], labels, text_features)
+    try:
+        threads = [threading.Thread(target=classify, args=(i,)) for i in range(len(images))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        ic.IMAGE_BACKEND, ic._backend, ic._available, ic._load_attempted, ic.IMAGE_MODE = saved
+        del image_backends.BACKENDS["slow-stub"]
+    print(f"Labels during the first load: {results}")
+    assert results == expected
+    print("✅ Concurrent callers block on the first load")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Image Backend Test")
+    print("=" * 60)
+    test_registry()
+    test_stub_is_deterministic()
+    test_classifier_with_stub()
+    test_concurrent_first_use_waits_for_load()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
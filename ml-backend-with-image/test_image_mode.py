@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script to verify IMAGE_MODE: lazy and disabled processes serve text
+reports without importing the image stack (PIL, imagehash, torch, transformers)
+"""
+import sys
+import os
+import io
+import json
+import subprocess
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+IMAGE_STACK = ("PIL", "imagehash", "torch", "transformers")
+
+# Runs in a fresh interpreter: one text report, then one report with an image
+_CHILD = """
+import sys, json, asyncio, pathlib
+import app.main
+from app import dataset
+dataset.DATA_FILE = pathlib.Path(sys.argv[1])
+import httpx
+
+STACK = %r
+
+def loaded():
+    return sorted(m for m in STACK if m in sys.modules)
+
+async def main():
+    transport = httpx.ASGITransport(app=app.main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        fields = {"report_id": "mode_001", "description": "Pothole on the main road", "user_id": "mode_user"}
+        text = await client.post("/submit", data=fields)
+        after_text = loaded()
+        image = pathlib.Path(sys.argv[2]).read_bytes()
+        fields.update(report_id="mode_002", description="Garbage dumped near the market")
+        with_image = await client.post("/submit", data=fields, files={"image": ("img.png", image, "image/png")})
+        return {"at_import": at_import, "text_status": text.status_code, "after_text": after_text,
+                "image_status": with_image.status_code, "after_image": loaded()}
+
+at_import = loaded()
+print(json.dumps(asyncio.run(main())))
+""" % (IMAGE_STACK,)
+
+def _run(mode: str) -> dict:
+    from PIL import Image
+    tmp = tempfile.mkdtemp()
+    image_path = os.path.join(tmp, "img.png")
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), (120, 80, 40)).save(buf, "PNG")
+    with open(image_path, "wb") as f:
+        f.write(buf.getvalue())
+    env = {**os.environ, "IMAGE_MODE": mode, "LOG_LEVEL": "WARNING"}
+    proc = subprocess.run([sys.executable, "-c", _CHILD, os.path.join(tmp, "dataset.jsonl"), image_path],
+                          cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                          capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def test_lazy_mode():
+    """IMAGE_MODE=lazy loads the image stack only for the first image"""
+    print("Testing IMAGE_MODE=lazy...")
+    result = _run("lazy")
+    print(f"Result: {result}")
+    assert result["at_import"] == [] and result["after_text"] == []
+    assert result["text_status"] == 200 and result["image_status"] == 200
+    assert {"PIL", "imagehash"} <= set(result["after_image"])
+    print("✅ Image stack loaded on first image only")
+
+def test_disabled_mode():
+    """IMAGE_MODE=disabled never loads the image stack and refuses images"""
+    print("\nTesting IMAGE_MODE=disabled...")
+    result = _run("disabled")
+    print(f"Result: {result}")
+    assert result["text_status"] == 200
+    assert result["image_status"] == 503
+    assert result["after_image"] == []
+    print("✅ Text reports served, images refused, image stack never imported")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Image Mode Test")
+    print("=" * 60)
+    test_lazy_mode()
+    test_disabled_mode()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
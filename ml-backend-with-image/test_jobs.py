@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the async job queue (202 + polling mode)
+"""
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import jobs
+
+def _wait(queue, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job.status in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_job_lifecycle():
+    """Jobs run on worker threads and keep their result until they expire"""
+    print("Testing job lifecycle...")
+    def handler(report):
+        if report["description"] == "boom":
+            raise RuntimeError("classifier crashed")
+        return {"report_id": report["report_id"], "status": "accepted"}
+
+    queue = jobs.JobQueue(handler, workers=2, max_queued=10, ttl=60)
+    ok = queue.submit({"report_id": "job_001", "description": "Pothole", "image_bytes": b"img"})
+    bad = queue.submit({"report_id": "job_002", "description": "boom"})
+
+    ok, bad = _wait(queue, ok.id), _wait(queue, bad.id)
+    print(f"ok: {ok.status}, bad: {bad.status} ({bad.error})")
+    assert ok.status == "done" and ok.result["status"] == "accepted"
+    assert ok.report_data is None  # image bytes released once finished
+    assert bad.status == "failed" and "crashed" in bad.error
+    assert queue.get("missing") is None
+    assert queue.jobs() == [ok, bad]
+    print("✅ Job lifecycle works")
+
+def test_queue_full_and_callback_validation():
+    """A full queue refuses new jobs; callback URLs must be public http(s) URLs"""
+    print("\nTesting queue limit and callback validation...")
+    queue = jobs.JobQueue(lambda report: time.sleep(0.2) or {}, workers=1, max_queued=1, ttl=60)
+    queue.submit({"report_id": "full_001"})
+    time.sleep(0.05)  # let the worker pick up the first job
+    queue.submit({"report_id": "full_002"})
+    try:
+        queue.submit({"report_id": "full_003"})
+        raise AssertionError("expected QueueFull")
+    except jobs.QueueFull:
+        pass
+
+    assert jobs.validate_callback_url("https://93.184.215.14/hook") == "https://93.184.215.14/hook"
+    assert jobs.validate_callback_url(None) is None
+    for url in ("ftp://example.com/hook", "/relative/path", "javascript:alert(1)",
+                "http://169.254.169.254/latest/meta-data", "http://localhost:8000/hook", "http://127.0.0.1/hook",
+                "http://10.0.0.5/hook", "http://192.168.1.10/hook", "http://[::1]/hook", "http://[::ffff:10.0.0.1]/hook"):
+        try:
+            jobs.validate_callback_url(url)
+            raise AssertionError(f"expected {url} to be rejected")
+        except ValueError:
+            pass
+
+    # Hosts listed in JOB_CALLBACK_ALLOWED_HOSTS may be internal; everything else is then refused
+    original = jobs.JOB_CALLBACK_ALLOWED_HOSTS
+    jobs.JOB_CALLBACK_ALLOWED_HOSTS = {"localhost"}
+    try:
+        assert jobs.validate_callback_url("http://localhost:9000/hook") == "http://localhost:9000/hook"
+        try:
+            jobs.validate_callback_url("https://93.184.215.14/hook")
+            raise AssertionError("expected a host outside the allow list to be rejected")
+        except ValueError:
+            pass
+    finally:
+        jobs.JOB_CALLBACK_ALLOWED_HOSTS = original
+    print("✅ Queue limit and callback validation work")
+
+def test_slow_callback_does_not_block_workers():
+    """Callback delivery runs off the job workers, so a slow receiver doesn't stall the queue"""
+    print("\nTesting callback delivery off the worker threads...")
+    queue = jobs.JobQueue(lambda report: {"status": "accepted"}, workers=1, max_queued=10, ttl=60, callback_workers=1)
+    delivering = []
+    def slow_delivery(job):
+        delivering.append(job.id)
+        time.sleep(1.0)
+        job.callback_status = "delivered"
+    queue._deliver_callback = slow_delivery
+
+    started = time.time()
+    first = queue.submit({"report_id": "job_cb_1", "description": "Pothole"}, "https://93.184.215.14/hook")
+    second = queue.submit({"report_id": "job_cb_2", "description": "Pothole"}, "https://93.184.215.14/hook")
+    first, second = _wait(queue, first.id), _wait(queue, second.id)
+    elapsed = time.time() - started
+    print(f"both jobs done in {elapsed:.2f}s, callbacks: {first.callback_status}, {second.callback_status}")
+    assert elapsed < 0.9
+    assert first.callback_status == second.callback_status == "pending"  # still being delivered
+    print("✅ Callbacks don't block the job workers")
+
+def test_pending_limit_per_stage():
+    """Each admission stage has its own cap on queued + running jobs"""
+    print("\nTesting pending job limits per stage...")
+    release = threading.Event()
+    queue = jobs.JobQueue(lambda report: release.wait(5) and {}, workers=1, max_queued=10, ttl=60,
+                          max_pending={"text": 5, "image": 2})
+    image_jobs = [queue.submit({"report_id": f"img_{i}", "description": "x"}, stage="image") for i in range(2)]
+    try:
+        queue.submit({"report_id": "img_2", "description": "x"}, stage="image")
+        raise AssertionError("expected QueueFull")
+    except jobs.QueueFull as e:
+        print(f"Refused: {e}")
+    text_job = queue.submit({"report_id": "txt_0", "description": "x"}, stage="text")  # other stage still open
+    stats = queue.stats()["stages"]
+    assert stats["image"] == {"pending": 2, "max_pending": 2} and stats["text"]["pending"] == 1
+    release.set()
+    for job in image_jobs + [text_job]:
+        _wait(queue, job.id)
+    assert queue.stats()["stages"]["image"]["pending"] == 0
+    queue.submit({"report_id": "img_3", "description": "x"}, stage="image")  # room again
+    print("✅ Pending jobs are limited per stage")
+
+def test_callback_lookup_off_event_loop():
+    """A slow DNS lookup for callback_url does not stall other requests on the event loop"""
+    print("\nTesting callback host lookup off the event loop...")
+    import asyncio
+    from app import main
+
+    original = jobs.socket.getaddrinfo
+    def slow_getaddrinfo(*args, **kwargs):
+        time.sleep(0.5)
+        return [(jobs.socket.AF_INET, jobs.socket.SOCK_STREAM, 6, "", ("93.184.215.14", 443))]
+
+    async def scenario():
+        ticks = 0
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        task = asyncio.create_task(ticker())
+        url = await main.check_callback_url("https://hooks.example.org/report")
+        task.cancel()
+        return url, ticks
+
+    jobs.socket.getaddrinfo = slow_getaddrinfo
+    try:
+        url, ticks = asyncio.run(scenario())
+    finally:
+        jobs.socket.getaddrinfo = original
+    print(f"Event loop ticked {ticks} times during the lookup")
+    assert url == "https://hooks.example.org/report"
+    assert ticks >= 20
+    print("✅ Callback validation runs in the threadpool")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Async Job Queue Test")
+    print("=" * 60)
+    test_job_lifecycle()
+    test_queue_full_and_callback_validation()
+    test_slow_callback_does_not_block_workers()
+    test_pending_limit_per_stage()
+    test_callback_lookup_off_event_loop()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script to verify queued log records are rendered when they are logged
+"""
+import sys
+import os
+import json
+import logging
+import queue
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.logging_config import DeferredQueueHandler, JsonFormatter
+
+def _queued_logger(name):
+    records = queue.SimpleQueue()
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(DeferredQueueHandler(records))
+    logger.propagate = False
+    return logger, records
+
+def test_args_rendered_on_calling_thread():
+    """A dict mutated after the log call is logged as it was at the call"""
+    print("Testing message rendering...")
+    logger, records = _queued_logger("app.test_logging.args")
+    fields = {"category": "Pothole"}
+    logger.info("Classified as %s", fields)
+    fields["category"] = "Other"
+
+    record = records.get_nowait()
+    print(f"Queued message: {record.msg}")
+    assert record.msg == "Classified as {'category': 'Pothole'}"
+    assert record.args is None
+    assert json.loads(JsonFormatter().format(record))["message"] == "Classified as {'category': 'Pothole'}"
+    print("✅ Arguments are merged before queueing")
+
+def test_exception_kept_as_text():
+    """The traceback travels as text, without the frames"""
+    print("\nTesting exception rendering...")
+    logger, records = _queued_logger("app.test_logging.exc")
+    try:
+        raise ValueError("bad image")
+    except ValueError:
+        logger.exception("Classification failed")
+
+    record = records.get_nowait()
+    assert record.exc_info is None
+    assert "ValueError: bad image" in record.exc_text
+    entry = json.loads(JsonFormatter().format(record))
+    assert "ValueError: bad image" in entry["exception"]
+    assert "ValueError: bad image" in logging.Formatter().format(record)
+    print("✅ Traceback is kept as text")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Logging Queue Test")
+    print("=" * 60)
+    test_args_rendered_on_calling_thread()
+    test_exception_kept_as_text()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test script to verify memory diagnostics (app/memory.py, /admin/memory)
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from app import memory
+
+def test_deep_sizeof():
+    """Containers, objects and numpy buffers are counted once each"""
+    print("Testing deep_sizeof...")
+    blob = b"x" * 100_000
+    holder = {"blobs": [blob, blob], "array": np.zeros(50_000, dtype=np.float32)}
+    size = memory.deep_sizeof(holder)
+    print(f"Size: {size} bytes")
+    assert 300_000 <= size < 400_000  # one blob (shared) + 200 KB array + containers
+    assert memory.deep_sizeof(holder, exclude=(holder["array"],)) < 200_000
+    print("✅ Shared objects counted once, buffers included")
+
+def test_tracemalloc_diff():
+    """Allocations made after the baseline show up in the diff"""
+    print("\nTesting tracemalloc baseline and diff...")
+    status = memory.start_tracing()
+    assert status["tracing"] and status["has_baseline"]
+    kept = [bytearray(1024 * 1024) for _ in range(4)]
+    report = memory.allocation_report(limit=5)
+    top_diff = report["diff"][0]
+    print(f"Largest growth: {top_diff}")
+    assert top_diff["size_diff_bytes"] >= 4 * 1024 * 1024
+    assert "test_memory.py" in top_diff["site"]
+    assert memory.stop_tracing() == {"tracing": False}
+    assert memory.allocation_report() == {"tracing": False}
+    del kept
+    print("✅ Growth since the baseline is attributed to its allocation site")
+
+def test_admin_endpoint():
+    """GET /admin/memory reports component sizes; tracemalloc can be driven over HTTP"""
+    print("\nTesting /admin/memory...")
+    from fastapi.testclient import TestClient
+    from app import main
+
+    client = TestClient(main.app)
+    original, main.ADMIN_TOKEN = main.ADMIN_TOKEN, "memory-test"
+    headers = {"X-Admin-Token": "memory-test"}
+    try:
+        assert client.get("/admin/memory").status_code == 401
+        body = client.get("/admin/memory", headers=headers).json()
+        print(f"Components: {body['components']}")
+        assert {"near_dup_index", "result_cache", "upload_buffers", "rules", "jobs"} <= set(body["components"])
+        assert body["tracemalloc"] == {"tracing": False}
+        assert client.post("/admin/memory/tracemalloc/snapshot", headers=headers).status_code == 409
+        assert client.post("/admin/memory/tracemalloc/start", headers=headers).json()["tracing"] is True
+        traced = client.get("/admin/memory?top=3", headers=headers).json()["tracemalloc"]
+        assert len(traced["top"]) == 3 and "diff" in traced
+        assert client.post("/admin/memory/tracemalloc/stop", headers=headers).json() == {"tracing": False}
+    finally:
+        main.ADMIN_TOKEN = original
+    print("✅ Admin memory endpoints work")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Memory Diagnostics Test")
+    print("=" * 60)
+    test_deep_sizeof()
+    test_tracemalloc_diff()
+    test_admin_endpoint()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
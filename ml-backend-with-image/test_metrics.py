@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script to verify Prometheus metrics export
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import metrics, tracing
+
+def test_histogram_and_counter_render():
+    """Histogram buckets are cumulative and rejection reasons drop per-request details"""
+    print("Testing metrics rendering...")
+    histogram = metrics.Histogram("test_stage_seconds", "Test histogram.", ("stage",), buckets=(0.01, 0.1, 1.0))
+    histogram.observe(0.005, "clip")
+    histogram.observe(0.1, "clip")
+    histogram.observe(5.0, "clip")
+    lines = histogram.render()
+    print("\n".join(lines))
+    assert 'test_stage_seconds_bucket{stage="clip",le="0.01"} 1' in lines
+    assert 'test_stage_seconds_bucket{stage="clip",le="0.1"} 2' in lines  # upper bound is inclusive
+    assert 'test_stage_seconds_bucket{stage="clip",le="+Inf"} 3' in lines
+    assert 'test_stage_seconds_count{stage="clip"} 3' in lines
+
+    assert metrics.reason_label("Image validation error: cannot identify image file") == "Image validation error"
+    metrics.record_result({"status": "rejected", "category": "Other", "reason": "Processing error: boom"}, 0.01)
+    text = metrics.render()
+    assert 'civic_ml_rejections_total{reason="Processing error"}' in text
+    assert 'civic_ml_reports_total{status="rejected",category="Other"}' in text
+    print("✅ Metrics render in Prometheus format")
+
+def test_request_trace():
+    """Stage timings reach the request trace only while one is active"""
+    print("\nTesting request timing trace...")
+    metrics.observe_stage("text_analysis", 0.002)  # no active trace: ignored
+    trace = tracing.RequestTrace()
+    token = tracing._current.set(trace)
+    try:
+        metrics.observe_stage("dedup_text", 0.001)
+        metrics.observe_stage("dedup_text", 0.002)
+        tracing.note("result_cache", "miss")
+    finally:
+        tracing._current.reset(token)
+    tracing.note("ignored", "x")
+
+    header = trace.server_timing()
+    print(f"Server-Timing: {header}")
+    assert header.startswith('dedup_text;dur=3.00;desc="x2", result_cache;desc="miss", total;dur=')
+    assert "text_analysis" not in header and "ignored" not in header
+    print("✅ Request timing trace works")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Metrics Test")
+    print("=" * 60)
+    test_histogram_and_counter_render()
+    test_request_trace()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
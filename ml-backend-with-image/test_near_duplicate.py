@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script to verify MinHash/LSH near-duplicate detection
+"""
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import dataset, storage
+
+def _use_temp_dataset(reports):
+    """Point the dataset at a temporary file containing the given reports"""
+    tmp_dir = tempfile.mkdtemp()
+    dataset.DATA_FILE = Path(tmp_dir) / "dataset.jsonl"
+    with dataset.DATA_FILE.open("w", encoding="utf8") as f:
+        for report in reports:
+            f.write(json.dumps(report) + "\n")
+    storage._near_dup_index = None
+    storage._near_dup_offset = 0
+
+def test_paraphrase_detected():
+    """Paraphrased description from the same user in the same category"""
+    print("Testing paraphrase near-duplicate detection...")
+    original_file = dataset.DATA_FILE
+    try:
+        _use_temp_dataset([{
+            "report_id": "nd_001",
+            "description": "Clear the water on road immediately",
+            "user_id": "user_a",
+            "accept": True,
+            "status": "accepted",
+            "category": "Water & Drainage",
+        }])
+        paraphrase = "Clear the water on road immediately.This is pathole issue"
+
+        same_user = storage.is_near_duplicate("user_a", paraphrase, "Water & Drainage", store=False)
+        other_user = storage.is_near_duplicate("user_b", paraphrase, "Water & Drainage", store=False)
+        other_category = storage.is_near_duplicate("user_a", paraphrase, "Road & Traffic", store=False)
+        unrelated = storage.is_near_duplicate("user_a", "Garbage dumped near the school gate", "Water & Drainage", store=False)
+        print(f"same user: {same_user}, other user: {other_user}, other category: {other_category}, unrelated: {unrelated}")
+
+        assert same_user
+        assert not other_user
+        assert not other_category
+        assert not unrelated
+    finally:
+        dataset.DATA_FILE = original_file
+        storage._near_dup_index = None
+        storage._near_dup_offset = 0
+
+def test_index_picks_up_appended_reports():
+    """Reports appended after the index was built are found on the next query"""
+    print("\nTesting incremental index refresh...")
+    original_file = dataset.DATA_FILE
+    try:
+        _use_temp_dataset([])
+        assert not storage.is_near_duplicate("user_a", "Fix the street light immediately", "Street Lighting")
+        with dataset.DATA_FILE.open("a", encoding="utf8") as f:
+            f.write(json.dumps({
+                "report_id": "nd_002",
+                "description": "Fix the street light immediately",
+                "user_id": "user_a",
+                "accept": True,
+                "status": "accepted",
+                "category": "Street Lighting",
+            }) + "\n")
+        assert storage.is_near_duplicate("user_a", "Fix the street light immediately please", "Street Lighting")
+        print("✅ Appended report found")
+    finally:
+        dataset.DATA_FILE = original_file
+        storage._near_dup_index = None
+        storage._near_dup_offset = 0
+
+if __name__ == "__main__":
+    test_paraphrase_detected()
+    test_index_picks_up_appended_reports()
+    print("\n✅ ALL NEAR-DUPLICATE TESTS PASSED")
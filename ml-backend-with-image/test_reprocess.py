@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script to verify offline reprocessing of dataset.jsonl (app/reprocess.py)
+"""
+import sys
+import os
+import io
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import reprocess
+
+REPORTS = [
+    {"report_id": "rp_001", "description": "Big pothole on the road near school", "status": "accepted",
+     "accept": True, "category": "Road & Traffic", "confidence": 0.9, "urgency": "low", "reason": "Report accepted successfully"},
+    {"report_id": "rp_002", "description": "Garbage dumped near the market", "status": "accepted",
+     "accept": True, "category": "Road & Traffic", "confidence": 0.6, "urgency": "low", "reason": "Report accepted successfully"},
+    {"report_id": "rp_003", "description": "Streetlight not working", "status": "rejected",
+     "accept": False, "category": "Other", "confidence": 0.0, "reason": "Unable to determine issue category. Please provide more details."},
+    {"report_id": "rp_004", "description": "Pothole near bus stop, useless idiots", "status": "accepted",
+     "accept": True, "category": "Road & Traffic", "confidence": 0.8, "urgency": "low", "reason": "Report accepted successfully"},
+    {"report_id": "rp_005", "description": "Pothole near temple", "status": "rejected", "accept": False,
+     "category": "Road & Traffic", "confidence": 0.8, "reason": "You have already submitted this report."},
+]
+
+def _write_dataset(lines):
+    path = os.path.join(tempfile.mkdtemp(), "dataset.jsonl")
+    with open(path, "w", encoding="utf8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+def _run(path, **options):
+    output = io.StringIO()
+    summary = reprocess.run([path], output, **options)
+    changes = {c["report_id"]: c for c in map(json.loads, output.getvalue().splitlines())}
+    return summary, changes
+
+def test_changed_decisions():
+    """Only reports whose text-stage decision changes are reported"""
+    print("Testing reprocessing diff...")
+    path = _write_dataset([json.dumps(r) for r in REPORTS] + ["not json"])
+    summary, changes = _run(path, chunk_size=2)
+    print(f"Summary: {summary}")
+    assert summary["reports"] == 5 and summary["invalid"] == 1
+    assert changes["rp_002"]["change"] == "category_changed"
+    assert changes["rp_002"]["after"]["category"] == "Garbage & Sanitation"
+    assert changes["rp_003"]["change"] == "rejection_lifted"
+    assert changes["rp_004"]["change"] == "newly_rejected"
+    assert "rp_001" not in changes and "rp_005" not in changes  # later-stage decisions are kept
+    assert changes["rp_004"]["line"] == 4
+    print("✅ Category changes, lifted and new rejections are reported")
+
+def test_threshold_override_with_workers():
+    """A stricter confidence threshold run on a process pool rejects low-confidence reports"""
+    print("\nTesting threshold override on a process pool...")
+    path = _write_dataset([json.dumps(r) for r in REPORTS] * 3)
+    baseline, _ = _run(path, chunk_size=4)
+    summary, changes = _run(path, workers=2, chunk_size=4, confidence_threshold=1.01)
+    print(f"Summary: {summary}")
+    assert summary["reports"] == 15
+    assert baseline["changed"] == 9
+    assert summary["newly_rejected"] == 12  # every report not already rejected on text grounds
+    assert all(c["after"]["reason"].startswith("Unable to determine") for c in changes.values()
+               if c["change"] == "newly_rejected")
+    print("✅ Worker processes apply the override")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Dataset Reprocessing Test")
+    print("=" * 60)
+    test_changed_decisions()
+    test_threshold_override_with_workers()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the compiled rules config (app/rules.py)
+"""
+import sys
+import os
+import json
+import signal
+import tempfile
+import threading
+import time
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import rules as rules_config
+
+def _reference_match(rules, image_label: str, category: str) -> bool:
+    """The per-call matcher pipeline.image_matches_category_from_bytes used before label_table"""
+    if not image_label or image_label == "other" or image_label in rules.generic_image_labels:
+        return True
+    allowed_labels = [lbl.lower() for lbl in rules.image_to_category_map.get(category, [])]
+    category_keywords = [kw.lower() for kw in rules.category_keywords.get(category, [])]
+    if image_label in allowed_labels:
+        return True
+    for lbl in allowed_labels:
+        if lbl in image_label or image_label in lbl:
+            return True
+    for kw in category_keywords:
+        if kw in image_label or image_label in kw:
+            return True
+    image_words = set(image_label.split())
+    for lbl in allowed_labels:
+        if image_words.intersection(set(lbl.split())):
+            return True
+    for word in image_words:
+        if len(word) > 2:
+            for kw in category_keywords:
+                if word in kw or kw in word:
+                    return True
+            for lbl in allowed_labels:
+                if word in lbl or lbl in word:
+                    return True
+    return not allowed_labels and not category_keywords
+
+def test_label_table_matches_reference():
+    """The precomputed label table agrees with the old matcher for every label and category"""
+    print("Testing label table against the per-call matcher...")
+    rules = rules_config.load_rules(with_embeddings=False)
+    labels = sorted({lbl.lower().strip() for lbl in rules.candidate_labels} | set(rules.generic_image_labels) | {"other"})
+    categories = sorted(rules.ruled_categories) + ["Other", "Not A Category"]
+    checked = mismatched = 0
+    for label in labels:
+        assert label in rules.label_table
+        for category in categories:
+            checked += 1
+            if rules.label_matches_category(label, category) != _reference_match(rules, label, category):
+                mismatched += 1
+                print(f"Mismatch: {label!r} / {category!r}")
+    print(f"Checked {checked} label/category pairs")
+    assert mismatched == 0
+
+    unseen = "rusty fire hydrant leaking"  # not a candidate label: goes through the LRU cache
+    assert unseen not in rules.label_table
+    for category in categories:
+        assert rules.label_matches_category(unseen, category) == _reference_match(rules, unseen, category)
+    assert rules._unseen_labels.cache_info().currsize == 1
+    assert unseen not in rules.label_table  # the table never grows
+    print("✅ Label table matches the reference matcher")
+
+def _write_rules(path: Path, version: int, marker: str = None):
+    """The shipped rules with another version (and optionally one extra candidate label)"""
+    with open(rules_config.BASE_DIR / "config" / "rules.json", "r", encoding="utf8") as f:
+        config = json.load(f)
+    config["version"] = version
+    if marker:
+        config["candidate_labels"].append(marker)
+    path.write_text(json.dumps(config), encoding="utf8")
+
+class _TempRules:
+    """Point RULES_FILE at a temporary file; restores the file, snapshot and error state"""
+
+    def __enter__(self):
+        self.saved = (rules_config.RULES_FILE, rules_config._current, rules_config._last_error)
+        self.path = Path(tempfile.mkdtemp()) / "rules.json"
+        rules_config.RULES_FILE = self.path
+        return self.path
+
+    def __exit__(self, *exc):
+        rules_config.RULES_FILE, rules_config._current, rules_config._last_error = self.saved
+
+def _admin_client():
+    from fastapi.testclient import TestClient
+    from app import main
+    return main, TestClient(main.app)
+
+def test_invalid_reload_keeps_snapshot():
+    """A broken rules file leaves the active snapshot in place and the endpoint reports why"""
+    print("\nTesting reload of an invalid rules file...")
+    main, client = _admin_client()
+    original_token = main.ADMIN_TOKEN
+    main.ADMIN_TOKEN = "test-token"
+    headers = {"X-Admin-Token": "test-token"}
+    try:
+        with _TempRules() as path:
+            _write_rules(path, 7)
+            before = rules_config.reload()
+            for broken in ('{"version": 8, "candidate_labels": [', '{"version": 8, "candidate_labels": []}'):
+                path.write_text(broken, encoding="utf8")
+                try:
+                    rules_config.reload()
+                    raise AssertionError("expected the reload to fail")
+                except (ValueError, json.JSONDecodeError):
+                    pass
+                assert rules_config.current() is before
+
+                response = client.post("/admin/reload?wait=true", headers=headers)
+                print(f"Endpoint: {response.status_code} {response.json()['detail']}")
+                assert response.status_code == 422 and "Rules reload failed" in response.json()["detail"]
+                status = client.get("/admin/rules", headers=headers).json()
+                assert status["version"] == 7 and status["last_error"]
+                assert rules_config.current() is before
+    finally:
+        main.ADMIN_TOKEN = original_token
+    print("✅ Invalid rules never replace the active snapshot")
+
+def test_valid_edit_swaps_snapshot():
+    """Endpoint, background reload and SIGHUP each swap in a new snapshot with the new version"""
+    print("\nTesting reload of a valid edit...")
+    main, client = _admin_client()
+    original_token = main.ADMIN_TOKEN
+    main.ADMIN_TOKEN = "test-token"
+    headers = {"X-Admin-Token": "test-token"}
+    original_handler = signal.getsignal(signal.SIGHUP) if hasattr(signal, "SIGHUP") else None
+    try:
+        with _TempRules() as path:
+            _write_rules(path, 10)
+            first = rules_config.reload()
+
+            _write_rules(path, 11, marker="leaning lamp post")
+            response = client.post("/admin/reload?wait=true", headers=headers)
+            assert response.status_code == 200 and response.json() == {"status": "reloaded", "version": 11}
+            second = rules_config.current()
+            assert second is not first and second.version == 11 and first.version == 10
+            assert "leaning lamp post" in second.label_table and "leaning lamp post" not in first.label_table
+            assert client.get("/admin/rules", headers=headers).json()["last_error"] is None
+
+            _write_rules(path, 12)
+            response = client.post("/admin/reload", headers=headers)
+            assert response.status_code == 202
+            _wait_for_version(12)
+
+            _write_rules(path, 13)
+            rules_config.reload_in_background().join(5)
+            assert rules_config.current().version == 13
+
+            if rules_config.install_sighup_handler():
+                _write_rules(path, 14)
+                os.kill(os.getpid(), signal.SIGHUP)
+                _wait_for_version(14)
+                print("SIGHUP reloaded version 14")
+    finally:
+        main.ADMIN_TOKEN = original_token
+        if original_handler is not None:
+            signal.signal(signal.SIGHUP, original_handler)
+    print("✅ Valid edits are swapped in with their new version")
+
+def _wait_for_version(version: int, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while rules_config.current().version != version:
+        assert time.time() < deadline, f"version {version} was never loaded"
+        time.sleep(0.01)
+
+def test_concurrent_readers_see_whole_snapshots():
+    """Readers racing with reloads only ever see fully built snapshots"""
+    print("\nTesting concurrent readers during reloads...")
+    with _TempRules() as path:
+        _write_rules(path, 100, marker="marker 100")
+        rules_config.reload()
+        stop = threading.Event()
+        seen, problems = set(), []
+
+        def reader():
+            while not stop.is_set():
+                rules = rules_config.current()
+                marker = f"marker {rules.version}"
+                if (rules.candidate_labels[-1] != marker or marker not in rules.label_table
+                        or set(rules.keyword_patterns) != set(rules.category_keywords)
+                        or rules.spelling_index is None):
+                    problems.append(rules.version)
+                seen.add(rules.version)
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        original_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)  # switch threads as often as possible
+        try:
+            for thread in readers:
+                thread.start()
+            for version in range(101, 121):
+                _write_rules(path, version, marker=f"marker {version}")
+                rules_config.reload()
+        finally:
+            stop.set()
+            for thread in readers:
+                thread.join()
+            sys.setswitchinterval(original_interval)
+    print(f"Readers saw {len(seen)} versions, {len(problems)} inconsistent snapshots")
+    assert not problems and len(seen) > 1
+    print("✅ Readers never see a half-built snapshot")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Rules Config Test")
+    print("=" * 60)
+    test_label_table_matches_reference()
+    test_invalid_reload_keeps_snapshot()
+    test_valid_edit_swaps_snapshot()
+    test_concurrent_readers_see_whole_snapshots()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script to verify urgency-aware scheduling of the image stage
+"""
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import metrics
+from app.scheduler import PriorityScheduler
+
+def _run_contended(scheduler, urgencies):
+    """Hold the only slot, queue one waiter per urgency, release; return the service order"""
+    order = []
+    def worker(name, urgency):
+        with scheduler.slot(urgency):
+            order.append(name)
+
+    blocker_ready, release = threading.Event(), threading.Event()
+    def blocker():
+        with scheduler.slot("low"):
+            blocker_ready.set()
+            release.wait()
+    threading.Thread(target=blocker).start()
+    blocker_ready.wait()
+
+    threads = []
+    for name, urgency in urgencies:
+        thread = threading.Thread(target=worker, args=(name, urgency))
+        thread.start()
+        threads.append(thread)
+        time.sleep(0.02)  # make arrival order deterministic
+    release.set()
+    for thread in threads:
+        thread.join()
+    return order
+
+def test_urgent_reports_first():
+    """High urgency waiters are served before earlier low urgency ones"""
+    print("Testing urgency ordering...")
+    scheduler = PriorityScheduler("test", slots=1, aging_seconds=60)
+    order = _run_contended(scheduler, [("garbage", "low"), ("pothole", "medium"), ("gas leak", "high"), ("litter", "low")])
+    print(f"Service order: {order}")
+    assert order == ["gas leak", "pothole", "garbage", "litter"]
+
+    stats = scheduler.stats()
+    assert stats["priorities"]["low"]["served"] == 3  # includes the blocker
+    assert stats["priorities"]["high"]["queue_depth"] == 0
+    assert stats["priorities"]["low"]["wait_max_ms"] > stats["priorities"]["high"]["wait_p50_ms"]
+    print("✅ Urgent reports are served first")
+
+def test_aging_prevents_starvation():
+    """A low urgency waiter that has waited long enough is promoted past newer urgent ones"""
+    print("\nTesting aging...")
+    scheduler = PriorityScheduler("test", slots=1, aging_seconds=0.005)
+    order = _run_contended(scheduler, [("old garbage", "low"), ("fire", "high")])
+    print(f"Service order: {order}")
+    assert order == ["old garbage", "fire"]
+    assert scheduler.stats()["promoted"] >= 1
+    print("✅ Aging prevents starvation")
+
+def test_waits_exported_to_metrics():
+    """Per-urgency waits, queue depth and promotions show up in /metrics"""
+    print("\nTesting scheduler metrics...")
+    scheduler = PriorityScheduler("metrics-test", slots=1, aging_seconds=60)
+    _run_contended(scheduler, [("garbage", "low"), ("gas leak", "high")])
+    text = metrics.render()
+    assert 'civic_ml_scheduler_wait_seconds_count{stage="metrics-test",urgency="high"} 1' in text
+    assert 'civic_ml_scheduler_wait_seconds_count{stage="metrics-test",urgency="low"} 2' in text
+    assert 'civic_ml_scheduler_queue_depth{stage="metrics-test",urgency="high"} 0' in text
+    assert 'civic_ml_scheduler_queue_depth{stage="metrics-test",urgency="medium"} 0' in text
+    assert "# TYPE civic_ml_scheduler_promotions_total counter" in text
+    print("✅ Scheduler waits are exported")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Image Stage Scheduler Test")
+    print("=" * 60)
+    test_urgent_reports_first()
+    test_aging_prevents_starvation()
+    test_waits_exported_to_metrics()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the linear text engine (app/text_model.py) and its selection in the pipeline
+"""
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import pipeline, text_model
+from app.text_rules import detect_category
+
+TRAINING = [
+    ("Huge pothole on the main road", "Road & Traffic"),
+    ("Road surface has a deep crack near the junction", "Road & Traffic"),
+    ("Potholes everywhere on this road after rain", "Road & Traffic"),
+    ("Garbage not collected for a week", "Garbage & Sanitation"),
+    ("Trash and waste dumped near the market", "Garbage & Sanitation"),
+    ("Overflowing garbage bin smells terrible", "Garbage & Sanitation"),
+    ("Streetlight not working at night", "Street Lighting"),
+    ("Street light is broken and the lamp flickers", "Street Lighting"),
+    ("Dark street, no lamp working on this lane", "Street Lighting"),
+    ("No water supply since morning", "Water & Drainage"),
+    ("Low pressure in the water line for days", "Water & Drainage"),
+    ("Drain overflowing with water on the street", "Water & Drainage"),
+]
+QUERIES = ["pothole on road", "garbage everywhere", "the streetlight is off", "no water again", "hello there"]
+
+def _train():
+    texts, labels = zip(*TRAINING)
+    return text_model.train(list(texts), list(labels), epochs=60)
+
+def test_train_small_set():
+    """A model trained on a few labelled reports predicts their categories"""
+    print("Testing training on a small labelled set...")
+    model = _train()
+    predictions = model.predict_batch([text for text, _ in TRAINING])
+    print(f"Training accuracy: {sum(p == label for (p, _), (_, label) in zip(predictions, TRAINING))}/{len(TRAINING)}")
+    assert [category for category, _ in predictions] == [label for _, label in TRAINING]
+    assert all(0.4 <= confidence <= 1.0 for _, confidence in predictions)
+    assert model.predict_batch(["qwerty zxcv"]) == [("Other", 0.0)]  # no known features
+    assert model.predict_batch([]) == []
+    print("✅ Linear model learns a small labelled set")
+
+def test_save_load_round_trip():
+    """A saved and reloaded model gives exactly the same predictions"""
+    print("\nTesting npz save/load round trip...")
+    model = _train()
+    path = Path(tempfile.mkdtemp()) / "text_model.npz"
+    model.save(path)
+    loaded = text_model.LinearTextClassifier.load(path)
+    print(f"Artifact: {path.stat().st_size} bytes, {len(loaded.weights)} features")
+    assert loaded.classes == model.classes
+    assert loaded.predict_batch(QUERIES) == model.predict_batch(QUERIES)
+    print("✅ Round trip preserves predictions")
+
+def test_engine_selection_and_fallback():
+    """TEXT_ENGINE=linear uses the model; a missing model falls back to the keyword rules"""
+    print("\nTesting TEXT_ENGINE selection...")
+    model = _train()
+    path = Path(tempfile.mkdtemp()) / "text_model.npz"
+    model.save(path)
+    saved = (pipeline.TEXT_ENGINE, pipeline.TEXT_MODEL_PATH, pipeline._text_model, pipeline._text_model_loaded)
+    try:
+        pipeline.TEXT_ENGINE, pipeline.TEXT_MODEL_PATH = "linear", str(path)
+        pipeline._text_model, pipeline._text_model_loaded = None, False
+        assert pipeline.detect_categories(QUERIES) == model.predict_batch(QUERIES)
+        assert pipeline._text_model is not None
+
+        pipeline.TEXT_MODEL_PATH = str(path.parent / "missing.npz")
+        pipeline._text_model, pipeline._text_model_loaded = None, False
+        assert pipeline.detect_categories(QUERIES) == [detect_category(q) for q in QUERIES]
+        assert pipeline._text_model is None and pipeline._text_model_loaded
+
+        pipeline.TEXT_ENGINE, pipeline.TEXT_MODEL_PATH = "keyword", str(path)
+        pipeline._text_model, pipeline._text_model_loaded = None, False
+        assert pipeline.detect_categories(QUERIES) == [detect_category(q) for q in QUERIES]
+    finally:
+        pipeline.TEXT_ENGINE, pipeline.TEXT_MODEL_PATH, pipeline._text_model, pipeline._text_model_loaded = saved
+    print("✅ Engine selection and keyword fallback work")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Linear Text Engine Test")
+    print("=" * 60)
+    test_train_small_set()
+    test_save_load_round_trip()
+    test_engine_selection_and_fallback()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)
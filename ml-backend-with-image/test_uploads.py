@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script to verify streamed image uploads: size limit and file signature check
+"""
+import sys
+import os
+import io
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+from starlette.datastructures import UploadFile
+from fastapi.testclient import TestClient
+
+from app import uploads
+
+def _png() -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), (200, 40, 40)).save(buf, "PNG")
+    return buf.getvalue()
+
+def _read(data: bytes, max_size: int = uploads.MAX_IMAGE_SIZE, chunk_size: int = 64):
+    return asyncio.run(uploads.read_upload_limited(UploadFile(io.BytesIO(data)), max_size, chunk_size))
+
+def test_signatures():
+    """Known image signatures pass the sniff, whatever their size; anything else is refused"""
+    print("Testing image signature sniffing...")
+    png = _png()
+    assert uploads.sniff_image_type(png[:16]) == "image/png"
+    assert uploads.sniff_image_type(b"\x00\x00\x00\x1cftypavif\x00\x00\x00\x00") == "image/avif"
+    assert uploads.sniff_image_type(b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00") == "image/heic"
+    assert uploads.sniff_image_type(b"II*\x00" + b"\x00" * 12) == "image/tiff"
+    assert uploads.sniff_image_type(b"\x00\x00\x00\x18ftypisom\x00\x00\x00\x00") is None  # MP4 video
+    assert uploads.sniff_image_type(b"RIFF\x00\x00\x00\x00WAVEfmt ") is None
+    assert bytes(_read(png)) == png  # read across several chunks
+    assert _read(png, chunk_size=1 << 16) == png  # one chunk
+    for data in (b"%PDF-1.7 not an image", b"plain text report"):
+        try:
+            _read(data)
+            raise AssertionError("expected UnsupportedImageType")
+        except uploads.UnsupportedImageType as e:
+            print(f"Rejected {data[:8]!r}: {e}")
+    print("✅ Signature sniffing works")
+
+def test_unsupported_upload_rejected():
+    """/submit refuses a non-image upload with 422, even when it claims to be a JPEG"""
+    print("\nTesting /submit with a non-image upload...")
+    from app import main
+    client = TestClient(main.app)
+    response = client.post("/submit", data={"report_id": "upload_001", "description": "Pothole on the main road"},
+                           files={"image": ("photo.jpg", b"<html>not an image</html>", "image/jpeg")})
+    print(f"Response: {response.status_code} {response.json()['detail']}")
+    assert response.status_code == 422
+    assert "Unsupported image format" in response.json()["detail"]
+    print("✅ Non-image uploads are refused")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Image Upload Test")
+    print("=" * 60)
+    test_signatures()
+    test_unsupported_upload_rejected()
+    print("\n" + "=" * 60)
+    print("All tests completed!")
+    print("=" * 60)